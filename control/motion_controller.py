@@ -1,3 +1,4 @@
+import numpy as np
 from hardware.stepper_motor import StepperMotor
 from hardware.mock_controller import MockController
 from utils.logger import get_logger
@@ -6,6 +7,8 @@ logger = get_logger(__name__)
 
 class MotionController:
     def __init__(self):
+        self.x_position = 0.0  # Initialize X position
+        self.y_position = 0.0  # Initialize Y position
         self.z_position = 0  # Initialize Z position
         self.setpoint = 0    # Initialize setpoint for feedback control
         self.kp = 0.0        # PID proportional gain
@@ -27,6 +30,72 @@ class MotionController:
             raise TypeError("Invalid Z position: Expected a numeric value.")
         return self.z_position
 
+    def move(self, x, y, z):
+        """Move the stage to the specified XY position and the Z-axis to z."""
+        if not all(isinstance(value, (int, float)) for value in [x, y]):
+            raise TypeError("Position must be a numeric value.")
+        self.move_z(z)
+        self.x_position = x
+        self.y_position = y
+
+    def execute_line(self, xs, ys):
+        """
+        Move along a whole scan line and return the Z-position measured at every point.
+        :param xs: X coordinates of the line.
+        :param ys: Y coordinates of the line.
+        :return: NumPy array with one Z value per point.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if xs.shape != ys.shape or xs.ndim != 1:
+            raise ValueError("Line coordinates must be 1D arrays of equal length.")
+        z_values = np.full(len(xs), self.get_z_position(), dtype=np.float64)
+        if len(xs):
+            self.x_position = float(xs[-1])
+            self.y_position = float(ys[-1])
+        return z_values
+
+    def read_channels(self, names, xs, ys):
+        """
+        Read signal channels for the points of the last executed line.
+        Supported channels: "topography" (Z-position) and "error" (setpoint minus Z-position).
+        :param names: Channel names to read.
+        :param xs: X coordinates of the points.
+        :param ys: Y coordinates of the points.
+        :return: Dict mapping channel names to NumPy arrays.
+        """
+        count = len(xs)
+        sources = {
+            "topography": self.get_z_position,
+            "error": lambda: self.setpoint - self.get_z_position(),
+        }
+        values = {}
+        for name in names:
+            if name not in sources:
+                logger.error(f"Unsupported channel: {name}")
+                raise ValueError(f"Unsupported channel: {name}")
+            values[name] = np.full(count, sources[name](), dtype=np.float64)
+        return values
+
+    def get_state(self):
+        """Return the controller state as a JSON-serializable dict, e.g. for scan checkpoints."""
+        return {
+            "x_position": self.x_position,
+            "y_position": self.y_position,
+            "z_position": self.z_position,
+            "setpoint": self.setpoint,
+            "kp": self.kp,
+            "ki": self.ki,
+            "kd": self.kd,
+        }
+
+    def restore_state(self, state):
+        """Restore a controller state returned by get_state."""
+        for name in ("x_position", "y_position", "z_position", "setpoint", "kp", "ki", "kd"):
+            if name in state:
+                setattr(self, name, state[name])
+        logger.info(f"Controller state restored: {state}")
+
     def feedback_control(self):
         """Perform feedback control to adjust the Z-axis."""
         try:
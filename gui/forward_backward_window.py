@@ -4,11 +4,15 @@ from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QLabel, QComboBox, QSpinBox, QPushButton, QGridLayout, QFrame
 )
 from PyQt5.QtCore import Qt
+import numpy as np
+import pyqtgraph as pg
 
 
 class ForwardBackwardWindow(QDialog):
     """
     Window for managing forward and backward scan windows.
+    Each window shows the forward (trace) or backward (retrace) image of a
+    ScanBuffer, either as the latest line or as the whole topography.
     """
 
     def __init__(self, parent=None):
@@ -44,6 +48,9 @@ class ForwardBackwardWindow(QDialog):
         self.window_grid = QGridLayout()
         self.layout.addLayout(self.window_grid)
 
+        # Scan buffer whose images are displayed
+        self.scan_buffer = None
+
         # Initialize the windows
         self.windows = []
         self.update_windows(1)
@@ -72,7 +79,7 @@ class ForwardBackwardWindow(QDialog):
         """
         Create a frame for a single forward/backward scan window.
         :param index: Index of the window.
-        :return: QFrame containing the dropdown and placeholder.
+        :return: QFrame containing the dropdowns and the plot.
         """
         try:
             frame = QFrame()
@@ -89,12 +96,27 @@ class ForwardBackwardWindow(QDialog):
             dropdown.currentIndexChanged.connect(lambda idx, win=index: self.update_mode(win, idx))
             layout.addWidget(dropdown)
 
-            # Add a placeholder label for the window
+            # Add a dropdown for the scan direction
+            direction_dropdown = QComboBox()
+            direction_dropdown.addItems(["Forward", "Backward"])
+            direction_dropdown.setToolTip("Select the trace (forward) or retrace (backward) image.")
+            direction_dropdown.currentIndexChanged.connect(lambda idx, win=index: self.refresh_window(win))
+            layout.addWidget(direction_dropdown)
+
+            # Add a title label for the window
             placeholder = QLabel(f"Window {index + 1}")
             placeholder.setAlignment(Qt.AlignCenter)
             layout.addWidget(placeholder)
 
-            self.windows.append((frame, dropdown, placeholder))
+            # Add the plot showing the buffer contents
+            plot = pg.PlotWidget()
+            line_curve = plot.plot(pen='y')
+            image_item = pg.ImageItem()
+            plot.addItem(image_item)
+            layout.addWidget(plot)
+
+            self.windows.append((frame, dropdown, placeholder, direction_dropdown, plot, line_curve, image_item))
+            self.refresh_window(index)
             return frame
         except Exception as e:
             print(f"Error creating window frame: {e}")
@@ -109,9 +131,57 @@ class ForwardBackwardWindow(QDialog):
         try:
             mode = "Line Mode" if mode_index == 0 else "Topography Mode"
             self.windows[window_index][2].setText(f"Window {window_index + 1} - {mode}")
+            self.refresh_window(window_index)
         except Exception as e:
             print(f"Error updating mode for window {window_index}: {e}")
 
+    def set_scan_buffer(self, scan_buffer):
+        """
+        Display the images of a ScanBuffer. The buffer is read in place, not copied.
+        :param scan_buffer: ScanBuffer filled by a (trace/retrace) raster scan.
+        """
+        self.scan_buffer = scan_buffer
+        self.refresh()
+
+    def refresh(self):
+        """
+        Redraw all windows from the scan buffer; call periodically while scanning.
+        """
+        for index in range(len(self.windows)):
+            self.refresh_window(index)
+
+    def refresh_window(self, window_index):
+        """
+        Redraw a single window from the scan buffer.
+        :param window_index: Index of the window.
+        """
+        try:
+            _, dropdown, _, direction_dropdown, plot, line_curve, image_item = self.windows[window_index]
+            direction = "forward" if direction_dropdown.currentIndex() == 0 else "backward"
+            if self.scan_buffer is None or (direction == "backward" and self.scan_buffer.num_passes < 2):
+                line_curve.setData([], [])
+                image_item.clear()
+                return
+
+            image = self.scan_buffer.image("z", direction)
+            if dropdown.currentIndex() == 0:
+                # Line Mode: the most recently completed line of the selected direction
+                image_item.clear()
+                row = self.scan_buffer.last_row(direction)
+                if row is None:
+                    line_curve.setData([], [])
+                    return
+                line_curve.setData(self.scan_buffer.image("x", direction)[row], image[row])
+            else:
+                # Topography Mode: the whole image, unscanned pixels are NaN
+                line_curve.setData([], [])
+                if np.isnan(image).all():
+                    image_item.clear()
+                    return
+                image_item.setImage(image.T, levels=(np.nanmin(image), np.nanmax(image)))
+        except Exception as e:
+            print(f"Error refreshing window {window_index}: {e}")
+
     def reset_to_default(self):
         """
         Reset the configuration to the default state (1 window in Line Mode).
@@ -39,6 +39,25 @@ class DataLoggingTab(QWidget):
         self.data_table.setItem(row, 1, QTableWidgetItem(f"{y:.2f}"))
         self.data_table.setItem(row, 2, QTableWidgetItem(f"{z:.2f}"))
 
+    def add_data_block(self, block):
+        """
+        Add a block of rows to the table in one update.
+        Suitable as the data_logger of ScanManager scans.
+        :param block: (n, 3) array of X, Y, Z positions
+        """
+        rows = [tuple(point) for point in block.tolist()]
+        self.data.extend(rows)
+        first_row = self.data_table.rowCount()
+        self.data_table.setUpdatesEnabled(False)
+        try:
+            self.data_table.setRowCount(first_row + len(rows))
+            for offset, (x, y, z) in enumerate(rows):
+                self.data_table.setItem(first_row + offset, 0, QTableWidgetItem(f"{x:.2f}"))
+                self.data_table.setItem(first_row + offset, 1, QTableWidgetItem(f"{y:.2f}"))
+                self.data_table.setItem(first_row + offset, 2, QTableWidgetItem(f"{z:.2f}"))
+        finally:
+            self.data_table.setUpdatesEnabled(True)
+
     def save_data(self):
         """
         Save the logged data to a CSV file.
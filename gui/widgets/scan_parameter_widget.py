@@ -3,6 +3,7 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QComboBox, QGridLayout, QMessageBox
 )
+from scan_engine.scan_estimator import ScanEstimator
 from utils.logger import get_logger
 
 
@@ -11,9 +12,11 @@ class ScanParameterWidget(QWidget):
     A widget for configuring scanner mode, scan range, and scan location.
     """
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, controller=None):
         """
         Initialize the Scan Parameter Widget.
+        :param parent: Parent widget.
+        :param controller: Optional motion controller whose timing the scan estimate uses.
         """
         super().__init__(parent)
 
@@ -64,14 +67,36 @@ class ScanParameterWidget(QWidget):
         self.scan_location_y_input.setToolTip("Enter the Y offset of the scan location in cm.")
         self.input_layout.addWidget(self.scan_location_y_input, 1, 2)
 
+        # Step Size
+        self.step_size_label = QLabel("Step Size:", self)
+        self.input_layout.addWidget(self.step_size_label, 2, 0)
+        self.step_size_input = QLineEdit(self)
+        self.step_size_input.setPlaceholderText("Step (cm)")
+        self.step_size_input.setToolTip("Enter the distance between neighbouring scan points in cm.")
+        self.input_layout.addWidget(self.step_size_input, 2, 1)
+
         self.layout.addLayout(self.input_layout)
 
+        # SECTION: Scan Cost Estimate
+        self.logger.debug("Initializing Scan Cost Estimate.")
+        self.estimator = None  # Set with set_controller or set_estimator
+        self.estimate_label = QLabel("Estimate: -", self)
+        self.estimate_label.setToolTip("Predicted scan time and peak memory of a raster scan.")
+        self.estimate_label.setEnabled(False)
+        self.layout.addWidget(self.estimate_label)
+        for field in (self.scan_range_width_input, self.scan_range_height_input, self.scan_location_x_input,
+                      self.scan_location_y_input, self.step_size_input):
+            field.textChanged.connect(self.update_estimate)
+
         # SECTION: Initialize Maximum Ranges
         self.logger.debug("Initializing Maximum Ranges.")
         self.max_x_range = 100  # cm
         self.max_y_range = 100  # cm
         self.max_z_range = 30   # cm
 
+        if controller is not None:
+            self.set_controller(controller)
+
     def update_max_range(self):
         """
         Update the maximum scan range based on the selected scanner mode.
@@ -88,6 +113,45 @@ class ScanParameterWidget(QWidget):
             self.max_z_range = 1  # cm
         self.logger.info(f"Updated max range: X={self.max_x_range} cm, Y={self.max_y_range} cm, Z={self.max_z_range} cm")
 
+    def set_controller(self, controller):
+        """
+        Estimate scans with the motion model of a connected controller.
+        :param controller: The motion controller.
+        """
+        self.set_estimator(ScanEstimator.for_controller(controller))
+
+    def set_estimator(self, estimator):
+        """
+        Use the estimator of the connected controller, e.g. ScanEstimator.for_scan_manager(scan_manager).
+        Without an estimator the estimate is disabled.
+        :param estimator: The ScanEstimator, or None.
+        """
+        self.estimator = estimator
+        self.estimate_label.setEnabled(estimator is not None)
+        self.update_estimate()
+
+    def update_estimate(self):
+        """
+        Show the predicted time and peak memory of a raster scan with the current parameters.
+        """
+        if self.estimator is None:
+            self.estimate_label.setText("Estimate: -")
+            return
+        try:
+            width = float(self.scan_range_width_input.text())
+            height = float(self.scan_range_height_input.text())
+            x_offset = float(self.scan_location_x_input.text() or 0)
+            y_offset = float(self.scan_location_y_input.text() or 0)
+            step_size = float(self.step_size_input.text())
+            estimate = self.estimator.estimate(
+                "raster", x_start=x_offset, x_end=x_offset + width, y_start=y_offset, y_end=y_offset + height,
+                step_size=step_size
+            )
+        except (ValueError, KeyError):
+            self.estimate_label.setText("Estimate: -")
+            return
+        self.estimate_label.setText(f"Estimate: {estimate.describe()}")
+
     def get_scan_parameters(self):
         """
         Get the scan parameters (range and location) entered by the user.
@@ -2,25 +2,31 @@ import sys
 sys.path.append("D:/Documents/Project/SPM/copilot/SPM-Software/")
 
 import time
+import numpy as np
 from hardware.base_controller import BaseController
-from utils.logger import get_logger
+from hardware.motion_model import MotionModel
+from utils.logger import get_hot_path_logger, get_logger
 
 class MockController:
     def __init__(self):
         self.logger = get_logger(__name__)
+        self.hot_logger = get_hot_path_logger(__name__)  # Per-point messages, rate limited
         self.position = (0.0, 0.0, 0.0)
         self.connected = False
         self.status = "Idle"
         self.scanner_size = "Large"
         self.configure_scanner_size()
+        # Constant readings of the simulated signal channels
+        self.channel_values = {"current": 0.0, "error": 0.0, "amplitude": 0.0, "phase": 0.0}
+        self.move_latency = 0.0  # Simulated time per move command (point move or whole scan line)
 
     def get_position(self):
-        self.logger.debug(f"Current position: {self.position}")
+        self.hot_logger.debug("Current position: %s", self.position)
         return self.position
 
     def get_z_position(self):
         z_position = self.position[2]
-        self.logger.debug(f"Current Z-position: {z_position}")
+        self.hot_logger.debug("Current Z-position: %s", z_position)
         return z_position
 
     def move_to(self, x, y, z):
@@ -51,8 +57,78 @@ class MockController:
         self.status = "Idle"
         self.logger.info(f"Z-axis reached position: {z}")
 
+    def move(self, x, y, z):
+        """
+        Move to a single point; used by ScanManager when a line is driven point by point.
+        """
+        self.move_to(x, y, z)
+
+    def execute_line(self, xs, ys):
+        """
+        Move along a whole scan line in one call and return the measured Z values.
+        :param xs: X coordinates of the line.
+        :param ys: Y coordinates of the line.
+        :return: NumPy array with one Z value per point.
+        """
+        if not self.connected:
+            self.logger.error("Attempted to move while device is not connected.")
+            raise ConnectionError("Mock device is not connected.")
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if xs.shape != ys.shape or xs.ndim != 1:
+            raise ValueError("Line coordinates must be 1D arrays of equal length.")
+        if len(xs) == 0:
+            return np.empty(0, dtype=np.float64)
+        if xs.min() < 0 or xs.max() > self.scanner_limits["x"] or ys.min() < 0 or ys.max() > self.scanner_limits["y"]:
+            self.logger.error(f"Scan line exceeds scanner limits: {self.scanner_limits}")
+            raise ValueError(f"Scan line exceeds scanner limits: {self.scanner_limits}")
+        if self.move_latency:
+            time.sleep(self.move_latency)
+        z = self.position[2]
+        self.position = (float(xs[-1]), float(ys[-1]), z)
+        self.hot_logger.debug("Executed scan line of %d points, now at %s", len(xs), self.position)
+        return np.full(len(xs), z, dtype=np.float64)
+
+    def read_channels(self, names, xs, ys):
+        """
+        Read signal channels for the points of the last executed line.
+        "topography" returns the Z-position; other channels return channel_values.
+        :param names: Channel names to read.
+        :param xs: X coordinates of the points.
+        :param ys: Y coordinates of the points.
+        :return: Dict mapping channel names to NumPy arrays.
+        """
+        values = {}
+        for name in names:
+            if name == "topography":
+                value = self.position[2]
+            elif name in self.channel_values:
+                value = self.channel_values[name]
+            else:
+                self.logger.error(f"Unsupported channel: {name}")
+                raise ValueError(f"Unsupported channel: {name}")
+            values[name] = np.full(len(xs), value, dtype=np.float64)
+        return values
+
+    def get_motion_model(self):
+        """Return the timing model used by the ScanEstimator: one move command per scan line."""
+        return MotionModel(move_latency=self.move_latency, batched_lines=True)
+
+    def get_state(self):
+        """Return the device state as a JSON-serializable dict, e.g. for scan checkpoints."""
+        return {"position": list(self.position), "scanner_size": self.scanner_size}
+
+    def restore_state(self, state):
+        """Restore a device state returned by get_state."""
+        if "scanner_size" in state and state["scanner_size"] != self.scanner_size:
+            self.scanner_size = state["scanner_size"]
+            self.configure_scanner_size()
+        if "position" in state:
+            self.position = tuple(state["position"])
+        self.logger.info(f"Mock device state restored: {state}")
+
     def get_status(self):
-        self.logger.debug(f"Current status: {self.status}")
+        self.hot_logger.debug("Current status: %s", self.status)
         return self.status
 
     def connect(self):
@@ -83,5 +159,7 @@ class MockController:
         if not (0 <= z <= self.scanner_limits["z"]):
             self.logger.error(f"Target Z-position ({z}) exceeds Z-axis limit: {self.scanner_limits['z']}")
             raise ValueError(f"Target Z-position ({z}) exceeds Z-axis limit: {self.scanner_limits['z']}")
-        self.logger.info(f"Moving to position ({x}, {y}, {z})...")
+        self.hot_logger.debug("Moving to position (%s, %s, %s)", x, y, z)
+        if self.move_latency:
+            time.sleep(self.move_latency)
         self.position = (x, y, z)
\ No newline at end of file
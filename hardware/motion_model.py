@@ -0,0 +1,31 @@
+# File: hardware/motion_model.py
+
+
+class MotionModel:
+    """
+    Timing model of a motion controller.
+    Axes are assumed to move one after another, so the travel between two points
+    is |dx| + |dy|.
+    """
+
+    def __init__(self, seconds_per_unit=0.0, move_latency=0.0, batched_lines=True):
+        """
+        Initialize the MotionModel.
+        :param seconds_per_unit: Travel time per unit of distance.
+        :param move_latency: Fixed time per move command.
+        :param batched_lines: True if scan lines are moved with execute_line, one command
+                              per line or per chunk of a line, False if every point is a
+                              separate move.
+        """
+        self.seconds_per_unit = seconds_per_unit
+        self.move_latency = move_latency
+        self.batched_lines = batched_lines
+
+    def motion_time(self, travel, num_moves) -> float:
+        """
+        Return the time spent moving.
+        :param travel: Total travel distance.
+        :param num_moves: Number of move commands.
+        :return: Time in seconds.
+        """
+        return self.seconds_per_unit * travel + self.move_latency * num_moves
@@ -1,9 +1,12 @@
 import time
+from hardware.motion_model import MotionModel
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class StepperMotor:
+    SECONDS_PER_UNIT = 0.01  # Simulated travel time per unit of distance
+
     def __init__(self, step_size=1.0, max_position=100.0):
         """
         Initialize the StepperMotor with default parameters.
@@ -23,7 +26,7 @@ class StepperMotor:
             raise ValueError(f"Target position {target_position} is out of range (0 to {self.max_position}).")
         
         logger.info(f"Moving stepper motor to position {target_position}...")
-        time.sleep(abs(target_position - self.current_position) * 0.01)  # Simulate movement time
+        time.sleep(abs(target_position - self.current_position) * self.SECONDS_PER_UNIT)  # Simulate movement time
         self.current_position = target_position
         logger.info(f"Stepper motor moved to position {self.current_position}")
 
@@ -43,7 +46,7 @@ class StepperMotor:
             raise ValueError(f"Step movement out of range. Current position: {self.current_position}, Target: {target_position}")
         
         logger.info(f"Stepping motor by {steps} steps...")
-        time.sleep(abs(steps) * 0.01)  # Simulate movement time
+        time.sleep(abs(steps) * self.SECONDS_PER_UNIT)  # Simulate movement time
         self.current_position = target_position
         logger.info(f"Stepper motor stepped to position {self.current_position}")
 
@@ -54,6 +57,13 @@ class StepperMotor:
         """
         return self.current_position
 
+    def get_motion_model(self):
+        """
+        Get the timing model used by the ScanEstimator.
+        :return: A MotionModel with the simulated travel time per unit.
+        """
+        return MotionModel(seconds_per_unit=self.SECONDS_PER_UNIT)
+
     def reset(self):
         """
         Reset the stepper motor to its initial position (0.0).
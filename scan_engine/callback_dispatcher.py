@@ -0,0 +1,105 @@
+# File: scan_engine/callback_dispatcher.py
+
+import time
+import numpy as np
+from utils.logger import get_logger
+
+
+class CallbackDispatcher:
+    """
+    Coalesces per-point scan events before they reach user callbacks.
+    Progress is delivered at most progress_rate times per second and logged
+    points are delivered as (n, 3) NumPy blocks of x, y, z. The final
+    progress update and the last points are always delivered by finish().
+    """
+
+    def __init__(self, progress_callback=None, data_logger=None, progress_rate=20.0, log_interval=0.1,
+                 clock=time.monotonic):
+        """
+        Initialize the CallbackDispatcher.
+        :param progress_callback: Callable receiving (percent, current_position={"x", "y", "z"}).
+        :param data_logger: Callable receiving an (n, 3) array of logged x, y, z points.
+        :param progress_rate: Maximum progress updates per second.
+        :param log_interval: Minimum time in seconds between two data_logger calls.
+        :param clock: Monotonic clock used for rate limiting.
+        """
+        if progress_rate <= 0:
+            raise ValueError("Progress rate must be positive.")
+        if log_interval < 0:
+            raise ValueError("Log interval must be non-negative.")
+        self.progress_callback = progress_callback
+        self.data_logger = data_logger
+        self.progress_interval = 1.0 / progress_rate
+        self.log_interval = log_interval
+        self.clock = clock
+        self.logger = get_logger(__name__)
+        self.begin(0)
+
+    def begin(self, total_points: int, points_done: int = 0) -> None:
+        """
+        Reset the dispatcher for a new scan.
+        :param total_points: Exact number of points of the scan.
+        :param points_done: Points already acquired, e.g. when a scan is resumed.
+        """
+        self.total_points = total_points
+        self.points_done = points_done
+        self._pending = []
+        self._last_position = None
+        self._last_progress_time = None
+        self._last_log_time = self.clock()
+
+    def add_line(self, xs, ys, zs) -> None:
+        """
+        Record a finished line (or chunk of a line).
+        :param xs: X coordinates.
+        :param ys: Y coordinates.
+        :param zs: Measured Z values.
+        """
+        if len(xs) == 0:
+            return
+        self.points_done += len(xs)
+        self._last_position = {"x": float(xs[-1]), "y": float(ys[-1]), "z": float(zs[-1])}
+        if self.data_logger:
+            self._pending.append((xs, ys, zs))
+
+        now = self.clock()
+        if self.progress_callback and (
+            self._last_progress_time is None or now - self._last_progress_time >= self.progress_interval
+        ):
+            self._emit_progress(now)
+        if self.data_logger and now - self._last_log_time >= self.log_interval:
+            self._flush(now)
+
+    def finish(self, completed=True) -> None:
+        """
+        Deliver everything still pending.
+        :param completed: True if the scan completed, which always reports 100%.
+        """
+        now = self.clock()
+        if self.data_logger:
+            self._flush(now)
+        if self.progress_callback and self._last_position is not None:
+            if completed:
+                self.points_done = self.total_points
+            self._emit_progress(now)
+
+    def _emit_progress(self, now):
+        """
+        Call the progress callback with the current percentage.
+        """
+        self._last_progress_time = now
+        percent = int((self.points_done / self.total_points) * 100) if self.total_points else 100
+        self.progress_callback(percent, current_position=self._last_position)
+
+    def _flush(self, now):
+        """
+        Deliver all pending points to the data logger as one block.
+        """
+        self._last_log_time = now
+        if not self._pending:
+            return
+        block = np.column_stack([
+            np.concatenate([line[i] for line in self._pending]) for i in range(3)
+        ])
+        self._pending = []
+        self.data_logger(block)
@@ -0,0 +1,151 @@
+# File: scan_engine/checkpoint.py
+
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from utils.logger import get_logger
+
+
+class ScanCheckpoint:
+    """
+    Append-only, line-granular checkpoint file for long scans.
+
+    Layout: an 8-byte magic, a length-prefixed JSON header (trajectory pattern and
+    parameters, column names, controller state) and one record per completed line.
+    Every record carries its line index, a CRC32 and the line's columns in
+    acquisition order, followed by an optional JSON controller state. A record cut
+    short by a crash fails its length or CRC check and is discarded on resume.
+    """
+
+    MAGIC = b"SPMCKPT1"
+    _HEADER_LENGTH = struct.Struct("<I")
+    _RECORD = struct.Struct("<qIII")  # line_index, data_bytes, state_bytes, crc32
+
+    def __init__(self, path, file, header, fsync=True):
+        """
+        Initialize the ScanCheckpoint. Use create() or resume() instead.
+        :param path: Path of the checkpoint file.
+        :param file: Binary file object opened for appending.
+        :param header: Decoded header dictionary.
+        :param fsync: Flush every record to disk before returning.
+        """
+        self.path = path
+        self.header = header
+        self.fsync = fsync
+        self._file = file
+        self.logger = get_logger(__name__)
+
+    @classmethod
+    def create(cls, path, trajectory, columns, controller_state=None, fsync=True):
+        """
+        Create a new checkpoint file, replacing any existing one.
+        :param path: Path of the checkpoint file.
+        :param trajectory: Trajectory being scanned; its pattern, parameters and drift
+                           compensation are stored.
+        :param columns: Names of the scan buffer columns stored per line.
+        :param controller_state: JSON-serializable controller state at scan start.
+        :param fsync: Flush every record to disk before returning.
+        :return: The ScanCheckpoint, ready for append_line.
+        """
+        header = {
+            "pattern": trajectory.pattern,
+            "parameters": trajectory.parameters,
+            "offset": trajectory.offset,
+            "drift_per_line": trajectory.drift_per_line,
+            "columns": list(columns),
+            "num_lines": trajectory.num_lines,
+            "num_points": trajectory.num_points,
+            "controller_state": controller_state,
+        }
+        encoded = json.dumps(header, default=_to_json).encode("utf-8")
+        file = open(path, "wb")
+        file.write(cls.MAGIC + cls._HEADER_LENGTH.pack(len(encoded)) + encoded)
+        checkpoint = cls(path, file, header, fsync)
+        checkpoint._sync()
+        return checkpoint
+
+    @classmethod
+    def read(cls, path):
+        """
+        Read a checkpoint file.
+        :param path: Path of the checkpoint file.
+        :return: (header, lines, valid_size) where lines is a list of
+                 (line_index, data, controller_state) for every intact record and
+                 valid_size is the file offset just after the last intact record.
+        """
+        with open(path, "rb") as file:
+            content = file.read()
+        if content[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError(f"Not a scan checkpoint file: {path}")
+        offset = len(cls.MAGIC)
+        (header_length,) = cls._HEADER_LENGTH.unpack_from(content, offset)
+        offset += cls._HEADER_LENGTH.size
+        header = json.loads(content[offset:offset + header_length].decode("utf-8"))
+        offset += header_length
+        num_columns = len(header["columns"])
+
+        lines = []
+        while offset + cls._RECORD.size <= len(content):
+            line_index, data_bytes, state_bytes, crc = cls._RECORD.unpack_from(content, offset)
+            start = offset + cls._RECORD.size
+            end = start + data_bytes + state_bytes
+            if end > len(content) or zlib.crc32(content[start:end]) != crc:
+                break
+            data = np.frombuffer(content[start:start + data_bytes], dtype=np.float64).reshape(num_columns, -1)
+            state = json.loads(content[start + data_bytes:end].decode("utf-8")) if state_bytes else None
+            lines.append((line_index, data, state))
+            offset = end
+        return header, lines, offset
+
+    @classmethod
+    def resume(cls, path, fsync=True):
+        """
+        Open an existing checkpoint for appending, dropping a partially written last record.
+        :param path: Path of the checkpoint file.
+        :param fsync: Flush every record to disk before returning.
+        :return: (checkpoint, lines) where lines is as returned by read().
+        """
+        header, lines, valid_size = cls.read(path)
+        file_size = os.path.getsize(path)
+        file = open(path, "r+b")
+        file.truncate(valid_size)
+        file.seek(valid_size)
+        checkpoint = cls(path, file, header, fsync)
+        if valid_size < file_size:
+            checkpoint.logger.warning(f"Discarded {file_size - valid_size} bytes of an incomplete record in {path}.")
+        return checkpoint, lines
+
+    def append_line(self, line_index, line_data, controller_state=None) -> None:
+        """
+        Append a completed line.
+        :param line_index: Index of the line on the trajectory.
+        :param line_data: (n_columns, n) array of the line in acquisition order.
+        :param controller_state: Optional JSON-serializable controller state after the line.
+        """
+        data = np.ascontiguousarray(line_data, dtype=np.float64).tobytes()
+        state = json.dumps(controller_state).encode("utf-8") if controller_state is not None else b""
+        payload = data + state
+        self._file.write(self._RECORD.pack(line_index, len(data), len(state), zlib.crc32(payload)) + payload)
+        self._sync()
+
+    def close(self) -> None:
+        """Close the checkpoint file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _sync(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+
+def _to_json(value):
+    """
+    Encode NumPy values in checkpoint headers, e.g. the points of a point-list trajectory.
+    """
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Cannot store {type(value).__name__} in a scan checkpoint.")
@@ -0,0 +1,282 @@
+# File: scan_engine/drift.py
+
+import numpy as np
+from utils.logger import get_logger
+
+
+def phase_correlation(reference, image, upsample=20, window=True, max_iterations=8):
+    """
+    Estimate the translation of image relative to reference by FFT phase correlation.
+    The integer peak of the cross-power spectrum is found first; the overlapping parts
+    of both images are then correlated again and that peak is refined to 1/upsample
+    pixel with a local upsampled DFT (Guizar-Sicairos et al., 2008).
+    On smooth images the window still pulls that peak towards zero shift, because
+    the common window envelope dominates the correlation. The shift is therefore
+    polished by Gauss-Newton steps: the reference is resampled at the current shift
+    over the overlap (cubic convolution) and the residual shift is the least-squares
+    fit of the difference to the reference gradients, which involves no window.
+    :param reference: 2D reference image.
+    :param image: 2D image of the same shape; NaN pixels (unscanned lines) are ignored.
+    :param upsample: Sub-pixel resolution factor; 1 gives whole pixels.
+    :param window: Apply a Hann window so that non-periodic edges do not dominate.
+    :param max_iterations: Maximum number of Gauss-Newton steps.
+    :return: (row_shift, col_shift) such that image(r, c) ~= reference(r - row_shift, c - col_shift).
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    image = np.asarray(image, dtype=np.float64)
+    if reference.shape != image.shape:
+        raise ValueError("Reference and image must have the same shape.")
+    shifts = _correlate(reference, image, 1, window)
+    if upsample <= 1:
+        return float(shifts[0]), float(shifts[1])
+
+    aligned, overlap = _align(reference, image, shifts)
+    if min(overlap.shape) < 4:
+        return float(shifts[0]), float(shifts[1])
+    shifts = shifts + _correlate(aligned, overlap, upsample, window)
+
+    error = _mean_square_difference(*_align(reference, image, shifts))
+    for _ in range(max_iterations):
+        aligned, overlap = _align(reference, image, shifts)
+        if min(aligned.shape) < 4:
+            break
+        row_gradient, col_gradient = np.gradient(aligned)
+        difference = overlap - aligned
+        valid = ~(np.isnan(difference) | np.isnan(row_gradient) | np.isnan(col_gradient))
+        if valid.sum() < 16:
+            break
+        gradients = np.column_stack((row_gradient[valid], col_gradient[valid]))
+        # image ~= aligned - step . gradient for a remaining shift step
+        step = -np.linalg.lstsq(gradients, difference[valid], rcond=None)[0]
+        step = np.clip(step, -1.0, 1.0)
+        candidate = shifts + step
+        candidate_error = _mean_square_difference(*_align(reference, image, candidate))
+        if not candidate_error < error:
+            break
+        shifts, error = candidate, candidate_error
+        if np.all(np.abs(step) < 0.1 / upsample):
+            break
+    return float(shifts[0]), float(shifts[1])
+
+
+def _mean_square_difference(aligned, overlap):
+    """
+    Mean squared difference of two aligned images over their valid pixels (inf if none).
+    """
+    difference = overlap - aligned
+    valid = ~np.isnan(difference)
+    return float(np.mean(difference[valid] ** 2)) if valid.any() else np.inf
+
+
+def _align(reference, image, shifts):
+    """
+    Resample the reference at (r - row_shift, c - col_shift) with Catmull-Rom cubic
+    convolution and crop both images to the pixels where that is defined.
+    :return: (aligned_reference, image_crop) of equal shape.
+    """
+    for axis, shift in enumerate(shifts):
+        length = reference.shape[axis]
+        base = int(np.floor(-shift))
+        f = -shift - base
+        taps = ((-f ** 3 + 2 * f ** 2 - f) / 2, (3 * f ** 3 - 5 * f ** 2 + 2) / 2,
+                (-3 * f ** 3 + 4 * f ** 2 + f) / 2, (f ** 3 - f ** 2) / 2)
+        # Output index i reads reference[i + base - 1 .. i + base + 2]
+        start, end = max(0, 1 - base), min(length, length - 2 - base)
+        if end <= start:
+            return reference[:0, :0], image[:0, :0]
+        count = end - start
+        resampled = 0.0
+        for k, tap in enumerate(taps):
+            first = start + base - 1 + k
+            resampled = resampled + tap * np.take(reference, np.arange(first, first + count), axis=axis)
+        reference = resampled
+        image = np.take(image, np.arange(start, end), axis=axis)
+    return reference, image
+
+
+def _correlate(reference, image, upsample, window):
+    """
+    Return the (row, col) shift of image relative to reference at 1/upsample pixel.
+    """
+    product = np.fft.fft2(_prepare(image, window)) * np.conj(np.fft.fft2(_prepare(reference, window)))
+    # Whiten the spectrum, but leave bins far below the peak (numerical noise for smooth
+    # images) attenuated instead of amplifying them to unit weight
+    magnitude = np.abs(product)
+    product /= magnitude + 1e-6 * magnitude.max() + 1e-300
+
+    correlation = np.abs(np.fft.ifft2(product))
+    peak = np.array(np.unravel_index(np.argmax(correlation), correlation.shape), dtype=np.float64)
+    shape = np.array(correlation.shape, dtype=np.float64)
+    shifts = np.where(peak > shape // 2, peak - shape, peak)
+    if upsample <= 1:
+        return shifts
+
+    # Evaluate the correlation on a 1.5 x 1.5 pixel region around the peak at 1/upsample spacing
+    shifts = np.round(shifts * upsample) / upsample
+    region = int(np.ceil(upsample * 1.5))
+    center = np.fix(region / 2.0)
+    offsets = center - shifts * upsample
+    local = np.abs(_upsampled_dft(product, region, upsample, offsets))
+    maximum = np.array(np.unravel_index(np.argmax(local), local.shape), dtype=np.float64) - center
+    return shifts + maximum / upsample
+
+
+def _prepare(image, window):
+    """
+    Replace NaN pixels by the image mean, remove the mean and optionally apply a Hann window.
+    """
+    image = np.array(image, dtype=np.float64)
+    if image.ndim != 2:
+        raise ValueError("Images must be 2D.")
+    valid = ~np.isnan(image)
+    if not valid.any():
+        raise ValueError("Image contains no data.")
+    image[~valid] = image[valid].mean()
+    image -= image.mean()
+    if window:
+        image *= np.outer(np.hanning(image.shape[0]), np.hanning(image.shape[1]))
+    return image
+
+
+def _upsampled_dft(spectrum, region, upsample, offsets):
+    """
+    Inverse DFT of spectrum evaluated on a region x region grid of spacing 1/upsample
+    starting at -offsets / upsample, by two matrix products.
+    """
+    data = spectrum
+    # Columns first: each product contracts the last axis and puts the result first
+    for size, offset in ((spectrum.shape[1], offsets[1]), (spectrum.shape[0], offsets[0])):
+        kernel = np.exp(2j * np.pi * (np.arange(region) - offset)[:, np.newaxis] * np.fft.fftfreq(size, upsample))
+        data = np.tensordot(kernel, data, axes=(1, -1))
+    return data
+
+
+class DriftTracker:
+    """
+    Tracks sample drift over repeated scans of the same area.
+    Every new frame (or block of lines) is phase-correlated with the previous frame.
+    The measured shifts, corrected for the scan offset that was applied, give the
+    drift position over time, whose least-squares slope over the recent history is
+    the drift velocity. apply() feeds the predicted drift back into a TrajectoryPlanner
+    as an offset, so that following frames stay registered.
+    """
+
+    def __init__(self, pixel_size=(1.0, 1.0), upsample=20, history=8):
+        """
+        Initialize the DriftTracker.
+        :param pixel_size: (x, y) size of a pixel in scan units.
+        :param upsample: Sub-pixel resolution factor of the phase correlation.
+        :param history: Number of recent measurements used for the velocity fit.
+        """
+        if history < 2:
+            raise ValueError("The velocity fit needs a history of at least 2 measurements.")
+        self.pixel_size = np.asarray(pixel_size, dtype=np.float64)
+        self.upsample = upsample
+        self.history = history
+        self.logger = get_logger(__name__)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the reference frame and the drift history."""
+        self.reference = None
+        self._reference_position = np.zeros(2)
+        self._reference_offset = np.zeros(2)
+        self._times = []
+        self._positions = []
+
+    @property
+    def position(self) -> np.ndarray:
+        """Latest measured (x, y) drift in scan units, relative to the first frame."""
+        return self._positions[-1].copy() if self._positions else np.zeros(2)
+
+    @property
+    def velocity(self) -> np.ndarray:
+        """(x, y) drift velocity in scan units per second (zero until two measurements exist)."""
+        if len(self._times) < 2:
+            return np.zeros(2)
+        times = np.asarray(self._times[-self.history:])
+        positions = np.asarray(self._positions[-self.history:])
+        centered = times - times.mean()
+        denominator = (centered * centered).sum()
+        if denominator == 0:
+            return np.zeros(2)
+        return (centered[:, np.newaxis] * (positions - positions.mean(axis=0))).sum(axis=0) / denominator
+
+    def update(self, frame, timestamp, offset=(0.0, 0.0)):
+        """
+        Add a new frame. The first frame becomes the reference.
+        :param frame: 2D image of the frame.
+        :param timestamp: Acquisition time of the frame (e.g. its mid-time), in seconds.
+        :param offset: (x, y) scan offset the frame was acquired with.
+        :return: (x, y) drift in scan units since the first frame, or None for the first frame.
+        """
+        frame = np.asarray(frame, dtype=np.float64)
+        offset = np.asarray(offset, dtype=np.float64)
+        if self.reference is None:
+            self.reference = frame.copy()
+            self._reference_offset = offset
+            self._record(timestamp, self._reference_position)
+            return None
+        position = self._measure(self.reference, frame, offset)
+        self.reference = frame.copy()
+        self._reference_position = position
+        self._reference_offset = offset
+        return self._record(timestamp, position)
+
+    def update_block(self, block, start_row, timestamp, offset=(0.0, 0.0)):
+        """
+        Add a block of lines of a frame in progress. The block is correlated with the
+        same rows of the reference frame, so drift is measured before the frame ends.
+        :param block: 2D array of consecutive image rows.
+        :param start_row: Image row of the first line of the block.
+        :param timestamp: Acquisition time of the block, in seconds.
+        :param offset: (x, y) scan offset the block was acquired with.
+        :return: (x, y) drift in scan units since the first frame.
+        """
+        if self.reference is None:
+            self.logger.error("Drift tracking needs a reference frame before blocks of lines.")
+            raise RuntimeError("Drift tracking needs a reference frame before blocks of lines.")
+        block = np.asarray(block, dtype=np.float64)
+        reference = self.reference[start_row:start_row + block.shape[0]]
+        position = self._measure(reference, block, np.asarray(offset, dtype=np.float64))
+        return self._record(timestamp, position)
+
+    def predict(self, timestamp) -> np.ndarray:
+        """
+        Predict the (x, y) drift at a time by extrapolating the latest position.
+        :param timestamp: Time in seconds.
+        :return: (x, y) drift in scan units.
+        """
+        if not self._times:
+            return np.zeros(2)
+        return self._positions[-1] + self.velocity * (timestamp - self._times[-1])
+
+    def apply(self, planner, timestamp, line_duration=0.0) -> None:
+        """
+        Set the drift compensation of a TrajectoryPlanner for a scan starting at timestamp.
+        :param planner: The TrajectoryPlanner.
+        :param timestamp: Start time of the next scan, in seconds.
+        :param line_duration: Expected duration of one scan line, in seconds. When given,
+                              the drift during the scan is compensated line by line.
+        """
+        planner.set_drift(self.predict(timestamp + line_duration / 2).tolist(), (self.velocity * line_duration).tolist())
+        self.logger.debug(f"Drift compensation: offset {planner.offset}, per line {planner.drift_per_line}.")
+
+    def _measure(self, reference, image, offset):
+        """
+        Return the drift position of image given the reference it is correlated with.
+        """
+        row_shift, col_shift = phase_correlation(reference, image, self.upsample)
+        shift = np.array([col_shift, row_shift]) * self.pixel_size
+        # The sample moved by the measured shift plus the change of the scan offset
+        return self._reference_position + shift + (offset - self._reference_offset)
+
+    def _record(self, timestamp, position):
+        """
+        Store a measurement and return the position.
+        """
+        self._times.append(float(timestamp))
+        self._positions.append(np.asarray(position, dtype=np.float64))
+        del self._times[:-self.history]
+        del self._positions[:-self.history]
+        return self.position
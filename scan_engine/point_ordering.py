@@ -0,0 +1,287 @@
+# File: scan_engine/point_ordering.py
+
+import numpy as np
+from utils.logger import get_logger
+
+
+class PointOrderer:
+    """
+    Orders arbitrary measurement sites to shorten stage travel.
+    A space-filling curve (Hilbert or Morton) or a nearest-neighbour tour gives the
+    initial order, which is then improved by a windowed 2-opt that reverses path
+    segments of bounded length. Everything except the nearest-neighbour walk is
+    vectorized, and the walk searches a k-d tree, so 100k points are ordered in seconds.
+    """
+
+    METHODS = ("hilbert", "morton", "nearest_neighbor", "none")
+    LEAF_POINTS = 16  # Points per leaf of the nearest-neighbour k-d tree
+
+    def __init__(self, metric="manhattan"):
+        """
+        Initialize the PointOrderer.
+        :param metric: "manhattan" (axes move one after another, as on StepperMotor stages)
+                       or "euclidean" (axes move together).
+        """
+        if metric not in ("manhattan", "euclidean"):
+            raise ValueError(f"Invalid distance metric: {metric}")
+        self.metric = metric
+        self.logger = get_logger(__name__)
+
+    def order(self, points, method="hilbert", improve=True, max_segment=64, max_passes=8) -> np.ndarray:
+        """
+        Compute a visiting order.
+        :param points: (N, 2) array of XY coordinates.
+        :param method: One of "hilbert", "morton", "nearest_neighbor", or "none" to keep the
+                       given order.
+        :param improve: Refine the order with the windowed 2-opt; never applied with "none".
+        :param max_segment: Longest segment the 2-opt reverses.
+        :param max_passes: Maximum number of 2-opt passes.
+        :return: Permutation of range(N).
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise ValueError("Points must be an (N, 2) array.")
+        if method == "hilbert":
+            order = self.hilbert(points)
+        elif method == "morton":
+            order = self.morton(points)
+        elif method == "nearest_neighbor":
+            order = self.nearest_neighbor(points)
+        elif method == "none":
+            order = np.arange(len(points))
+        else:
+            self.logger.error(f"Invalid ordering method: {method}")
+            raise ValueError(f"Invalid ordering method: {method}")
+        if improve and method != "none":
+            order = self.two_opt(points, order, max_segment, max_passes)
+        return order
+
+    def path_length(self, points, order=None) -> float:
+        """
+        Return the travel distance of visiting the points in order.
+        :param points: (N, 2) array of XY coordinates.
+        :param order: Visiting order, or None for the given order.
+        :return: Total distance.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if order is not None:
+            points = points[order]
+        return float(self._distance(points[:-1], points[1:]).sum())
+
+    def hilbert(self, points, bits=16) -> np.ndarray:
+        """
+        Order points along a Hilbert curve over their bounding box.
+        :param points: (N, 2) array of XY coordinates.
+        :param bits: Curve resolution per axis.
+        :return: Permutation of range(N).
+        """
+        x, y = self._quantize(points, bits)
+        d = np.zeros(len(points), dtype=np.int64)
+        s = 1 << (bits - 1)
+        while s > 0:
+            rx = (x & s) > 0
+            ry = (y & s) > 0
+            d += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+            # Rotate the quadrant so the sub-curve has the right orientation
+            flip = ~ry & rx
+            x[flip] = s - 1 - (x[flip] & (s - 1))
+            y[flip] = s - 1 - (y[flip] & (s - 1))
+            swap = ~ry
+            x[swap], y[swap] = y[swap], x[swap].copy()
+            s >>= 1
+        return np.argsort(d, kind="stable")
+
+    def morton(self, points, bits=16) -> np.ndarray:
+        """
+        Order points along a Morton (Z-order) curve over their bounding box.
+        :param points: (N, 2) array of XY coordinates.
+        :param bits: Curve resolution per axis (at most 16).
+        :return: Permutation of range(N).
+        """
+        x, y = self._quantize(points, min(bits, 16))
+        return np.argsort(self._spread_bits(x) | (self._spread_bits(y) << 1), kind="stable")
+
+    def nearest_neighbor(self, points, start=0) -> np.ndarray:
+        """
+        Greedy nearest-neighbour tour. The points are held in a k-d tree whose leaves
+        hold at most LEAF_POINTS points, split at the median of the wider axis, so it
+        adapts to clusters, outliers and points along lines. Every node counts its
+        unvisited points, so visited parts of the tree are skipped by the search.
+        :param points: (N, 2) array of XY coordinates.
+        :param start: Index of the first point.
+        :return: Permutation of range(N).
+        """
+        count = len(points)
+        if count == 0:
+            return np.arange(0)
+        tree = _PointTree(points, self.LEAF_POINTS)
+        order = np.empty(count, dtype=np.int64)
+        current = start
+        for step in range(count):
+            order[step] = current
+            tree.remove(current)
+            if step < count - 1:
+                current = tree.nearest(current, self.metric == "manhattan")
+        return order
+
+    def two_opt(self, points, order, max_segment=64, max_passes=8) -> np.ndarray:
+        """
+        Improve an open path by reversing segments of at most max_segment points.
+        Every pass evaluates all segments of each length at once and applies the
+        non-overlapping improving reversals, best first.
+        :param points: (N, 2) array of XY coordinates.
+        :param order: Initial visiting order.
+        :param max_segment: Longest segment that is reversed.
+        :param max_passes: Maximum number of passes.
+        :return: Improved permutation; the path is never longer than the initial one.
+        """
+        order = np.array(order, dtype=np.int64)
+        count = len(order)
+        for _ in range(max_passes):
+            improved = False
+            for length in range(2, min(max_segment, count - 2) + 1):
+                x, y = points[order, 0], points[order, 1]
+                edges = self._distance_xy(x[:-1], y[:-1], x[1:], y[1:])
+                # Reversing order[i:j + 1], j = i + length - 1, replaces the edges (i-1, i) and
+                # (j, j+1) by (i-1, j) and (i, j+1); a, b, c, d are slices over all i at once
+                last = count - length
+                ax, ay, bx, by = x[:last - 1], y[:last - 1], x[1:last], y[1:last]
+                cx, cy, dx, dy = x[length:count - 1], y[length:count - 1], x[length + 1:], y[length + 1:]
+                gain = edges[:last - 1] + edges[length:] - self._distance_xy(ax, ay, cx, cy) \
+                    - self._distance_xy(bx, by, dx, dy)
+                candidates = np.flatnonzero(gain > 1e-12)
+                if len(candidates) == 0:
+                    continue
+                taken = np.zeros(count + 1, dtype=bool)
+                for k in candidates[np.argsort(-gain[candidates], kind="stable")].tolist():
+                    start = k + 1
+                    if taken[start - 1:start + length + 1].any():
+                        continue
+                    taken[start - 1:start + length + 1] = True
+                    order[start:start + length] = order[start:start + length][::-1]
+                    improved = True
+            if not improved:
+                break
+        return order
+
+    def _distance(self, a, b):
+        """
+        Distance between matching rows of two (n, 2) coordinate arrays.
+        """
+        return self._distance_xy(a[..., 0], a[..., 1], b[..., 0], b[..., 1])
+
+    def _distance_xy(self, ax, ay, bx, by):
+        """
+        Distance between matching points given as separate coordinate arrays.
+        """
+        if self.metric == "manhattan":
+            return np.abs(ax - bx) + np.abs(ay - by)
+        return np.hypot(ax - bx, ay - by)
+
+    @staticmethod
+    def _quantize(points, bits):
+        """
+        Map points onto an integer grid of 2**bits cells per axis over their bounding box.
+        """
+        low = points.min(axis=0)
+        extent = np.maximum(points.max(axis=0) - low, 1e-12)
+        scaled = (points - low) / extent.max() * ((1 << bits) - 1)
+        grid = np.rint(scaled).astype(np.int64)
+        return grid[:, 0].copy(), grid[:, 1].copy()
+
+    @staticmethod
+    def _spread_bits(values):
+        """
+        Insert a zero bit between the lower 16 bits of every value.
+        """
+        values = values & 0xFFFF
+        values = (values | (values << 8)) & 0x00FF00FF
+        values = (values | (values << 4)) & 0x0F0F0F0F
+        values = (values | (values << 2)) & 0x33333333
+        values = (values | (values << 1)) & 0x55555555
+        return values
+
+
+class _PointTree:
+    """
+    Static k-d tree over points for repeated nearest-neighbour queries among the
+    points not removed yet. Nodes are stored in flat lists: the bounding box of the
+    node's points, its children (-1 for a leaf) and its count of remaining points.
+    """
+
+    def __init__(self, points, leaf_points):
+        self.points = points.tolist()
+        self.boxes = []
+        self.children = []
+        self.parent = []
+        self.remaining = []
+        self.leaf_members = {}  # Leaf node -> list of remaining point indices
+        self.leaf_of = np.empty(len(points), dtype=np.int64)
+        stack = [(np.arange(len(points)), -1, 0)]
+        while stack:
+            indices, parent, side = stack.pop()
+            node = len(self.boxes)
+            subset = points[indices]
+            low, high = subset.min(axis=0), subset.max(axis=0)
+            self.boxes.append((low[0], low[1], high[0], high[1]))
+            self.children.append([-1, -1])
+            self.parent.append(parent)
+            self.remaining.append(len(indices))
+            if parent >= 0:
+                self.children[parent][side] = node
+            if len(indices) <= leaf_points:
+                self.leaf_members[node] = indices.tolist()
+                self.leaf_of[indices] = node
+                continue
+            axis = int(np.argmax(high - low))
+            half = len(indices) // 2
+            split = np.argpartition(subset[:, axis], half)
+            stack.append((indices[split[half:]], node, 1))
+            stack.append((indices[split[:half]], node, 0))
+
+    def remove(self, index):
+        """Remove a point from the remaining points."""
+        node = int(self.leaf_of[index])
+        self.leaf_members[node].remove(index)
+        while node >= 0:
+            self.remaining[node] -= 1
+            node = self.parent[node]
+
+    def nearest(self, index, manhattan):
+        """
+        Return the remaining point nearest to point index, or None if none remain.
+        Distances are Manhattan, or squared Euclidean.
+        """
+        px, py = self.points[index]
+        boxes, children, remaining, points = self.boxes, self.children, self.remaining, self.points
+        best, best_distance = None, float("inf")
+        stack = [(0.0, 0)]
+        while stack:
+            bound, node = stack.pop()
+            if bound >= best_distance or remaining[node] == 0:
+                continue
+            left, right = children[node]
+            if left < 0:
+                for candidate in self.leaf_members[node]:
+                    qx, qy = points[candidate]
+                    if manhattan:
+                        distance = abs(qx - px) + abs(qy - py)
+                    else:
+                        distance = (qx - px) ** 2 + (qy - py) ** 2
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+                continue
+            bounds = []
+            for child in (left, right):
+                x0, y0, x1, y1 = boxes[child]
+                dx = x0 - px if px < x0 else (px - x1 if px > x1 else 0.0)
+                dy = y0 - py if py < y0 else (py - y1 if py > y1 else 0.0)
+                bounds.append(dx + dy if manhattan else dx * dx + dy * dy)
+            # The nearer child is searched first
+            if bounds[0] <= bounds[1]:
+                stack.append((bounds[1], right))
+                stack.append((bounds[0], left))
+            else:
+                stack.append((bounds[0], left))
+                stack.append((bounds[1], right))
+        return best
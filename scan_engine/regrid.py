@@ -0,0 +1,133 @@
+# File: scan_engine/regrid.py
+
+import numpy as np
+from utils.logger import get_logger
+
+
+class Regridder:
+    """
+    Resamples scattered scan samples (Lissajous, spiral, point lists) onto a regular
+    image grid. Pixel (row, col) sits at x = x_start + col * dx, y = y_start + row * dy,
+    with the first and last pixel on the edges of the range, as in a raster scan.
+    All methods are vectorized with np.bincount.
+    """
+
+    METHODS = ("bin", "bilinear")
+
+    def __init__(self, shape, x_range, y_range):
+        """
+        Initialize the Regridder.
+        :param shape: (rows, cols) of the image, both at least 2.
+        :param x_range: (x_start, x_end) covered by the image columns.
+        :param y_range: (y_start, y_end) covered by the image rows.
+        """
+        rows, cols = shape
+        if rows < 2 or cols < 2:
+            raise ValueError("The image needs at least 2 rows and 2 columns.")
+        if x_range[1] == x_range[0] or y_range[1] == y_range[0]:
+            raise ValueError("The image range must not be empty.")
+        self.shape = (int(rows), int(cols))
+        self.x_range = tuple(x_range)
+        self.y_range = tuple(y_range)
+        self.logger = get_logger(__name__)
+
+    def regrid(self, xs, ys, values, method="bilinear", fill_holes=True) -> np.ndarray:
+        """
+        Resample scattered samples onto the image grid.
+        :param xs: X coordinates of the samples.
+        :param ys: Y coordinates of the samples.
+        :param values: Sample values.
+        :param method: "bin" (mean of the samples nearest to each pixel) or "bilinear"
+                       (every sample is spread over its four surrounding pixels).
+        :param fill_holes: Fill pixels without samples from their neighbours.
+        :return: (rows, cols) float image; pixels without data are NaN.
+        """
+        if method == "bin":
+            image = self.bin(xs, ys, values)[0]
+        elif method == "bilinear":
+            image = self.bilinear(xs, ys, values)
+        else:
+            self.logger.error(f"Invalid regridding method: {method}")
+            raise ValueError(f"Invalid regridding method: {method}")
+        return self.fill_holes(image) if fill_holes else image
+
+    def bin(self, xs, ys, values):
+        """
+        Average the samples falling nearest to every pixel.
+        :return: (image, counts); pixels without samples are NaN in the image.
+        """
+        cols_f, rows_f = self._pixel_coordinates(xs, ys)
+        rows, cols = self.shape
+        col = np.rint(cols_f).astype(np.int64)
+        row = np.rint(rows_f).astype(np.int64)
+        inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+        flat = row[inside] * cols + col[inside]
+        values = np.asarray(values, dtype=np.float64)[inside]
+        sums = np.bincount(flat, weights=values, minlength=rows * cols)
+        counts = np.bincount(flat, minlength=rows * cols)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            image = sums / counts
+        return image.reshape(self.shape), counts.reshape(self.shape)
+
+    def bilinear(self, xs, ys, values) -> np.ndarray:
+        """
+        Spread every sample over its four surrounding pixels with bilinear weights and
+        normalize by the accumulated weight.
+        :return: (rows, cols) image; pixels that received no weight are NaN.
+        """
+        cols_f, rows_f = self._pixel_coordinates(xs, ys)
+        rows, cols = self.shape
+        inside = (cols_f >= 0) & (cols_f <= cols - 1) & (rows_f >= 0) & (rows_f <= rows - 1)
+        cols_f, rows_f = cols_f[inside], rows_f[inside]
+        values = np.asarray(values, dtype=np.float64)[inside]
+        col = np.minimum(cols_f.astype(np.int64), cols - 2)
+        row = np.minimum(rows_f.astype(np.int64), rows - 2)
+        fc, fr = cols_f - col, rows_f - row
+
+        flat = row * cols + col
+        indices = np.concatenate((flat, flat + 1, flat + cols, flat + cols + 1))
+        weights = np.concatenate(((1 - fr) * (1 - fc), (1 - fr) * fc, fr * (1 - fc), fr * fc))
+        total = np.bincount(indices, weights=weights, minlength=rows * cols)
+        sums = np.bincount(indices, weights=weights * np.tile(values, 4), minlength=rows * cols)
+        image = np.full(rows * cols, np.nan)
+        covered = total > 1e-9
+        image[covered] = sums[covered] / total[covered]
+        return image.reshape(self.shape)
+
+    @staticmethod
+    def fill_holes(image, max_iterations=64) -> np.ndarray:
+        """
+        Fill NaN pixels with the mean of their valid 8-neighbours, growing inwards
+        from the edges of the holes.
+        :param image: Image with NaN holes; not modified.
+        :param max_iterations: Maximum number of growth steps.
+        :return: Filled copy; holes further than max_iterations pixels from data stay NaN.
+        """
+        image = np.array(image, dtype=np.float64)
+        for _ in range(max_iterations):
+            holes = np.isnan(image)
+            if not holes.any() or holes.all():
+                break
+            valid = np.pad(~holes, 1).astype(np.float64)
+            padded = np.pad(np.where(holes, 0.0, image), 1)
+            sums = np.zeros_like(image)
+            counts = np.zeros_like(image)
+            rows, cols = image.shape
+            for dr in (0, 1, 2):
+                for dc in (0, 1, 2):
+                    sums += padded[dr:dr + rows, dc:dc + cols]
+                    counts += valid[dr:dr + rows, dc:dc + cols]
+            fillable = holes & (counts > 0)
+            image[fillable] = sums[fillable] / counts[fillable]
+        return image
+
+    def _pixel_coordinates(self, xs, ys):
+        """
+        Return the fractional column and row of every sample.
+        """
+        rows, cols = self.shape
+        x_start, x_end = self.x_range
+        y_start, y_end = self.y_range
+        cols_f = (np.asarray(xs, dtype=np.float64) - x_start) / (x_end - x_start) * (cols - 1)
+        rows_f = (np.asarray(ys, dtype=np.float64) - y_start) / (y_end - y_start) * (rows - 1)
+        return cols_f, rows_f
@@ -0,0 +1,229 @@
+# File: scan_engine/scan_buffer.py
+
+import numpy as np
+from utils.logger import get_logger
+
+
+class ScanBuffer:
+    """
+    Preallocated columnar storage for scan data.
+    Every column (x, y, z, timestamp and any extra channel) is a (rows, cols)
+    plane of one contiguous array laid out in image order, so the finished
+    image of a column is a plain view. Backward lines are written through
+    reversed views, which keeps acquisition order available per line.
+    Trace/retrace trajectories get a second plane per column for the retrace image.
+    """
+
+    BASE_COLUMNS = ("x", "y", "z", "timestamp")
+    DIRECTIONS = {"forward": 0, "trace": 0, "backward": 1, "retrace": 1}
+
+    def __init__(self, trajectory, channels=(), dtype=np.float64):
+        """
+        Initialize the ScanBuffer.
+        :param trajectory: Trajectory the buffer is sized from.
+        :param channels: Names of extra channels recorded next to x, y, z and timestamp.
+        :param dtype: Floating point type of the buffer.
+        """
+        self.logger = get_logger(__name__)
+        self.trajectory = trajectory
+        self.columns = self.BASE_COLUMNS + tuple(c for c in channels if c not in self.BASE_COLUMNS)
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+        rows, cols = trajectory.shape
+        self.data = np.full((len(self.columns), trajectory.num_passes, rows, cols), np.nan, dtype=dtype)
+        self.lines_completed = 0
+        self.points_written = 0
+        self.logger.debug(f"Allocated scan buffer {self.data.shape} ({self.data.nbytes} bytes).")
+
+    @property
+    def shape(self):
+        """(rows, cols) of every image plane."""
+        return self.data.shape[2:]
+
+    @property
+    def num_passes(self) -> int:
+        """Number of image planes per column."""
+        return self.data.shape[1]
+
+    def column(self, name: str, direction: str = "forward") -> np.ndarray:
+        """
+        Return a column as a (rows, cols) view.
+        :param name: Column name.
+        :param direction: "forward" (trace) or "backward" (retrace).
+        :return: 2D view into the buffer.
+        """
+        if name not in self._column_index:
+            self.logger.error(f"Unknown scan data column: {name}")
+            raise KeyError(f"Unknown scan data column: {name}")
+        if direction not in self.DIRECTIONS or self.DIRECTIONS[direction] >= self.num_passes:
+            self.logger.error(f"No {direction} image in this scan buffer.")
+            raise ValueError(f"No {direction} image in this scan buffer.")
+        return self.data[self._column_index[name], self.DIRECTIONS[direction]]
+
+    def image(self, channel: str = "z", direction: str = "forward") -> np.ndarray:
+        """
+        Return the image of a channel. No copy or reshape is made.
+        :param channel: Channel name, "z" by default.
+        :param direction: "forward" (trace) or "backward" (retrace) for trace/retrace scans.
+        :return: 2D view into the buffer.
+        """
+        return self.column(channel, direction)
+
+    def last_row(self, direction: str = "forward"):
+        """
+        Return the image row of the most recently completed line of a direction.
+        :param direction: "forward" (trace) or "backward" (retrace).
+        :return: Row index, or None if no such line has completed yet.
+        """
+        pass_index = self.DIRECTIONS[direction]
+        passes = self.trajectory.line_passes[:self.lines_completed]
+        completed = np.nonzero(passes == pass_index)[0]
+        if len(completed) == 0:
+            return None
+        return int(self.trajectory.line_rows[completed[-1]])
+
+    def line_view(self, line_index: int, column: str = None) -> np.ndarray:
+        """
+        Return a line in acquisition order as a view.
+        :param line_index: Index of the line on the trajectory.
+        :param column: Column name, or None for all columns as (n_columns, n) view.
+        :return: View into the buffer.
+        """
+        row = self.trajectory.line_rows[line_index]
+        plane = self.data[:, self.trajectory.line_passes[line_index]]
+        length = self.trajectory.line_offsets[line_index + 1] - self.trajectory.line_offsets[line_index]
+        if self.trajectory.directions[line_index] < 0:
+            cols = self.shape[1]
+            view = plane[:, row, cols - 1::-1] if length == cols else plane[:, row, cols - 1:cols - 1 - length:-1]
+        else:
+            view = plane[:, row, :length]
+        if column is None:
+            return view
+        return view[self._column_index[column]]
+
+    def write_line(self, line_index: int, **columns) -> None:
+        """
+        Store a completed line.
+        :param line_index: Index of the line on the trajectory.
+        :param columns: Arrays in acquisition order, keyed by column name.
+        """
+        view = self.line_view(line_index)
+        for name, values in columns.items():
+            if name not in self._column_index:
+                self.logger.error(f"Unknown scan data column: {name}")
+                raise KeyError(f"Unknown scan data column: {name}")
+            view[self._column_index[name]] = values
+        self.lines_completed = max(self.lines_completed, line_index + 1)
+        self.points_written = int(self.trajectory.line_offsets[self.lines_completed])
+
+    def acquired(self, column: str) -> np.ndarray:
+        """
+        Return a column of all completed lines in acquisition order.
+        :param column: Column name.
+        :return: 1D array (a copy).
+        """
+        if column not in self._column_index:
+            self.logger.error(f"Unknown scan data column: {column}")
+            raise KeyError(f"Unknown scan data column: {column}")
+        planes = self.data[self._column_index[column]].reshape(-1)
+        return planes[self.trajectory.buffer_index[:self.points_written]]
+
+    def point(self, index: int) -> np.ndarray:
+        """
+        Return all columns of a point given its index in acquisition order.
+        :param index: Point index on the trajectory.
+        :return: 1D array with one value per column.
+        """
+        line_index = int(self.trajectory.line_index[index])
+        return self.line_view(line_index)[:, index - self.trajectory.line_offsets[line_index]]
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the buffer in bytes."""
+        return self.data.nbytes
+
+
+class ScanLine:
+    """
+    A finished scan line as yielded by ScanManager.iter_trajectory_lines.
+    All arrays are views into the scan buffer in acquisition order.
+    """
+
+    def __init__(self, buffer: ScanBuffer, index: int, t_start: float, t_end: float):
+        """
+        Initialize the ScanLine.
+        :param buffer: ScanBuffer holding the line.
+        :param index: Index of the line on the trajectory.
+        :param t_start: Wall-clock time the line started.
+        :param t_end: Wall-clock time the line finished.
+        """
+        trajectory = buffer.trajectory
+        self.index = index
+        self.row = int(trajectory.line_rows[index])
+        self.direction = "forward" if trajectory.directions[index] > 0 else "backward"
+        self.image_direction = "backward" if trajectory.line_passes[index] else "forward"
+        self.t_start = t_start
+        self.t_end = t_end
+        self.data = buffer.line_view(index)
+        self._columns = buffer._column_index
+
+    @property
+    def x(self) -> np.ndarray:
+        """X coordinates of the line."""
+        return self.data[self._columns["x"]]
+
+    @property
+    def y(self) -> np.ndarray:
+        """Y coordinates of the line."""
+        return self.data[self._columns["y"]]
+
+    @property
+    def z(self) -> np.ndarray:
+        """Z values of the line."""
+        return self.data[self._columns["z"]]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Acquisition time of every point."""
+        return self.data[self._columns["timestamp"]]
+
+    def channel(self, name: str) -> np.ndarray:
+        """
+        Return one channel of the line.
+        :param name: Channel name.
+        :return: View into the scan buffer.
+        """
+        return self.data[self._columns[name]]
+
+    def __len__(self):
+        return self.data.shape[1]
+
+
+class ScanDataView:
+    """
+    Read-only list-of-dicts view over a ScanBuffer for callers of ``scan_data``.
+    Dicts are built lazily, one per accessed point.
+    """
+
+    def __init__(self, buffer: ScanBuffer):
+        """
+        Initialize the ScanDataView.
+        :param buffer: ScanBuffer to expose.
+        """
+        self.buffer = buffer
+
+    def __len__(self):
+        return self.buffer.points_written
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Scan data index out of range.")
+        x, y, z = self.buffer.point(index)[:3]
+        return {"x": float(x), "y": float(y), "z": float(z)}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
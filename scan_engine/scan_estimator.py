@@ -0,0 +1,208 @@
+# File: scan_engine/scan_estimator.py
+
+import datetime
+import numpy as np
+from hardware.motion_model import MotionModel
+from scan_engine.scan_buffer import ScanBuffer
+from scan_engine.trajectory import TrajectoryPlanner
+from utils.logger import get_logger
+
+
+class ScanEstimate:
+    """
+    Predicted cost of a scan.
+    """
+
+    def __init__(self, num_points, num_lines, travel, motion_time, dwell_time, buffer_bytes, peak_memory_bytes):
+        """
+        Initialize the ScanEstimate.
+        :param num_points: Number of points on the trajectory.
+        :param num_lines: Number of lines on the trajectory.
+        :param travel: Total travel distance.
+        :param motion_time: Time spent moving, in seconds.
+        :param dwell_time: Time spent at the points (dwell and per-point overhead), in seconds.
+        :param buffer_bytes: Size of the scan buffer.
+        :param peak_memory_bytes: Peak memory of the scan: buffer, trajectory and line temporaries.
+        """
+        self.num_points = num_points
+        self.num_lines = num_lines
+        self.travel = travel
+        self.motion_time = motion_time
+        self.dwell_time = dwell_time
+        self.buffer_bytes = buffer_bytes
+        self.peak_memory_bytes = peak_memory_bytes
+
+    @property
+    def duration(self) -> float:
+        """Predicted total scan time in seconds."""
+        return self.motion_time + self.dwell_time
+
+    def describe(self) -> str:
+        """
+        Return a one-line, human-readable summary.
+        """
+        duration = datetime.timedelta(seconds=round(self.duration))
+        return f"{self.num_points:,} points, {duration}, {format_bytes(self.peak_memory_bytes)} peak memory"
+
+    def __repr__(self):
+        return f"ScanEstimate({self.describe()})"
+
+
+class ScanEstimator:
+    """
+    Predicts the duration and peak memory of a scan before it starts.
+    Rectangular patterns (raster, trace_retrace, grid) are estimated in closed form,
+    so estimating a huge scan costs nothing; other patterns are planned first.
+    """
+
+    def __init__(self, motion_model=None, channels=0, dwell_time=0.0, point_overhead=0.0, planner=None,
+                 line_timing=None, abort_latency=0.05):
+        """
+        Initialize the ScanEstimator.
+        :param motion_model: MotionModel of the controller; defaults to instantaneous motion.
+        :param channels: Number of extra channels acquired at every point.
+        :param dwell_time: Time spent at every point, in seconds.
+        :param point_overhead: Software time per point (acquisition and bookkeeping), in seconds.
+        :param planner: TrajectoryPlanner used for non-rectangular patterns.
+        :param line_timing: LineTimingModel splitting lines into execute_line chunks; without it,
+                            or before it has measured a call, every line is one move.
+        :param abort_latency: Abort latency the chunks are sized for.
+        """
+        if dwell_time < 0 or point_overhead < 0:
+            raise ValueError("Dwell time and point overhead must be non-negative.")
+        self.motion_model = motion_model or MotionModel()
+        self.channels = channels
+        self.dwell_time = dwell_time
+        self.point_overhead = point_overhead
+        self.planner = planner or TrajectoryPlanner()
+        self.line_timing = line_timing
+        self.abort_latency = abort_latency
+        self.logger = get_logger(__name__)
+
+    @classmethod
+    def for_scan_manager(cls, scan_manager, dwell_time=0.0, point_overhead=0.0):
+        """
+        Create an estimator for the controller, channels and line chunking of a ScanManager.
+        :param scan_manager: The ScanManager.
+        :param dwell_time: Time spent at every point, in seconds.
+        :param point_overhead: Software time per point, in seconds.
+        :return: The ScanEstimator.
+        """
+        return cls(
+            cls.motion_model_for(scan_manager.motion_controller), len(scan_manager.channels), dwell_time,
+            point_overhead, scan_manager.trajectory_planner, scan_manager.line_timing, scan_manager.abort_latency
+        )
+
+    @classmethod
+    def for_controller(cls, controller, dwell_time=0.0, point_overhead=0.0):
+        """
+        Create an estimator for a motion controller that is not driven by a ScanManager yet.
+        :param controller: The motion controller.
+        :param dwell_time: Time spent at every point, in seconds.
+        :param point_overhead: Software time per point, in seconds.
+        :return: The ScanEstimator.
+        """
+        return cls(cls.motion_model_for(controller), dwell_time=dwell_time, point_overhead=point_overhead)
+
+    @staticmethod
+    def motion_model_for(controller) -> MotionModel:
+        """
+        Return the motion model of a controller.
+        Controllers describe themselves through get_motion_model(); others are
+        assumed to move instantly.
+        :param controller: The motion controller.
+        :return: The MotionModel.
+        """
+        if hasattr(controller, "get_motion_model"):
+            return controller.get_motion_model()
+        # ScanManager drives controllers without execute_line point by point
+        return MotionModel(batched_lines=hasattr(controller, "execute_line"))
+
+    def estimate(self, pattern, **parameters) -> ScanEstimate:
+        """
+        Estimate a scan by pattern name.
+        :param pattern: Scan pattern name understood by TrajectoryPlanner.plan.
+        :param parameters: Parameters of the scan pattern.
+        :return: The ScanEstimate.
+        """
+        if pattern in ("raster", "trace_retrace"):
+            xs = self.planner._axis_positions(parameters["x_start"], parameters["x_end"], parameters["step_size"])
+            ys = self.planner._axis_positions(parameters["y_start"], parameters["y_end"], parameters["step_size"])
+            rows, cols = len(ys), len(xs)
+            span = xs[-1] - xs[0]
+            passes = 2 if pattern == "trace_retrace" else 1
+            # Serpentine and trace/retrace lines start where the previous line ended
+            travel = passes * rows * span + (ys[-1] - ys[0])
+            return self._build(passes * rows * cols, passes * rows, passes, (rows, cols), [cols], [passes * rows], travel)
+        if pattern == "grid":
+            rows, cols = parameters["rows"], parameters["cols"]
+            if rows <= 0 or cols <= 0:
+                raise ValueError("Rows and columns must be positive integers.")
+            span = abs(parameters["x_end"] - parameters["x_start"])
+            # Every line runs +X, so the stage flies back between lines
+            travel = rows * span + (rows - 1) * span + abs(parameters["y_end"] - parameters["y_start"])
+            return self._build(rows * cols, rows, 1, (rows, cols), [cols], [rows], travel)
+        return self.estimate_trajectory(self.planner.plan(pattern, **parameters))
+
+    def estimate_trajectory(self, trajectory) -> ScanEstimate:
+        """
+        Estimate a scan of a precomputed trajectory.
+        :param trajectory: The Trajectory.
+        :return: The ScanEstimate.
+        """
+        travel = float(np.abs(np.diff(trajectory.points, axis=0)).sum()) if trajectory.num_points > 1 else 0.0
+        line_lengths, line_counts = np.unique(np.diff(trajectory.line_offsets), return_counts=True)
+        # Point lists keep the indices of the points in the input order
+        extra_bytes = 0 if trajectory.source_indices is None else trajectory.source_indices.nbytes
+        return self._build(
+            trajectory.num_points, trajectory.num_lines, trajectory.num_passes, trajectory.shape, line_lengths,
+            line_counts, travel, extra_bytes
+        )
+
+    def moves_per_line(self, line_points) -> int:
+        """
+        Return the number of execute_line calls the ScanManager makes for a line.
+        :param line_points: Number of points of the line.
+        :return: Number of calls.
+        """
+        if self.line_timing is None or self.line_timing.fit() is None or line_points == 0:
+            return 1
+        chunk = self.line_timing.chunk_points(line_points, self.abort_latency)
+        return -(-line_points // chunk)
+
+    def _build(self, num_points, num_lines, num_passes, shape, line_lengths, line_counts, travel,
+               extra_bytes=0) -> ScanEstimate:
+        """
+        Combine the trajectory figures with the timing and memory model.
+        Lines are described by their distinct lengths and the number of lines of each length.
+        """
+        if self.motion_model.batched_lines:
+            num_moves = sum(int(count) * self.moves_per_line(int(length))
+                            for length, count in zip(line_lengths, line_counts))
+        else:
+            num_moves = num_points
+        motion_time = self.motion_model.motion_time(float(travel), num_moves)
+        dwell_time = (self.dwell_time + self.point_overhead) * num_points
+
+        itemsize = np.dtype(np.float64).itemsize
+        columns = len(ScanBuffer.BASE_COLUMNS) + self.channels
+        buffer_bytes = columns * num_passes * shape[0] * shape[1] * itemsize
+        # Points, the int64 line and buffer index of every point, line offsets/rows/passes and directions
+        trajectory_bytes = 4 * num_points * itemsize + num_lines * (3 * itemsize + 1) + itemsize + extra_bytes
+        # z, timestamps and channels of the line being acquired
+        max_line = int(max(line_lengths)) if num_lines else 0
+        line_bytes = (2 + self.channels) * max_line * itemsize
+        return ScanEstimate(
+            num_points, num_lines, float(travel), motion_time, dwell_time, buffer_bytes,
+            buffer_bytes + trajectory_bytes + line_bytes
+        )
+
+
+def format_bytes(size) -> str:
+    """
+    Format a byte count with a binary unit, e.g. "1.5 MiB".
+    """
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
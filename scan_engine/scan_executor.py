@@ -0,0 +1,171 @@
+# File: scan_engine/scan_executor.py
+
+import queue
+import threading
+from utils.logger import get_logger
+
+
+class CancellationToken:
+    """
+    Thread-safe flag used to abort a running scan.
+    """
+
+    def __init__(self):
+        """
+        Initialize the CancellationToken.
+        """
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """Request cancellation."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancellation has been requested."""
+        return self._event.is_set()
+
+    def wait(self, timeout=None) -> bool:
+        """
+        Block until cancellation is requested or the timeout expires.
+        :param timeout: Timeout in seconds, or None to wait forever.
+        :return: True if cancellation was requested.
+        """
+        return self._event.wait(timeout)
+
+
+class ScanExecutor:
+    """
+    Runs ScanManager scans on a worker thread and streams finished lines
+    to consumers through a bounded queue.
+    """
+
+    # Sentinel put on the result queue once the scan has finished or was aborted
+    END_OF_SCAN = None
+
+    def __init__(self, scan_manager, max_queued_lines=64, stream_results=True):
+        """
+        Initialize the ScanExecutor.
+        :param scan_manager: ScanManager that performs the scan.
+        :param max_queued_lines: Capacity of the result queue. A full queue pauses
+                                 acquisition until the consumer catches up.
+        :param stream_results: Put every finished line on the result queue.
+        """
+        self.scan_manager = scan_manager
+        self.max_queued_lines = max_queued_lines
+        self.stream_results = stream_results
+        self.results = queue.Queue(maxsize=max_queued_lines)
+        self.completed = False
+        self.error = None
+        self._thread = None
+        self.logger = get_logger(__name__)
+
+    @property
+    def is_running(self) -> bool:
+        """True while the worker thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, pattern, progress_callback=None, data_logger=None, **parameters) -> None:
+        """
+        Plan a trajectory and start scanning it on a worker thread.
+        :param pattern: Scan pattern name understood by TrajectoryPlanner.plan.
+        :param progress_callback: Optional progress callback, called on the worker thread.
+        :param data_logger: Optional data logger, called on the worker thread.
+        :param parameters: Parameters of the scan pattern.
+        """
+        if self.is_running:
+            self.logger.error("Attempted to start a scan while another scan is running.")
+            raise RuntimeError("A scan is already running.")
+        trajectory = self.scan_manager.trajectory_planner.plan(pattern, **parameters)
+        self.run(trajectory, progress_callback, data_logger)
+
+    def run(self, trajectory, progress_callback=None, data_logger=None) -> None:
+        """
+        Start scanning a precomputed trajectory on a worker thread.
+        :param trajectory: Trajectory to scan.
+        :param progress_callback: Optional progress callback, called on the worker thread.
+        :param data_logger: Optional data logger, called on the worker thread.
+        """
+        if self.is_running:
+            self.logger.error("Attempted to start a scan while another scan is running.")
+            raise RuntimeError("A scan is already running.")
+        self.results = queue.Queue(maxsize=self.max_queued_lines)
+        self.completed = False
+        self.error = None
+
+        # Issue the token on the calling thread so a stop() right after start() is never lost
+        token = self.scan_manager.start_scan()
+        self._thread = threading.Thread(
+            target=self._worker,
+            args=(trajectory, token, progress_callback, data_logger),
+            name="ScanExecutor",
+            daemon=True,
+        )
+        self._thread.start()
+        self.logger.info(f"Started {trajectory.pattern} scan of {trajectory.num_points} points in the background.")
+
+    def stop(self, timeout=None) -> bool:
+        """
+        Abort the running scan and wait for the worker thread to exit.
+        :param timeout: Maximum time to wait in seconds, or None to wait forever.
+        :return: True if the worker thread has exited.
+        """
+        self.scan_manager.stop_scan()
+        return self.wait(timeout)
+
+    def wait(self, timeout=None) -> bool:
+        """
+        Wait for the worker thread to exit.
+        :param timeout: Maximum time to wait in seconds, or None to wait forever.
+        :return: True if the worker thread has exited.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.is_running
+
+    def iter_results(self, timeout=None):
+        """
+        Yield (line_index, line_data) tuples until the scan ends.
+        :param timeout: Maximum time to wait for each line, or None to wait forever.
+        """
+        while True:
+            item = self.results.get(timeout=timeout)
+            if item is self.END_OF_SCAN:
+                return
+            yield item
+
+    def _worker(self, trajectory, token, progress_callback, data_logger):
+        """
+        Worker thread body.
+        """
+        line_callback = (lambda index, data: self._publish(token, (index, data))) if self.stream_results else None
+        try:
+            self.completed = self.scan_manager.run_trajectory(
+                trajectory, progress_callback, data_logger, line_callback=line_callback, cancel_token=token
+            )
+        except Exception as e:
+            self.logger.error(f"Background scan failed: {e}")
+            self.error = e
+        finally:
+            if self.stream_results:
+                self._publish(token, self.END_OF_SCAN, force=True)
+
+    def _publish(self, token, item, force=False):
+        """
+        Put an item on the result queue, waiting while it is full.
+        Stops waiting when the scan is cancelled, unless force is set, in which
+        case the oldest queued line is dropped to make room.
+        """
+        while True:
+            try:
+                self.results.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                if not token.cancelled:
+                    continue
+                if not force:
+                    return
+                try:
+                    self.results.get_nowait()
+                except queue.Empty:
+                    pass
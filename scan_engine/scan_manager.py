@@ -1,7 +1,75 @@
-import csv
-import json
-import math
-from utils.logger import get_logger
+import time
+import numpy as np
+from scan_engine.callback_dispatcher import CallbackDispatcher
+from scan_engine.checkpoint import ScanCheckpoint
+from scan_engine.drift import DriftTracker
+from scan_engine.regrid import Regridder
+from scan_engine.scan_buffer import ScanBuffer, ScanDataView, ScanLine
+from scan_engine.scan_estimator import ScanEstimator
+from scan_engine.scan_executor import CancellationToken
+from scan_engine.trajectory import Trajectory, TrajectoryPlanner
+from scan_engine.trajectory_cache import TrajectoryCache
+from utils.logger import get_hot_path_logger, get_logger
+
+
+class LineTimingModel:
+    """
+    Running fit of the time of one execute_line call, t = overhead + per_point * n.
+    Chunks are sized from both terms. Short enough chunks keep the time between two
+    cancellation checks under the abort latency. Large enough chunks keep the fixed
+    cost of a call from dominating, since splitting can never beat the overhead. Older
+    calls are forgotten geometrically, so the fit follows a controller whose timing changes.
+    """
+
+    DECAY = 0.9           # Weight kept by the previous calls at every new call
+    MIN_CHUNK_POINTS = 16  # Points of the first chunk, before anything is measured
+
+    def __init__(self):
+        """
+        Initialize the LineTimingModel with no measurements.
+        """
+        self._sums = np.zeros(5)  # Weighted sums of 1, n, n^2, t and n t
+
+    def record(self, points, seconds) -> None:
+        """
+        Add the measured duration of one call.
+        :param points: Number of points of the call.
+        :param seconds: Duration of the call.
+        """
+        self._sums *= self.DECAY
+        self._sums += (1.0, points, points * points, seconds, points * seconds)
+
+    def fit(self) -> tuple:
+        """
+        Return the fitted (overhead, per_point) times, or None before the first call.
+        With only one chunk size measured so far, the time is attributed to the points.
+        """
+        weight, n, nn, t, nt = self._sums
+        if weight == 0:
+            return None
+        mean_n, mean_t = n / weight, t / weight
+        variance = nn / weight - mean_n * mean_n
+        if variance <= 1e-9 * mean_n * mean_n:
+            return 0.0, mean_t / mean_n
+        per_point = max(0.0, (nt / weight - mean_n * mean_t) / variance)
+        return max(0.0, mean_t - per_point * mean_n), per_point
+
+    def chunk_points(self, line_points, abort_latency) -> int:
+        """
+        Points per execute_line call for a line.
+        :param line_points: Number of points of the line.
+        :param abort_latency: Longest time wanted between two cancellation checks.
+        :return: Chunk size between 1 and line_points.
+        """
+        fit = self.fit()
+        if fit is None:
+            return max(1, min(line_points, self.MIN_CHUNK_POINTS))
+        overhead, per_point = fit
+        if per_point <= 0 or overhead + per_point * line_points <= abort_latency:
+            return max(1, line_points)
+        # Fill the latency budget, but never let the overhead exceed the time spent on points
+        chunk = max((abort_latency - overhead) / per_point, overhead / per_point, 1.0)
+        return max(1, min(line_points, int(chunk + 1e-9)))
 
 
 class ScanManager:
@@ -13,161 +81,707 @@ class ScanManager:
         self.motion_controller = motion_controller
         self.is_scanning = False
         self.logger = get_logger(__name__)
+        self.hot_logger = get_hot_path_logger(__name__)  # Per-point messages, rate limited
         self.scan_data = []
+        self.scan_buffer = None
+        self.trajectory_planner = TrajectoryPlanner(TrajectoryCache())  # Repeated scans reuse their paths
+        self.trajectory = None
+        self.cancel_token = CancellationToken()
+        self.abort_latency = 0.05  # Longest time (s) between two cancellation checks
+        self.line_timing = LineTimingModel()  # Sizes the chunks of a line from measured call times
+        self.progress_rate = 20.0  # Maximum progress updates per second
+        self.log_interval = 0.1    # Minimum time (s) between two data_logger blocks
+        self.channels = {}         # Extra channels acquired at every point, see configure_channels
 
     def start_scan(self):
-        """Start a scan."""
+        """
+        Start a scan.
+        :return: The CancellationToken of the new scan.
+        """
+        self.cancel_token = CancellationToken()
         self.is_scanning = True
         self.logger.info("Scan started.")
+        return self.cancel_token
 
     def stop_scan(self):
-        """Stop a scan."""
+        """Stop a scan. A running scan aborts at its next cancellation check."""
+        self.cancel_token.cancel()
         self.is_scanning = False
         self.logger.info("Scan stopped.")
 
     def clear_scan_data(self):
         """Clear the scan data before starting a new scan."""
         self.logger.debug("Clearing scan data.")
+        self.scan_buffer = None
         self.scan_data = []
 
+    def configure_channels(self, channels):
+        """
+        Declare the channels acquired at every point next to x, y and z by the scans
+        that are not given their own channels.
+        :param channels: Iterable of channel names read from the motion controller's
+                         read_channels(names, xs, ys), or a dict mapping names to either
+                         None (read from the controller) or a callable(xs, ys, z) -> array.
+        """
+        self.channels = self._channel_sources(channels)
+        self.logger.info(f"Scan channels configured: {list(self.channels)}")
+
+    def _channel_sources(self, channels) -> dict:
+        """
+        Validate channels given as for configure_channels.
+        :return: Dict mapping channel names to None or a callable.
+        """
+        if isinstance(channels, dict):
+            channels = dict(channels)
+        else:
+            channels = {name: None for name in channels}
+        reserved = set(ScanBuffer.BASE_COLUMNS) & set(channels)
+        if reserved:
+            self.logger.error(f"Channel names are reserved: {sorted(reserved)}")
+            raise ValueError(f"Channel names are reserved: {sorted(reserved)}")
+        if any(source is None for source in channels.values()) and not hasattr(self.motion_controller, "read_channels"):
+            self.logger.error("The motion controller cannot read channels.")
+            raise ValueError("The motion controller cannot read channels.")
+        return channels
+
+    def allocate_scan_buffer(self, trajectory, channels=()):
+        """
+        Allocate the scan buffer for a trajectory and expose it through scan_data.
+        :param trajectory: Trajectory the buffer is sized from.
+        :param channels: Names of extra channels to record.
+        :return: The allocated ScanBuffer.
+        """
+        self.scan_buffer = ScanBuffer(trajectory, channels)
+        self.scan_data = ScanDataView(self.scan_buffer)
+        return self.scan_buffer
+
+    def estimate_scan(self, pattern, dwell_time=0.0, **parameters):
+        """
+        Predict the duration and peak memory of a scan before starting it, using the
+        motion model of the controller and the configured channels.
+        :param pattern: Scan pattern name understood by TrajectoryPlanner.plan.
+        :param dwell_time: Time spent at every point, in seconds.
+        :param parameters: Parameters of the scan pattern.
+        :return: A ScanEstimate.
+        """
+        return ScanEstimator.for_scan_manager(self, dwell_time).estimate(pattern, **parameters)
+
     def log_scan_position(self, x, y, z):
         """
-        Log the current scan position.
+        Log the current scan position. The values themselves are stored in the scan buffer.
+        Goes to the rate-limited hot-path logger, which is disabled by default.
         :param x: X-coordinate.
         :param y: Y-coordinate.
         :param z: Z-coordinate.
         """
-        self.logger.info(f"Scanning position: ({x:.2f}, {y:.2f}, {z:.2f})")
-        self.scan_data.append({"x": round(x, 2), "y": round(y, 2), "z": round(z, 2)})
+        self.hot_logger.debug("Scanning position: (%.2f, %.2f, %.2f)", x, y, z)
 
-    def raster_scan(self, x_start, x_end, y_start, y_end, step_size, progress_callback=None, data_logger=None):
+    def run_trajectory(self, trajectory, progress_callback=None, data_logger=None, line_callback=None,
+                       cancel_token=None, checkpoint_path=None, channels=None):
         """
-        Perform a raster scan over the specified area.
+        Drive the stage along a precomputed trajectory.
+        The cancellation token is checked between lines and between chunks of a line;
+        chunks are sized so that no more than abort_latency passes between two checks.
+        :param trajectory: Trajectory planned by the TrajectoryPlanner.
+        :param progress_callback: Optional callable receiving the progress percentage,
+                                  called at most progress_rate times per second.
+        :param data_logger: Optional callable receiving logged points as (n, 3) x, y, z blocks.
+        :param line_callback: Optional callable receiving (line_index, line_data) for every
+                              finished line, where line_data is a view into the scan buffer.
+        :param cancel_token: CancellationToken to observe; a new scan is started if omitted.
+        :param checkpoint_path: Optional path of a checkpoint file every finished line is
+                                appended to; an interrupted scan continues with resume_scan.
+        :param channels: Channels of this scan only, as for configure_channels; defaults to
+                         the configured channels.
+        :return: True if the scan completed, False if it was aborted.
         """
-        self.logger.info("Starting raster scan...")
-        self.clear_scan_data()  # Clear previous scan data
-
-        # Calculate the total number of steps
-        total_steps = ((x_end - x_start) // step_size + 1) * ((y_end - y_start) // step_size + 1)
-        current_step = 0
-
-        y = y_start
-        while y <= y_end:
-            x_positions = range(x_start, x_end + 1, step_size)
-            if (y - y_start) // step_size % 2 == 1:
-                x_positions = reversed(x_positions)  # Zigzag pattern
-
-            for x in x_positions:
-                # Fetch real-time Z-data from the MotionController
-                z = self.motion_controller.get_z_position()
-                self.motion_controller.move(x, y, z)
-                self.log_scan_position(x, y, z)
-
-                # Log data to the Data Logging Tab
-                if data_logger:
-                    data_logger(x, y, z)
-
-                # Update progress
-                current_step += 1
-                if progress_callback:
-                    progress_callback(
-                        int((current_step / total_steps) * 100),
-                        current_position={"x": x, "y": y, "z": z}
-                    )
-
-            y += step_size
-        self.logger.info("Raster scan complete.")
+        dispatcher = CallbackDispatcher(progress_callback, data_logger, self.progress_rate, self.log_interval)
+        lines = self.iter_trajectory_lines(
+            trajectory, cancel_token, checkpoint_path, channels=channels, chunk_callback=dispatcher.add_line
+        )
+        return self._dispatch_lines(trajectory, lines, dispatcher, line_callback)
 
-    def spiral_scan(self, center_x, center_y, radius, step_size, progress_callback=None):
+    def resume_scan(self, checkpoint_path, progress_callback=None, data_logger=None, line_callback=None,
+                    cancel_token=None, channels=None):
         """
-        Perform a spiral scan around a center point.
+        Continue an interrupted scan from its checkpoint file.
+        The trajectory is planned again from the stored pattern and parameters and must
+        have the stored number of lines and points. The completed lines are loaded into a
+        new scan buffer, the controller state of the last completed line is restored and
+        the scan continues with the next line.
+        New lines are appended to the same checkpoint file. The channels are restored from
+        the checkpoint header; callables are not stored in checkpoints, so the callable of
+        a channel is looked up by name in channels, and channels without one are read from
+        the motion controller.
+        :param checkpoint_path: Path of the checkpoint file.
+        :param progress_callback: Optional callable receiving the progress percentage.
+        :param data_logger: Optional callable receiving logged points as (n, 3) x, y, z blocks;
+                            only points acquired after resuming are delivered.
+        :param line_callback: Optional callable receiving (line_index, line_data) for every
+                              line acquired after resuming.
+        :param cancel_token: CancellationToken to observe; a new scan is started if omitted.
+        :param channels: Channels providing the callables of the checkpoint channels, as for
+                         configure_channels; defaults to the configured channels.
+        :return: True if the scan completed, False if it was aborted again.
         """
-        self.logger.info("Starting spiral scan...")
-        self.clear_scan_data()  # Clear previous scan data
-
-        # Estimate the total number of steps (approximation)
-        total_steps = int((2 * math.pi * radius) / step_size)
-        current_step = 0
-
-        theta = 0
-        r = 0
-        while r <= radius:
-            x = center_x + r * math.cos(theta)
-            y = center_y + r * math.sin(theta)
-            z = self.motion_controller.get_z_position()  # Fetch Z-data
+        checkpoint, records = ScanCheckpoint.resume(checkpoint_path)
+        try:
+            header = checkpoint.header
+            # Plan with the drift compensation the scan was started with
+            drift = (tuple(header.get("offset", (0.0, 0.0))), tuple(header.get("drift_per_line", (0.0, 0.0))))
+            try:
+                trajectory = self.trajectory_planner.plan(header["pattern"], drift=drift, **header["parameters"])
+            except (TypeError, ValueError) as e:
+                self.logger.error(f"Cannot plan the trajectory of checkpoint {checkpoint_path}: {e}")
+                raise ValueError(f"Cannot plan the trajectory of checkpoint {checkpoint_path}: {e}")
+            planned = {"num_lines": trajectory.num_lines, "num_points": trajectory.num_points}
+            stored = {key: header[key] for key in planned if key in header}
+            if any(stored[key] != planned[key] for key in stored):
+                self.logger.error(f"Checkpoint {checkpoint_path} was written for {stored}, the trajectory has {planned}.")
+                raise ValueError(f"Checkpoint {checkpoint_path} was written for {stored}, the trajectory has {planned}.")
+            # Same column order as the checkpoint
+            sources = self.channels if channels is None else self._channel_sources(channels)
+            names = [name for name in header["columns"] if name not in ScanBuffer.BASE_COLUMNS]
+            channels = self._channel_sources({name: sources.get(name) for name in names})
+
+            self.clear_scan_data()
+            self.trajectory = trajectory
+            buffer = self.allocate_scan_buffer(trajectory, tuple(channels))
+            controller_state = header.get("controller_state")
+            for expected_index, (line_index, data, state) in enumerate(records):
+                view = buffer.line_view(line_index) if line_index == expected_index else None
+                if view is None or view.shape != data.shape:
+                    self.logger.error(f"Checkpoint {checkpoint_path} is inconsistent at line {line_index}.")
+                    raise ValueError(f"Checkpoint {checkpoint_path} is inconsistent at line {line_index}.")
+                view[:] = data
+                if state is not None:
+                    controller_state = state
+            buffer.lines_completed = len(records)
+            buffer.points_written = int(trajectory.line_offsets[len(records)])
+            if controller_state is not None and hasattr(self.motion_controller, "restore_state"):
+                self.motion_controller.restore_state(controller_state)
+        except Exception:
+            checkpoint.close()
+            raise
+
+        self.logger.info(
+            f"Resuming {trajectory.pattern} scan at line {len(records)} of {trajectory.num_lines} from {checkpoint_path}."
+        )
+        dispatcher = CallbackDispatcher(progress_callback, data_logger, self.progress_rate, self.log_interval)
+        lines = self.iter_trajectory_lines(
+            trajectory, cancel_token, checkpoint, len(records), channels, chunk_callback=dispatcher.add_line
+        )
+        return self._dispatch_lines(trajectory, lines, dispatcher, line_callback, buffer.points_written)
+
+    def _dispatch_lines(self, trajectory, lines, dispatcher, line_callback, points_done=0):
+        """
+        Consume a line generator, delivering lines to the line callback. Progress and
+        logged points reach the dispatcher per acquired chunk, through the chunk
+        callback of the generator, so long lines report while they are scanned.
+        :return: True if every line of the trajectory was acquired.
+        """
+        # The trajectory knows its exact length, so the progress reaches exactly 100%
+        dispatcher.begin(trajectory.num_points, points_done)
+
+        for line in lines:
+            if line_callback:
+                line_callback(line.index, line.data)
+
+        completed = self.scan_buffer.lines_completed == trajectory.num_lines
+        dispatcher.finish(completed)
+        return completed
+
+    def iter_trajectory_lines(self, trajectory, cancel_token=None, checkpoint=None, start_line=0, channels=None,
+                              chunk_callback=None):
+        """
+        Scan a trajectory and yield every line as soon as it is finished.
+        Downstream processing of line N runs while the consumer holds the generator,
+        i.e. before line N + 1 is acquired. The generator ends early if the scan is
+        cancelled; closing it early stops the scan.
+        :param trajectory: Trajectory planned by the TrajectoryPlanner.
+        :param cancel_token: CancellationToken to observe; a new scan is started if omitted.
+        :param checkpoint: Optional checkpoint file path, or an open ScanCheckpoint, that
+                           every finished line is appended to before it is yielded.
+        :param start_line: First line to acquire. Lines before it must already be in
+                           scan_buffer, as set up by resume_scan.
+        :param channels: Channels of this scan only, as for configure_channels; defaults to
+                         the configured channels.
+        :param chunk_callback: Optional callable receiving (xs, ys, zs) for every chunk of a
+                               line as soon as it is acquired.
+        :return: Generator of ScanLine objects, whose arrays are views into scan_buffer.
+        """
+        channels = self.channels if channels is None else self._channel_sources(channels)
+        if cancel_token is None:
+            cancel_token = self.start_scan()
+        if start_line:
+            if self.scan_buffer is None or self.scan_buffer.trajectory is not trajectory:
+                self.logger.error("Resuming a scan requires the scan buffer of its trajectory.")
+                raise ValueError("Resuming a scan requires the scan buffer of its trajectory.")
+            buffer = self.scan_buffer
+        else:
+            self.clear_scan_data()  # Clear previous scan data
+            self.trajectory = trajectory
+            buffer = self.allocate_scan_buffer(trajectory, tuple(channels))
+        if isinstance(checkpoint, str):
+            checkpoint = ScanCheckpoint.create(checkpoint, trajectory, buffer.columns, self._controller_state())
+
+        try:
+            for line_index in range(start_line, trajectory.num_lines):
+                line = trajectory.line(line_index)
+                xs, ys = line[:, 0], line[:, 1]
+                t_start = time.time()
+                columns = self._acquire_line(xs, ys, cancel_token, channels, chunk_callback)
+                t_end = time.time()
+                if columns is None:
+                    self.logger.info(f"Scan aborted after {line_index} of {trajectory.num_lines} lines.")
+                    return
+                buffer.write_line(line_index, x=xs, y=ys, timestamp=np.linspace(t_start, t_end, len(xs)), **columns)
+                if checkpoint is not None:
+                    checkpoint.append_line(line_index, buffer.line_view(line_index), self._controller_state())
+                self.hot_logger.debug("Scan line %d acquired (%d points).", line_index, len(xs))
+                yield ScanLine(buffer, line_index, t_start, t_end)
+        finally:
+            self.is_scanning = False
+            if checkpoint is not None:
+                checkpoint.close()
+
+    def _controller_state(self):
+        """
+        Return the motion controller state stored in checkpoints, or None if the
+        controller does not provide get_state.
+        """
+        if hasattr(self.motion_controller, "get_state"):
+            return self.motion_controller.get_state()
+        return None
+
+    def iter_raster_lines(self, x_start, x_end, y_start, y_end, step_size, trace_retrace=False):
+        """
+        Perform a raster scan and yield every line as soon as it is finished.
+        :param trace_retrace: Scan every row in both directions.
+        :return: Generator of ScanLine objects with index, row, direction and timestamps.
+        """
+        if trace_retrace:
+            trajectory = self.trajectory_planner.plan(
+                "trace_retrace", x_start=x_start, x_end=x_end, y_start=y_start, y_end=y_end, step_size=step_size
+            )
+        else:
+            trajectory = self.trajectory_planner.plan(
+                "raster", x_start=x_start, x_end=x_end, y_start=y_start, y_end=y_end, step_size=step_size
+            )
+        return self.iter_trajectory_lines(trajectory)
+
+    def _acquire_line(self, xs, ys, cancel_token, channels, chunk_callback=None):
+        """
+        Acquire a line in chunks, checking the cancellation token before each chunk.
+        Every chunk is passed to chunk_callback, if given, as soon as it is acquired.
+        :return: Dict of z and channel arrays for the line, or None if the scan was cancelled.
+        """
+        columns = {name: np.empty(len(xs), dtype=np.float64) for name in ("z", *channels)}
+        position = 0
+        while position < len(xs):
+            if cancel_token.cancelled:
+                return None
+            end = min(len(xs), position + self.line_timing.chunk_points(len(xs), self.abort_latency))
+            t_start = time.perf_counter()
+            chunk_x, chunk_y = xs[position:end], ys[position:end]
+            z_values = self.execute_line(chunk_x, chunk_y)
+            columns["z"][position:end] = z_values
+            if channels:
+                for name, values in self.read_channels(chunk_x, chunk_y, z_values, channels).items():
+                    columns[name][position:end] = values
+            self.line_timing.record(end - position, time.perf_counter() - t_start)
+            if chunk_callback is not None:
+                chunk_callback(chunk_x, chunk_y, columns["z"][position:end])
+            position = end
+        return columns
+
+    def read_channels(self, xs, ys, z_values, channels=None):
+        """
+        Read all channels for points that were just acquired.
+        Controller channels are read in one read_channels call.
+        :param xs: X coordinates of the points.
+        :param ys: Y coordinates of the points.
+        :param z_values: Z values measured at the points.
+        :param channels: Dict of channel sources as returned by _channel_sources; defaults to
+                         the configured channels.
+        :return: Dict mapping channel names to arrays.
+        """
+        if channels is None:
+            channels = self.channels
+        controller_channels = [name for name, source in channels.items() if source is None]
+        values = {}
+        if controller_channels:
+            values.update(self.motion_controller.read_channels(controller_channels, xs, ys))
+        for name, source in channels.items():
+            if source is not None:
+                values[name] = source(xs, ys, z_values)
+        return values
+
+    def execute_line(self, xs, ys):
+        """
+        Drive one scan line and return the measured Z values.
+        Controllers that provide execute_line take the whole line in one call;
+        others are driven point by point through get_z_position and move.
+        :param xs: X coordinates of the line.
+        :param ys: Y coordinates of the line.
+        :return: NumPy array with one Z value per point.
+        """
+        if hasattr(self.motion_controller, "execute_line"):
+            return np.asarray(self.motion_controller.execute_line(xs, ys), dtype=np.float64)
+
+        z_values = np.empty(len(xs), dtype=np.float64)
+        for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+            # Fetch real-time Z-data from the MotionController
+            z = self.motion_controller.get_z_position()
             self.motion_controller.move(x, y, z)
             self.log_scan_position(x, y, z)
+            z_values[i] = z
+        return z_values
 
-            # Update progress
-            current_step += 1
-            if progress_callback:
-                progress_callback(
-                    int((current_step / total_steps) * 100),
-                    current_position={"x": x, "y": y, "z": z}
+    def raster_scan(self, x_start, x_end, y_start, y_end, step_size, progress_callback=None, data_logger=None,
+                    trace_retrace=False, checkpoint_path=None):
+        """
+        Perform a raster scan over the specified area.
+        data_logger receives the logged points as (n, 3) x, y, z blocks.
+        With trace_retrace every row is scanned in both directions and the scan buffer
+        holds separate forward and backward images (scan_buffer.image("z", "backward")).
+        With checkpoint_path every finished line is also appended to a checkpoint file,
+        from which an interrupted scan is continued with resume_scan.
+        :return: True if the scan completed, False if it was aborted.
+        """
+        self.logger.info("Starting raster scan...")
+        if trace_retrace:
+            trajectory = self.trajectory_planner.plan(
+                "trace_retrace", x_start=x_start, x_end=x_end, y_start=y_start, y_end=y_end, step_size=step_size
+            )
+        else:
+            trajectory = self.trajectory_planner.plan(
+                "raster", x_start=x_start, x_end=x_end, y_start=y_start, y_end=y_end, step_size=step_size
+            )
+        if self.run_trajectory(trajectory, progress_callback, data_logger, checkpoint_path=checkpoint_path):
+            self.logger.info("Raster scan complete.")
+            return True
+        return False
+
+    def drift_corrected_scan(self, x_start, x_end, y_start, y_end, step_size, frames, drift_tracker=None,
+                             channel="z", frame_callback=None, progress_callback=None):
+        """
+        Scan the same area repeatedly while compensating sample drift.
+        After every frame the DriftTracker measures the shift against the previous frame;
+        the next frame is then planned with the predicted drift as offset, plus a per-line
+        correction for the drift during the frame, so the frames stay registered.
+        :param frames: Number of frames.
+        :param drift_tracker: DriftTracker to use; a new one with the step size as pixel size
+                              is created if omitted.
+        :param channel: Channel the drift is measured on.
+        :param frame_callback: Optional callable receiving (frame_index, image, drift) after
+                               every frame, where drift is the measured (x, y) drift or None.
+        :param progress_callback: Optional callable receiving the progress percentage of each frame.
+        :return: List of the acquired images; shorter than frames if the scan was aborted.
+        """
+        tracker = drift_tracker if drift_tracker is not None else DriftTracker(pixel_size=(step_size, step_size))
+        planner = self.trajectory_planner
+        images = []
+        line_duration = 0.0
+        self.logger.info(f"Starting {frames} drift-corrected frames...")
+        try:
+            for frame_index in range(frames):
+                if tracker.reference is not None:
+                    tracker.apply(planner, time.time(), line_duration)
+                trajectory = planner.plan(
+                    "raster", x_start=x_start, x_end=x_end, y_start=y_start, y_end=y_end, step_size=step_size
                 )
+                if not self.run_trajectory(trajectory, progress_callback):
+                    break
+                image = self.scan_buffer.image(channel).copy()
+                timestamps = self.scan_buffer.acquired("timestamp")
+                line_duration = (timestamps[-1] - timestamps[0]) / max(trajectory.num_lines - 1, 1)
+                # The frame is referred to the offset and time of its middle line
+                middle = (trajectory.num_lines - 1) / 2
+                offset = np.add(trajectory.offset, np.multiply(trajectory.drift_per_line, middle))
+                drift = tracker.update(image, float(timestamps.mean()), offset)
+                images.append(image)
+                if frame_callback:
+                    frame_callback(frame_index, image, drift)
+        finally:
+            planner.reset_drift()
+        self.logger.info(f"Drift-corrected scan finished after {len(images)} frames.")
+        return images
 
-            theta += step_size / r if r != 0 else step_size
-            r += step_size / (2 * math.pi)
-        self.logger.info("Spiral scan complete.")
+    def spiral_scan(self, center_x, center_y, radius, step_size, progress_callback=None):
+        """
+        Perform a spiral scan around a center point.
+        Use regrid_scan afterwards for an image, or clv_spiral_scan for evenly spaced samples.
+        :return: True if the scan completed, False if it was aborted.
+        """
+        self.logger.info("Starting spiral scan...")
+        trajectory = self.trajectory_planner.plan(
+            "spiral", center_x=center_x, center_y=center_y, radius=radius, step_size=step_size
+        )
+        if self.run_trajectory(trajectory, progress_callback):
+            self.logger.info("Spiral scan complete.")
+            return True
+        return False
 
     def grid_scan(self, x_start, x_end, y_start, y_end, rows, cols, progress_callback=None):
         """
         Perform a grid scan over the specified area.
+        :return: True if the scan completed, False if it was aborted.
         """
         self.logger.info("Starting grid scan...")
-        self.clear_scan_data()  # Clear previous scan data
-
-        # Calculate step sizes
-        x_step = (x_end - x_start) / (cols - 1)
-        y_step = (y_end - y_start) / (rows - 1)
-
-        # Calculate total steps
-        total_steps = rows * cols
-        current_step = 0
-
-        for i in range(rows):
-            for j in range(cols):
-                x = x_start + j * x_step
-                y = y_start + i * y_step
-                z = self.motion_controller.get_z_position()  # Fetch Z-data
-                self.motion_controller.move(x, y, z)
-                self.log_scan_position(x, y, z)
-
-                # Update progress
-                current_step += 1
-                if progress_callback:
-                    progress_callback(
-                        int((current_step / total_steps) * 100),
-                        current_position={"x": x, "y": y, "z": z}
-                    )
-
-        self.logger.info("Grid scan complete.")
+        trajectory = self.trajectory_planner.plan(
+            "grid", x_start=x_start, x_end=x_end, y_start=y_start, y_end=y_end, rows=rows, cols=cols
+        )
+        if self.run_trajectory(trajectory, progress_callback):
+            self.logger.info("Grid scan complete.")
+            return True
+        return False
 
     def circular_scan(self, center_x, center_y, radius, num_points, progress_callback=None):
         """
         Perform a circular scan around a center point.
+        :return: True if the scan completed, False if it was aborted.
         """
         self.logger.info("Starting circular scan...")
-        self.clear_scan_data()  # Clear previous scan data
+        trajectory = self.trajectory_planner.plan(
+            "circle", center_x=center_x, center_y=center_y, radius=radius, num_points=num_points
+        )
+        if self.run_trajectory(trajectory, progress_callback):
+            self.logger.info("Circular scan complete.")
+            return True
+        return False
 
-        # Calculate total steps
-        total_steps = num_points
-        current_step = 0
+    def lissajous_scan(self, x_start, x_end, y_start, y_end, freq_x, freq_y, num_points, image_shape=(128, 128),
+                       method="bilinear", progress_callback=None):
+        """
+        Perform a Lissajous fast scan and regrid the samples onto an image.
+        See TrajectoryPlanner.lissajous for the path.
+        :param image_shape: (rows, cols) of the regridded image.
+        :param method: Regridding method, "bilinear" or "bin".
+        :return: The regridded Z image, or None if the scan was aborted.
+        """
+        self.logger.info("Starting Lissajous scan...")
+        trajectory = self.trajectory_planner.plan(
+            "lissajous", x_start=x_start, x_end=x_end, y_start=y_start, y_end=y_end, freq_x=freq_x, freq_y=freq_y,
+            num_points=num_points
+        )
+        if not self.run_trajectory(trajectory, progress_callback):
+            return None
+        self.logger.info("Lissajous scan complete.")
+        return self.regrid_scan(image_shape, method=method, x_range=(x_start, x_end), y_range=(y_start, y_end))
 
-        for i in range(num_points):
-            theta = 2 * math.pi * i / num_points
-            x = center_x + radius * math.cos(theta)
-            y = center_y + radius * math.sin(theta)
-            z = self.motion_controller.get_z_position()  # Fetch Z-data
-            self.motion_controller.move(x, y, z)
-            self.log_scan_position(x, y, z)
+    def clv_spiral_scan(self, center_x, center_y, radius, pitch, point_spacing, image_shape=(128, 128),
+                        method="bilinear", progress_callback=None):
+        """
+        Perform a constant-linear-velocity spiral scan and regrid the samples onto an image
+        of the square around the spiral. See TrajectoryPlanner.clv_spiral for the path.
+        :param image_shape: (rows, cols) of the regridded image.
+        :param method: Regridding method, "bilinear" or "bin".
+        :return: The regridded Z image, or None if the scan was aborted.
+        """
+        self.logger.info("Starting constant-velocity spiral scan...")
+        trajectory = self.trajectory_planner.plan(
+            "clv_spiral", center_x=center_x, center_y=center_y, radius=radius, pitch=pitch, point_spacing=point_spacing
+        )
+        if not self.run_trajectory(trajectory, progress_callback):
+            return None
+        self.logger.info("Constant-velocity spiral scan complete.")
+        return self.regrid_scan(
+            image_shape, method=method, x_range=(center_x - radius, center_x + radius),
+            y_range=(center_y - radius, center_y + radius)
+        )
+
+    def regrid_scan(self, shape, channel="z", method="bilinear", x_range=None, y_range=None, fill_holes=True):
+        """
+        Resample the scattered samples of the last scan onto a regular image.
+        :param shape: (rows, cols) of the image.
+        :param channel: Channel to resample.
+        :param method: "bilinear" or "bin", see Regridder.
+        :param x_range: (x_start, x_end) of the image; defaults to the range of the samples.
+        :param y_range: (y_start, y_end) of the image; defaults to the range of the samples.
+        :param fill_holes: Fill pixels without samples from their neighbours.
+        :return: The (rows, cols) image.
+        """
+        if self.scan_buffer is None or self.scan_buffer.lines_completed == 0:
+            self.logger.error("There is no scan data to regrid.")
+            raise RuntimeError("There is no scan data to regrid.")
+        xs = self.scan_buffer.acquired("x")
+        ys = self.scan_buffer.acquired("y")
+        regridder = Regridder(
+            shape,
+            x_range if x_range is not None else (float(xs.min()), float(xs.max())),
+            y_range if y_range is not None else (float(ys.min()), float(ys.max())),
+        )
+        return regridder.regrid(xs, ys, self.scan_buffer.acquired(channel), method, fill_holes)
+
+    def point_scan(self, points, order="hilbert", progress_callback=None, data_logger=None, checkpoint_path=None):
+        """
+        Measure an arbitrary list of sites, visited in a travel-minimizing order.
+        :param points: (N, 2) array of XY coordinates.
+        :param order: Ordering method: "hilbert", "morton", "nearest_neighbor" or "none".
+        :param progress_callback: Optional callable receiving the progress percentage.
+        :param data_logger: Optional callable receiving logged points as (n, 3) x, y, z blocks.
+        :param checkpoint_path: Optional path of a checkpoint file, see run_trajectory.
+        :return: Z values in the order of the given points, or None if the scan was aborted.
+        """
+        self.logger.info("Starting point scan...")
+        trajectory = self.trajectory_planner.plan("point_list", points=points, order=order)
+        if not self.run_trajectory(trajectory, progress_callback, data_logger, checkpoint_path=checkpoint_path):
+            return None
+        z_values = np.empty(trajectory.num_points, dtype=np.float64)
+        z_values[trajectory.source_indices] = self.scan_buffer.acquired("z")
+        self.logger.info(f"Point scan of {trajectory.num_points} points complete.")
+        return z_values
+
+    def adaptive_scan(self, x_start, x_end, y_start, y_end, coarse_rows, coarse_cols, refinement=8,
+                      point_budget=None, progress_callback=None):
+        """
+        Perform an adaptive refinement scan.
+        A coarse grid is scanned first; the remaining point budget is then spent on the
+        coarse cells with the highest local gradient and curvature, which are scanned at
+        full resolution. Cells that were not refined are bilinearly interpolated.
+        The result is a full-resolution image of ((coarse_rows - 1) * refinement + 1) x
+        ((coarse_cols - 1) * refinement + 1) pixels in scan_buffer, whose "measured"
+        channel is 1 for measured and 0 for interpolated pixels.
+        :param x_start: Start of the X range.
+        :param x_end: End of the X range.
+        :param y_start: Start of the Y range.
+        :param y_end: End of the Y range.
+        :param coarse_rows: Number of coarse grid points along Y (at least 2).
+        :param coarse_cols: Number of coarse grid points along X (at least 2).
+        :param refinement: Number of fine pixels per coarse cell along each axis.
+        :param point_budget: Total number of points to measure, coarse grid included.
+                             Defaults to a quarter of the full-resolution pixel count.
+        :param progress_callback: Optional callable receiving the progress percentage.
+        :return: The full-resolution Z image, or None if the scan was aborted.
+        """
+        if coarse_rows < 2 or coarse_cols < 2:
+            raise ValueError("The coarse grid needs at least 2 rows and 2 columns.")
+        if refinement < 1:
+            raise ValueError("Refinement must be a positive integer.")
+        fine_rows = (coarse_rows - 1) * refinement + 1
+        fine_cols = (coarse_cols - 1) * refinement + 1
+        if point_budget is None:
+            point_budget = fine_rows * fine_cols // 4
+        coarse_points = coarse_rows * coarse_cols
+        if point_budget < coarse_points:
+            raise ValueError(f"Point budget must cover the coarse grid ({coarse_points} points).")
+        self.logger.info("Starting adaptive scan...")
+
+        # Phase 1: coarse grid, reported as its share of the point budget
+        coarse_progress = None
+        if progress_callback:
+            def coarse_progress(percent, current_position):
+                progress_callback(int(percent * coarse_points / point_budget), current_position=current_position)
+        if not self.grid_scan(x_start, x_end, y_start, y_end, coarse_rows, coarse_cols, coarse_progress):
+            return None
+        coarse = self.scan_buffer.image("z").copy()
+
+        # Phase 2: refine the cells with the highest gradient and curvature
+        cell_order = self._rank_refinement_cells(coarse)
+        cells_affordable = (point_budget - coarse_points) // max(1, (refinement + 1) ** 2 - 4)
+        selected = cell_order[:cells_affordable]
+        measured = np.zeros((fine_rows, fine_cols), dtype=bool)
+        measured[::refinement, ::refinement] = True
+        refine_mask = np.zeros((fine_rows, fine_cols), dtype=bool)
+        for cell in selected.tolist():
+            row, col = divmod(cell, coarse_cols - 1)
+            refine_mask[row * refinement:(row + 1) * refinement + 1, col * refinement:(col + 1) * refinement + 1] = True
+        refine_mask &= ~measured
 
-            # Update progress
-            current_step += 1
+        fine_x = np.linspace(x_start, x_end, fine_cols)
+        fine_y = np.linspace(y_start, y_end, fine_rows)
+        image = self._upsample_bilinear(coarse, refinement)
+        refine_rows, refine_cols = self._serpentine_indices(refine_mask)
+        if len(refine_rows):
+            lengths = np.bincount(refine_rows, minlength=fine_rows)
+            lengths = lengths[lengths > 0]
+            offsets = np.concatenate(([0], np.cumsum(lengths)))
+            directions = np.where(np.arange(len(lengths)) % 2 == 0, 1, -1)
+            trajectory = Trajectory(
+                "adaptive_refine",
+                {"coarse_cells": len(selected), "refinement": refinement},
+                np.column_stack((fine_x[refine_cols], fine_y[refine_rows])),
+                offsets,
+                (len(lengths), int(lengths.max())),
+                directions,
+            )
+
+            refine_progress = None
             if progress_callback:
-                progress_callback(
-                    int((current_step / total_steps) * 100),
-                    current_position={"x": x, "y": y, "z": z}
-                )
+                total = coarse_points + len(refine_rows)
+
+                def refine_progress(percent, current_position):
+                    done = coarse_points + percent * len(refine_rows) / 100
+                    progress_callback(int(done * 100 / total), current_position=current_position)
+            if not self.run_trajectory(trajectory, refine_progress):
+                return None
+            image[refine_rows, refine_cols] = self.scan_buffer.acquired("z")
+            measured[refine_rows, refine_cols] = True
+        elif progress_callback:
+            progress_callback(100, current_position=None)
+
+        # Expose the full-resolution result through the scan buffer
+        result = self.trajectory_planner.grid(x_start, x_end, y_start, y_end, fine_rows, fine_cols)
+        self.trajectory = result
+        buffer = self.allocate_scan_buffer(result, ("measured",))
+        buffer.column("x")[:] = fine_x
+        buffer.column("y")[:] = fine_y[:, np.newaxis]
+        buffer.column("z")[:] = image
+        buffer.column("measured")[:] = measured
+        buffer.lines_completed = result.num_lines
+        buffer.points_written = result.num_points
+        self.logger.info(
+            f"Adaptive scan complete: {coarse_points + len(refine_rows)} of {fine_rows * fine_cols} points measured."
+        )
+        return buffer.image("z")
+
+    @staticmethod
+    def _rank_refinement_cells(coarse):
+        """
+        Rank coarse cells by local gradient magnitude plus curvature, highest first.
+        Cells whose score is zero (flat) are left out.
+        :param coarse: Coarse Z image.
+        :return: Flat cell indices into the (rows - 1, cols - 1) cell grid.
+        """
+        grad_y, grad_x = np.gradient(coarse)
+        curvature = np.abs(np.gradient(grad_y, axis=0)) + np.abs(np.gradient(grad_x, axis=1))
+        node_score = np.hypot(grad_x, grad_y) + curvature
+        cell_score = np.maximum.reduce([
+            node_score[:-1, :-1], node_score[:-1, 1:], node_score[1:, :-1], node_score[1:, 1:]
+        ]).ravel()
+        order = np.argsort(cell_score, kind="stable")[::-1]
+        return order[cell_score[order] > 0]
 
-        self.logger.info("Circular scan complete.")
\ No newline at end of file
+    @staticmethod
+    def _upsample_bilinear(coarse, factor):
+        """
+        Bilinearly upsample an image by an integer factor, keeping the coarse nodes.
+        :param coarse: Image of shape (rows, cols), rows and cols at least 2.
+        :param factor: Integer upsampling factor.
+        :return: Image of shape ((rows - 1) * factor + 1, (cols - 1) * factor + 1).
+        """
+        def weights(count):
+            position = np.arange((count - 1) * factor + 1) / factor
+            index = np.minimum(position.astype(np.int64), count - 2)
+            return index, position - index
+
+        row_index, row_frac = weights(coarse.shape[0])
+        col_index, col_frac = weights(coarse.shape[1])
+        rows = coarse[row_index] * (1 - row_frac)[:, np.newaxis] + coarse[row_index + 1] * row_frac[:, np.newaxis]
+        return rows[:, col_index] * (1 - col_frac) + rows[:, col_index + 1] * col_frac
+
+    @staticmethod
+    def _serpentine_indices(mask):
+        """
+        Return the row and column indices of a mask, ordered row by row with every
+        second non-empty row reversed to shorten stage travel.
+        """
+        rows, cols = np.nonzero(mask)
+        if len(rows) == 0:
+            return rows, cols
+        row_ids, starts, counts = np.unique(rows, return_index=True, return_counts=True)
+        order = np.arange(len(rows))
+        for k in range(1, len(row_ids), 2):
+            order[starts[k]:starts[k] + counts[k]] = order[starts[k]:starts[k] + counts[k]][::-1]
+        return rows[order], cols[order]
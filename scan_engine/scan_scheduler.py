@@ -0,0 +1,394 @@
+# File: scan_engine/scan_scheduler.py
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import numpy as np
+from utils.logger import get_logger
+
+
+class ScanJob:
+    """
+    A scan queued on the ScanScheduler.
+    The area and resolution are interpreted per pattern:
+
+    - "raster", "trace_retrace": area (x_start, x_end, y_start, y_end), resolution step_size
+    - "grid": area (x_start, x_end, y_start, y_end), resolution (rows, cols)
+    - "spiral": area (center_x, center_y, radius), resolution step_size
+    - "circle": area (center_x, center_y, radius), resolution num_points
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    PAUSED = "paused"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    _ids = itertools.count(1)
+
+    def __init__(self, pattern, area, resolution, mode=None, priority=0, name=None, channels=None):
+        """
+        Initialize the ScanJob.
+        :param pattern: Scan pattern name understood by TrajectoryPlanner.plan.
+        :param area: Scan area, see the class docstring.
+        :param resolution: Scan resolution, see the class docstring.
+        :param mode: Operating mode switched to before the scan ("contact", "noncontact"),
+                     or None to keep the current mode.
+        :param priority: Jobs with a higher priority run first; equal priorities run in
+                         submission order.
+        :param name: Name used in the output file names; defaults to the pattern.
+        :param channels: Channels of this job only, as for ScanManager.configure_channels,
+                         or None for the channels configured on the ScanManager.
+        """
+        self.id = next(self._ids)
+        self.pattern = pattern
+        self.area = tuple(area)
+        self.resolution = resolution
+        self.mode = mode
+        self.priority = priority
+        self.name = name or pattern
+        self.channels = channels
+        self.state = self.QUEUED
+        self.progress = 0
+        self.output_path = None
+        self.checkpoint_path = None
+        self.error = None
+        self.parameters = self.plan_parameters()
+
+    def plan_parameters(self) -> dict:
+        """
+        Return the TrajectoryPlanner parameters of the job.
+        :return: Keyword arguments for TrajectoryPlanner.plan(pattern, ...).
+        """
+        if self.pattern in ("raster", "trace_retrace", "grid"):
+            if len(self.area) != 4:
+                raise ValueError(f"A {self.pattern} job needs the area (x_start, x_end, y_start, y_end).")
+            parameters = dict(zip(("x_start", "x_end", "y_start", "y_end"), self.area))
+            if self.pattern == "grid":
+                parameters["rows"], parameters["cols"] = self.resolution
+            else:
+                parameters["step_size"] = self.resolution
+        elif self.pattern in ("spiral", "circle"):
+            if len(self.area) != 3:
+                raise ValueError(f"A {self.pattern} job needs the area (center_x, center_y, radius).")
+            parameters = dict(zip(("center_x", "center_y", "radius"), self.area))
+            parameters["step_size" if self.pattern == "spiral" else "num_points"] = self.resolution
+        else:
+            raise ValueError(f"Invalid scan pattern: {self.pattern}")
+        return parameters
+
+    def summary(self) -> dict:
+        """
+        Return the job state as a JSON-serializable dict.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "pattern": self.pattern,
+            "mode": self.mode,
+            "priority": self.priority,
+            "state": self.state,
+            "progress": self.progress,
+            "output_path": self.output_path,
+            "error": self.error,
+        }
+
+
+class ScanScheduler:
+    """
+    Runs queued ScanJobs back to back on a worker thread.
+    Every job writes a checkpoint while it runs, so pausing stops the running job
+    at its next cancellation check and resuming continues it from its last
+    complete line. Checkpoints of cancelled jobs are deleted. Finished jobs are written to <output_dir>/<id>_<name>.npz.
+    Observers read snapshot() and then block in wait_for_change(version), or
+    register a listener that receives the summary of every job that changes.
+    """
+
+    def __init__(self, scan_manager, output_dir, mode_switcher=None):
+        """
+        Initialize the ScanScheduler.
+        :param scan_manager: ScanManager that performs the scans.
+        :param output_dir: Directory for output and checkpoint files; created if missing.
+        :param mode_switcher: Optional ModeSwitcher used for the job modes.
+        """
+        self.scan_manager = scan_manager
+        self.output_dir = output_dir
+        self.mode_switcher = mode_switcher
+        self.jobs = {}
+        self.version = 0
+        self.paused = False
+        self.current_job = None
+        self.finished = []  # Completed, cancelled and failed jobs in the order they finished
+        self.logger = get_logger(__name__)
+        self._queue = []  # heap of (-priority, sequence, job)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._listeners = []
+        self._token = None
+        self._shutdown = False
+        self._thread = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def start(self) -> None:
+        """Start the worker thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self.logger.error("Attempted to start a scheduler that is already running.")
+            raise RuntimeError("The scheduler is already running.")
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._worker, name="ScanScheduler", daemon=True)
+        self._thread.start()
+        self.logger.info("Scan scheduler started.")
+
+    def shutdown(self, timeout=None) -> bool:
+        """
+        Stop the worker thread. A running job is paused, so it can be resumed later
+        from its checkpoint.
+        :param timeout: Maximum time to wait in seconds, or None to wait forever.
+        :return: True if the worker thread has exited.
+        """
+        with self._condition:
+            self._shutdown = True
+            if self._token is not None:
+                self._token.cancel()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def submit(self, job: ScanJob) -> ScanJob:
+        """
+        Queue a job.
+        :param job: The ScanJob to queue.
+        :return: The queued job.
+        """
+        with self._condition:
+            self.jobs[job.id] = job
+            job.state = ScanJob.QUEUED
+            heapq.heappush(self._queue, (-job.priority, next(self._sequence), job))
+            self._changed(job)
+        self.logger.info(f"Queued scan job {job.id} ({job.name}, priority {job.priority}).")
+        return job
+
+    def submit_all(self, jobs) -> list:
+        """
+        Queue several jobs.
+        :param jobs: Iterable of ScanJobs.
+        :return: List of the queued jobs.
+        """
+        return [self.submit(job) for job in jobs]
+
+    def cancel(self, job_id: int) -> None:
+        """
+        Cancel a queued, paused or running job.
+        :param job_id: ID of the job.
+        """
+        with self._condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                self.logger.error(f"Unknown scan job: {job_id}")
+                raise KeyError(f"Unknown scan job: {job_id}")
+            if job.state in (ScanJob.QUEUED, ScanJob.PAUSED):
+                job.state = ScanJob.CANCELLED  # Skipped when it reaches the top of the queue
+                self._discard_checkpoint(job)
+                self.finished.append(job)
+                self._changed(job)
+            elif job.state == ScanJob.RUNNING:
+                job.state = ScanJob.CANCELLED  # Reported by the worker once the scan has stopped
+                self._token.cancel()
+
+    def pause(self) -> None:
+        """
+        Pause the queue. The running job stops at its next cancellation check and is
+        resumed from its checkpoint by resume().
+        """
+        with self._condition:
+            self.paused = True
+            if self._token is not None:
+                self._token.cancel()
+            self._changed()
+        self.logger.info("Scan scheduler paused.")
+
+    def resume(self) -> None:
+        """Resume a paused queue."""
+        with self._condition:
+            self.paused = False
+            self._changed()
+        self.logger.info("Scan scheduler resumed.")
+
+    def add_listener(self, listener) -> None:
+        """
+        Register a callable receiving (version, job_summary) on every change.
+        job_summary is None for changes of the queue itself (pause and resume).
+        Listeners are called on the thread that made the change and must not block.
+        :param listener: The callable.
+        """
+        with self._condition:
+            self._listeners.append(listener)
+
+    def snapshot(self) -> dict:
+        """
+        Return the queue state as a JSON-serializable dict.
+        """
+        with self._condition:
+            queued = [job.summary() for _, _, job in sorted(self._queue) if job.state != ScanJob.CANCELLED]
+            return {
+                "version": self.version,
+                "paused": self.paused,
+                "current_job": self.current_job.summary() if self.current_job else None,
+                "queued": queued,
+                "finished": [job.summary() for job in self.finished],
+            }
+
+    def wait_for_change(self, version: int, timeout=None):
+        """
+        Block until the state version is newer than version.
+        :param version: The last version the caller has seen.
+        :param timeout: Maximum time to wait in seconds, or None to wait forever.
+        :return: The new snapshot, or None on timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.version > version, timeout):
+                return None
+        return self.snapshot()
+
+    def wait_until_idle(self, timeout=None) -> bool:
+        """
+        Block until no job is running or queued (paused jobs count as queued).
+        :param timeout: Maximum time to wait in seconds, or None to wait forever.
+        :return: True if the queue is idle.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.current_job is None
+                and all(job.state == ScanJob.CANCELLED for _, _, job in self._queue),
+                timeout,
+            )
+
+    def _changed(self, job=None):
+        """
+        Bump the state version and notify waiters and listeners. Called with the lock held.
+        """
+        self.version += 1
+        self._condition.notify_all()
+        summary = job.summary() if job is not None else None
+        for listener in self._listeners:
+            try:
+                listener(self.version, summary)
+            except Exception as e:
+                self.logger.error(f"Scan scheduler listener failed: {e}")
+
+    def _next_job(self):
+        """
+        Wait for the next runnable job.
+        :return: The job, or None on shutdown.
+        """
+        with self._condition:
+            while True:
+                while self._queue and self._queue[0][2].state == ScanJob.CANCELLED:
+                    heapq.heappop(self._queue)
+                    self._condition.notify_all()
+                if self._shutdown:
+                    return None
+                if self._queue and not self.paused:
+                    job = heapq.heappop(self._queue)[2]
+                    job.state = ScanJob.RUNNING
+                    self.current_job = job
+                    self._token = self.scan_manager.start_scan()
+                    self._changed(job)
+                    return job
+                self._condition.wait()
+
+    def _worker(self):
+        """
+        Worker thread body.
+        """
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            completed = False
+            error = None
+            try:
+                completed = self._run_job(job)
+            except Exception as e:
+                self.logger.error(f"Scan job {job.id} failed: {e}")
+                error = e
+
+            with self._condition:
+                if error is not None:
+                    job.state = ScanJob.FAILED
+                    job.error = str(error)
+                elif completed:
+                    job.state = ScanJob.COMPLETED
+                elif job.state != ScanJob.CANCELLED:
+                    # Stopped by pause() or shutdown(): continue from the checkpoint later
+                    job.state = ScanJob.PAUSED
+                    heapq.heappush(self._queue, (-job.priority, next(self._sequence), job))
+                if job.state == ScanJob.CANCELLED:
+                    self._discard_checkpoint(job)
+                if job.state != ScanJob.PAUSED:
+                    self.finished.append(job)
+                self.current_job = None
+                self._token = None
+                self._changed(job)
+            self.logger.info(f"Scan job {job.id} ({job.name}) {job.state}.")
+
+    def _run_job(self, job):
+        """
+        Run or resume a job on the worker thread.
+        :return: True if the job completed.
+        """
+        if self.mode_switcher is not None and job.mode is not None:
+            self.mode_switcher.switch_mode(job.mode)
+        def progress(percent, current_position):
+            with self._condition:
+                job.progress = percent
+                self._changed(job)
+
+        base = os.path.join(self.output_dir, f"{job.id}_{job.name}")
+        if job.checkpoint_path is not None and os.path.exists(job.checkpoint_path):
+            completed = self.scan_manager.resume_scan(
+                job.checkpoint_path, progress, cancel_token=self._token, channels=job.channels
+            )
+        else:
+            job.checkpoint_path = base + ".ckpt"
+            trajectory = self.scan_manager.trajectory_planner.plan(job.pattern, **job.parameters)
+            completed = self.scan_manager.run_trajectory(
+                trajectory, progress, cancel_token=self._token, checkpoint_path=job.checkpoint_path,
+                channels=job.channels
+            )
+        if completed:
+            job.output_path = self._write_output(job, base + ".npz")
+            os.remove(job.checkpoint_path)
+            job.checkpoint_path = None
+        return completed
+
+    def _discard_checkpoint(self, job):
+        """
+        Delete the checkpoint of a cancelled job, which can no longer be resumed.
+        """
+        if job.checkpoint_path is not None and os.path.exists(job.checkpoint_path):
+            os.remove(job.checkpoint_path)
+            self.logger.info(f"Deleted the checkpoint of cancelled scan job {job.id}.")
+        job.checkpoint_path = None
+
+    def _write_output(self, job, path):
+        """
+        Write the scan buffer of a finished job to an .npz file with one image per
+        column and direction ("z", "z_backward", ...) and the job summary as JSON.
+        :return: The output path.
+        """
+        buffer = self.scan_manager.scan_buffer
+        arrays = {}
+        for name in buffer.columns:
+            arrays[name] = buffer.column(name, "forward")
+            if buffer.num_passes > 1:
+                arrays[f"{name}_backward"] = buffer.column(name, "backward")
+        summary = job.summary()
+        summary["parameters"] = job.parameters
+        np.savez(path, metadata=json.dumps(summary), **arrays)
+        return path
@@ -0,0 +1,479 @@
+# File: scan_engine/trajectory.py
+
+import threading
+import numpy as np
+from scan_engine.point_ordering import PointOrderer
+from utils.logger import get_logger
+
+
+class Trajectory:
+    """
+    A scan path computed up front as an (N, 2) array of XY coordinates.
+    Points are grouped into lines; line ``i`` spans
+    ``points[line_offsets[i]:line_offsets[i + 1]]``.
+    """
+
+    def __init__(self, pattern, parameters, points, line_offsets, shape=None, directions=None, line_rows=None,
+                 line_passes=None, source_indices=None, offset=(0.0, 0.0), drift_per_line=(0.0, 0.0)):
+        """
+        Initialize the Trajectory.
+        :param pattern: Name of the scan pattern, e.g. "raster", "trace_retrace" or "lissajous".
+        :param parameters: Dictionary of parameters the trajectory was planned from.
+        :param points: (N, 2) float array of XY coordinates in acquisition order.
+        :param line_offsets: Start index of every line, followed by N.
+        :param shape: (rows, cols) of the image the trajectory fills, or None for (1, N).
+        :param directions: +1 (forward) or -1 (backward) for every line.
+        :param line_rows: Image row filled by every line.
+        :param line_passes: Image pass filled by every line (0 = trace, 1 = retrace).
+        :param source_indices: For point lists, the index of every trajectory point in the
+                               caller's list, or None.
+        :param offset: (x, y) drift compensation already added to the points.
+        :param drift_per_line: Additional (x, y) compensation added per line index.
+        """
+        self.pattern = pattern
+        self.parameters = dict(parameters)
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self.line_offsets = np.asarray(line_offsets, dtype=np.int64)
+        num_lines = len(self.line_offsets) - 1
+        self.shape = tuple(shape) if shape is not None else (1, len(self.points))
+        self.directions = (
+            np.ones(num_lines, dtype=np.int8) if directions is None else np.asarray(directions, dtype=np.int8)
+        )
+        self.line_rows = np.arange(num_lines, dtype=np.int64) if line_rows is None else np.asarray(line_rows, dtype=np.int64)
+        self.line_passes = (
+            np.zeros(num_lines, dtype=np.int64) if line_passes is None else np.asarray(line_passes, dtype=np.int64)
+        )
+        self.source_indices = None if source_indices is None else np.asarray(source_indices, dtype=np.int64)
+        self.offset = tuple(float(value) for value in offset)
+        self.drift_per_line = tuple(float(value) for value in drift_per_line)
+        self._line_index = None
+        self._buffer_index = None
+
+    @property
+    def num_passes(self) -> int:
+        """Number of images filled per channel: 2 for trace/retrace, 1 otherwise."""
+        return int(self.line_passes.max()) + 1 if len(self.line_passes) else 1
+
+    @property
+    def num_points(self) -> int:
+        """Exact number of points on the trajectory."""
+        return len(self.points)
+
+    @property
+    def num_lines(self) -> int:
+        """Number of lines on the trajectory."""
+        return len(self.line_offsets) - 1
+
+    @property
+    def x(self) -> np.ndarray:
+        """X coordinates of every point (view)."""
+        return self.points[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        """Y coordinates of every point (view)."""
+        return self.points[:, 1]
+
+    @property
+    def line_index(self) -> np.ndarray:
+        """Line of every point, computed once."""
+        if self._line_index is None:
+            self._line_index = np.repeat(np.arange(self.num_lines, dtype=np.int64), np.diff(self.line_offsets))
+        return self._line_index
+
+    @property
+    def buffer_index(self) -> np.ndarray:
+        """
+        Flat index of every point into the (passes, rows, cols) image planes of a
+        ScanBuffer, computed once. Backward lines fill their row from the right.
+        """
+        if self._buffer_index is None:
+            line_index = self.line_index
+            within = np.arange(self.num_points, dtype=np.int64) - self.line_offsets[line_index]
+            rows, cols = self.shape
+            col = np.where(self.directions[line_index] < 0, cols - 1 - within, within)
+            self._buffer_index = (self.line_passes[line_index] * rows + self.line_rows[line_index]) * cols + col
+        return self._buffer_index
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the trajectory arrays, including computed index tables."""
+        arrays = (self.points, self.line_offsets, self.directions, self.line_rows, self.line_passes,
+                  self.source_indices, self._line_index, self._buffer_index)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def freeze(self):
+        """
+        Compute the index tables and make all arrays read-only, so the trajectory can be
+        shared between scans (see TrajectoryCache).
+        :return: The trajectory itself.
+        """
+        # Compute the index tables before the arrays are locked
+        self._line_index = self.line_index
+        self._buffer_index = self.buffer_index
+        for array in (self.points, self.line_offsets, self.directions, self.line_rows, self.line_passes,
+                      self.source_indices, self._line_index, self._buffer_index):
+            if array is not None:
+                array.setflags(write=False)
+        return self
+
+    def shifted(self, offset, drift_per_line=(0.0, 0.0)):
+        """
+        Return a copy whose points are moved by offset + drift_per_line * line index.
+        Only the points are copied; line tables and index tables are shared.
+        :param offset: (x, y) shift of every point.
+        :param drift_per_line: Additional (x, y) shift per line index.
+        :return: The shifted Trajectory.
+        """
+        points = self.points + np.asarray(offset, dtype=np.float64)
+        if np.any(drift_per_line):
+            points += self.line_index[:, np.newaxis] * np.asarray(drift_per_line, dtype=np.float64)
+        shifted = Trajectory(
+            self.pattern, self.parameters, points, self.line_offsets, self.shape, self.directions, self.line_rows,
+            self.line_passes, self.source_indices, np.add(self.offset, offset), np.add(self.drift_per_line, drift_per_line)
+        )
+        shifted._line_index, shifted._buffer_index = self._line_index, self._buffer_index
+        return shifted
+
+    def line(self, index: int) -> np.ndarray:
+        """
+        Return the points of a single line.
+        :param index: Line index.
+        :return: (n, 2) view into the trajectory points.
+        """
+        return self.points[self.line_offsets[index]:self.line_offsets[index + 1]]
+
+    def __len__(self):
+        return self.num_points
+
+
+class TrajectoryPlanner:
+    """
+    Builds complete scan trajectories for the ScanManager scan patterns.
+    offset and drift_per_line shift every trajectory plan() returns to follow sample
+    drift; they are set by a DriftTracker and default to no compensation. The pattern
+    methods return uncompensated trajectories.
+    """
+
+    def __init__(self, cache=None):
+        """
+        Initialize the TrajectoryPlanner.
+        :param cache: Optional TrajectoryCache that plan() reuses trajectories from.
+        """
+        self.cache = cache
+        self.offset = (0.0, 0.0)
+        self.drift_per_line = (0.0, 0.0)
+        self._drift_lock = threading.Lock()
+        self.logger = get_logger(__name__)
+
+    def set_drift(self, offset, drift_per_line=(0.0, 0.0)) -> None:
+        """
+        Set the drift compensation of the trajectories planned from now on.
+        :param offset: (x, y) shift of every point.
+        :param drift_per_line: Additional (x, y) shift per line index.
+        """
+        with self._drift_lock:
+            self.offset = tuple(float(value) for value in offset)
+            self.drift_per_line = tuple(float(value) for value in drift_per_line)
+
+    def reset_drift(self) -> None:
+        """Remove the drift compensation."""
+        self.set_drift((0.0, 0.0))
+
+    def plan(self, pattern: str, drift=None, **parameters) -> Trajectory:
+        """
+        Plan a trajectory by pattern name, with the drift compensation added to its points.
+        :param pattern: One of "raster", "trace_retrace", "grid", "circle", "spiral", "point_list",
+                        "lissajous", "clv_spiral".
+        :param drift: (offset, drift_per_line) to compensate instead of the current one, e.g.
+                      the compensation a checkpointed scan was started with.
+        :param parameters: Keyword arguments of the matching planner method.
+        :return: The planned Trajectory.
+        """
+        planners = {
+            "raster": self.raster,
+            "trace_retrace": self.trace_retrace,
+            "grid": self.grid,
+            "circle": self.circle,
+            "spiral": self.spiral,
+            "point_list": self.point_list,
+            "lissajous": self.lissajous,
+            "clv_spiral": self.clv_spiral,
+        }
+        if pattern not in planners:
+            self.logger.error(f"Invalid scan pattern: {pattern}")
+            raise ValueError(f"Invalid scan pattern: {pattern}")
+        if drift is None:
+            # Both halves of the compensation from the same DriftTracker update
+            with self._drift_lock:
+                drift = (self.offset, self.drift_per_line)
+        if self.cache is None:
+            return self._compensate(planners[pattern](**parameters), *drift)
+
+        # The cache holds uncompensated, read-only trajectories; drift compensation is
+        # added to a copy of the points, which is cheap compared to planning
+        key = self.cache.key(pattern, parameters)
+        trajectory = self.cache.get(key)
+        if trajectory is None:
+            trajectory = planners[pattern](**parameters).freeze()
+            self.cache.put(key, trajectory)
+        return self._compensate(trajectory, *drift)
+
+    def raster(self, x_start, x_end, y_start, y_end, step_size) -> Trajectory:
+        """
+        Plan a serpentine raster: even lines run +X, odd lines run -X.
+        :param x_start: Start of the X range.
+        :param x_end: End of the X range (included when it falls on a step).
+        :param y_start: Start of the Y range.
+        :param y_end: End of the Y range (included when it falls on a step).
+        :param step_size: Distance between neighbouring points; may be a float.
+        :return: The planned Trajectory.
+        """
+        xs = self._axis_positions(x_start, x_end, step_size)
+        ys = self._axis_positions(y_start, y_end, step_size)
+        rows, cols = len(ys), len(xs)
+
+        grid_x = np.broadcast_to(xs, (rows, cols)).copy()
+        grid_x[1::2] = grid_x[1::2, ::-1]  # Zigzag pattern
+        points = np.empty((rows * cols, 2), dtype=np.float64)
+        points[:, 0] = grid_x.ravel()
+        points[:, 1] = np.repeat(ys, cols)
+
+        directions = np.ones(rows, dtype=np.int8)
+        directions[1::2] = -1
+        parameters = {"x_start": x_start, "x_end": x_end, "y_start": y_start, "y_end": y_end, "step_size": step_size}
+        return Trajectory("raster", parameters, points, np.arange(rows + 1) * cols, (rows, cols), directions)
+
+    def trace_retrace(self, x_start, x_end, y_start, y_end, step_size) -> Trajectory:
+        """
+        Plan a trace/retrace raster: every row is scanned +X (trace) and then -X (retrace).
+        Trace lines fill image pass 0 and retrace lines fill image pass 1.
+        :param x_start: Start of the X range.
+        :param x_end: End of the X range (included when it falls on a step).
+        :param y_start: Start of the Y range.
+        :param y_end: End of the Y range (included when it falls on a step).
+        :param step_size: Distance between neighbouring points; may be a float.
+        :return: The planned Trajectory.
+        """
+        xs = self._axis_positions(x_start, x_end, step_size)
+        ys = self._axis_positions(y_start, y_end, step_size)
+        rows, cols = len(ys), len(xs)
+
+        grid_x = np.empty((rows, 2, cols), dtype=np.float64)
+        grid_x[:, 0] = xs
+        grid_x[:, 1] = xs[::-1]
+        points = np.empty((rows * 2 * cols, 2), dtype=np.float64)
+        points[:, 0] = grid_x.ravel()
+        points[:, 1] = np.repeat(ys, 2 * cols)
+
+        directions = np.tile(np.array([1, -1], dtype=np.int8), rows)
+        line_rows = np.repeat(np.arange(rows), 2)
+        line_passes = np.tile([0, 1], rows)
+        parameters = {"x_start": x_start, "x_end": x_end, "y_start": y_start, "y_end": y_end, "step_size": step_size}
+        return Trajectory(
+            "trace_retrace", parameters, points, np.arange(2 * rows + 1) * cols, (rows, cols),
+            directions, line_rows, line_passes
+        )
+
+    def grid(self, x_start, x_end, y_start, y_end, rows, cols) -> Trajectory:
+        """
+        Plan a grid of rows x cols points; every line runs +X.
+        :param x_start: Start of the X range.
+        :param x_end: End of the X range.
+        :param y_start: Start of the Y range.
+        :param y_end: End of the Y range.
+        :param rows: Number of points along Y.
+        :param cols: Number of points along X.
+        :return: The planned Trajectory.
+        """
+        if rows <= 0 or cols <= 0:
+            raise ValueError("Rows and columns must be positive integers.")
+        xs = np.linspace(x_start, x_end, cols)
+        ys = np.linspace(y_start, y_end, rows)
+        points = np.empty((rows * cols, 2), dtype=np.float64)
+        points[:, 0] = np.tile(xs, rows)
+        points[:, 1] = np.repeat(ys, cols)
+
+        parameters = {"x_start": x_start, "x_end": x_end, "y_start": y_start, "y_end": y_end, "rows": rows, "cols": cols}
+        return Trajectory("grid", parameters, points, np.arange(rows + 1) * cols, (rows, cols))
+
+    def circle(self, center_x, center_y, radius, num_points) -> Trajectory:
+        """
+        Plan num_points equally spaced points on a circle.
+        :param center_x: X coordinate of the center.
+        :param center_y: Y coordinate of the center.
+        :param radius: Radius of the circle.
+        :param num_points: Number of points on the circle.
+        :return: The planned Trajectory.
+        """
+        if num_points <= 0:
+            raise ValueError("Number of points must be a positive integer.")
+        theta = 2 * np.pi * np.arange(num_points) / num_points
+        points = np.column_stack((center_x + radius * np.cos(theta), center_y + radius * np.sin(theta)))
+
+        parameters = {"center_x": center_x, "center_y": center_y, "radius": radius, "num_points": num_points}
+        return Trajectory("circle", parameters, points, [0, num_points])
+
+    def spiral(self, center_x, center_y, radius, step_size) -> Trajectory:
+        """
+        Plan an Archimedean spiral from the center outwards.
+        The radius grows by step_size / (2 * pi) per point and the angle by
+        step_size / r, so the point count is known exactly before the scan starts.
+        :param center_x: X coordinate of the center.
+        :param center_y: Y coordinate of the center.
+        :param radius: Outer radius of the spiral.
+        :param step_size: Arc length between neighbouring points.
+        :return: The planned Trajectory.
+        """
+        if step_size <= 0:
+            raise ValueError("Step size must be positive.")
+        if radius < 0:
+            raise ValueError("Radius must be non-negative.")
+        num_points = int(np.floor(radius * 2 * np.pi / step_size + 1e-9)) + 1
+        k = np.arange(num_points)
+        r = k * step_size / (2 * np.pi)
+
+        # theta_k = step_size + sum_{j=1}^{k-1} step_size / r_j = step_size + 2*pi*H(k-1)
+        increments = np.empty(num_points, dtype=np.float64)
+        increments[0] = 0.0
+        if num_points > 1:
+            increments[1] = step_size
+            increments[2:] = 2 * np.pi / k[1:-1]
+        theta = np.cumsum(increments)
+        points = np.column_stack((center_x + r * np.cos(theta), center_y + r * np.sin(theta)))
+
+        parameters = {"center_x": center_x, "center_y": center_y, "radius": radius, "step_size": step_size}
+        return Trajectory("spiral", parameters, points, [0, num_points])
+
+    def point_list(self, points, order="hilbert", improve=True, line_length=256) -> Trajectory:
+        """
+        Plan a visit of arbitrary measurement sites (spectroscopy grids, picked points,
+        masked regions) in an order that keeps stage travel short; see PointOrderer.
+        The sites are split into lines of line_length points, so cancellation and
+        checkpoints work at that granularity.
+        :param points: (N, 2) array of XY coordinates.
+        :param order: Ordering method: "hilbert", "morton", "nearest_neighbor" or "none".
+        :param improve: Refine the order with a windowed 2-opt.
+        :param line_length: Number of points per line.
+        :return: The planned Trajectory; source_indices maps it back to the given points.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if len(points) == 0:
+            raise ValueError("The point list is empty.")
+        visit = PointOrderer().order(points, order, improve)
+        offsets, shape = self._chunk_lines(len(points), line_length)
+        parameters = {"points": points, "order": order, "improve": improve, "line_length": line_length}
+        return Trajectory("point_list", parameters, points[visit], offsets, shape, source_indices=visit)
+
+    def lissajous(self, x_start, x_end, y_start, y_end, freq_x, freq_y, num_points, phase=np.pi / 2,
+                  line_length=256) -> Trajectory:
+        """
+        Plan one period of a Lissajous figure filling the rectangle:
+        x = cx + ax * sin(2 pi freq_x t), y = cy + ay * sin(2 pi freq_y t + phase), 0 <= t < 1.
+        Both axes move sinusoidally, so there are no raster turnarounds. With coprime integer
+        frequencies the path closes after one period and its line density grows with them.
+        The samples are scattered; ScanManager.regrid_scan turns them into an image.
+        :param x_start: Start of the X range.
+        :param x_end: End of the X range.
+        :param y_start: Start of the Y range.
+        :param y_end: End of the Y range.
+        :param freq_x: Number of X oscillations per period.
+        :param freq_y: Number of Y oscillations per period.
+        :param num_points: Number of samples, taken at equal time intervals.
+        :param phase: Phase of the Y axis in radians.
+        :param line_length: Number of samples per line (cancellation and checkpoint granularity).
+        :return: The planned Trajectory.
+        """
+        if num_points <= 0:
+            raise ValueError("Number of points must be a positive integer.")
+        if freq_x <= 0 or freq_y <= 0:
+            raise ValueError("Lissajous frequencies must be positive.")
+        t = np.arange(num_points) / num_points
+        points = np.column_stack((
+            (x_start + x_end) / 2 + (x_end - x_start) / 2 * np.sin(2 * np.pi * freq_x * t),
+            (y_start + y_end) / 2 + (y_end - y_start) / 2 * np.sin(2 * np.pi * freq_y * t + phase),
+        ))
+        offsets, shape = self._chunk_lines(num_points, line_length)
+        parameters = {
+            "x_start": x_start, "x_end": x_end, "y_start": y_start, "y_end": y_end, "freq_x": freq_x,
+            "freq_y": freq_y, "num_points": num_points, "phase": phase, "line_length": line_length,
+        }
+        return Trajectory("lissajous", parameters, points, offsets, shape)
+
+    def clv_spiral(self, center_x, center_y, radius, pitch, point_spacing, line_length=256) -> Trajectory:
+        """
+        Plan a constant-linear-velocity Archimedean spiral r = pitch * theta / (2 pi).
+        Samples are equally spaced along the path (point_spacing), so a constant sample
+        rate means a constant tip velocity, unlike spiral(), whose spacing varies.
+        :param center_x: X coordinate of the center.
+        :param center_y: Y coordinate of the center.
+        :param radius: Outer radius of the spiral.
+        :param pitch: Distance between neighbouring turns.
+        :param point_spacing: Arc length between neighbouring samples.
+        :param line_length: Number of samples per line (cancellation and checkpoint granularity).
+        :return: The planned Trajectory.
+        """
+        if pitch <= 0 or point_spacing <= 0:
+            raise ValueError("Pitch and point spacing must be positive.")
+        if radius < 0:
+            raise ValueError("Radius must be non-negative.")
+        a = pitch / (2 * np.pi)
+
+        def arc_length(theta):
+            root = np.sqrt(1 + theta * theta)
+            return a / 2 * (theta * root + np.arcsinh(theta))
+
+        theta_max = radius / a
+        s = np.arange(int(np.floor(arc_length(theta_max) / point_spacing + 1e-9)) + 1) * point_spacing
+        # Invert the arc length with Newton steps from the large-theta approximation s = a theta^2 / 2
+        theta = np.sqrt(2 * s / a)
+        for _ in range(8):
+            theta -= (arc_length(theta) - s) / (a * np.sqrt(1 + theta * theta))
+            np.clip(theta, 0.0, theta_max, out=theta)
+        r = a * theta
+        points = np.column_stack((center_x + r * np.cos(theta), center_y + r * np.sin(theta)))
+
+        offsets, shape = self._chunk_lines(len(points), line_length)
+        parameters = {
+            "center_x": center_x, "center_y": center_y, "radius": radius, "pitch": pitch,
+            "point_spacing": point_spacing, "line_length": line_length,
+        }
+        return Trajectory("clv_spiral", parameters, points, offsets, shape)
+
+    @staticmethod
+    def _compensate(trajectory, offset, drift_per_line) -> Trajectory:
+        """
+        Return the trajectory moved by offset + drift_per_line * line index, or the
+        trajectory itself if there is no drift compensation.
+        """
+        if not (np.any(offset) or np.any(drift_per_line)):
+            return trajectory
+        return trajectory.shifted(offset, drift_per_line)
+
+    @staticmethod
+    def _chunk_lines(num_points, line_length):
+        """
+        Split num_points samples into lines of line_length samples, the last one shorter.
+        :return: (line_offsets, shape)
+        """
+        if line_length <= 0:
+            raise ValueError("Line length must be a positive integer.")
+        num_lines = -(-num_points // line_length)
+        offsets = np.minimum(np.arange(num_lines + 1) * line_length, num_points)
+        return offsets, (num_lines, min(line_length, num_points))
+
+    @staticmethod
+    def _axis_positions(start, end, step_size) -> np.ndarray:
+        """
+        Return the positions start, start + step, ... up to and including end.
+        :param start: First position.
+        :param end: Last allowed position.
+        :param step_size: Distance between positions.
+        :return: 1D float array of positions.
+        """
+        if step_size <= 0:
+            raise ValueError("Step size must be positive.")
+        if end < start:
+            raise ValueError("Scan range end must not be smaller than its start.")
+        count = int(np.floor((end - start) / step_size + 1e-9)) + 1
+        return start + np.arange(count) * step_size
@@ -0,0 +1,40 @@
+# File: scan_engine/trajectory_cache.py
+
+import hashlib
+import numpy as np
+from utils.byte_budget_cache import ByteBudgetCache
+
+
+class TrajectoryCache(ByteBudgetCache):
+    """
+    Byte-budget LRU cache of planned trajectories. Repeated and time-lapse scans plan
+    the same multi-million-point paths frame after frame; with the cache, the points and
+    the per-line index tables are built once and shared as read-only arrays (see
+    Trajectory.freeze). Entries are keyed by the pattern and all its planning parameters.
+    """
+
+    @classmethod
+    def key(cls, pattern, parameters) -> tuple:
+        """
+        Build the cache key of a trajectory: the pattern followed by its parameters
+        sorted by name. Arrays (e.g. the sites of a point list) are keyed by their
+        shape, type and a digest of their contents.
+        :param pattern: Scan pattern name.
+        :param parameters: Dictionary of planning parameters.
+        :return: A hashable key.
+        """
+        return (pattern,) + tuple((name, cls._hashable(value)) for name, value in sorted(parameters.items()))
+
+    @staticmethod
+    def _hashable(value):
+        """
+        Convert a parameter value into a hashable form.
+        """
+        if isinstance(value, np.ndarray) or isinstance(value, (list, tuple)) and np.ndim(value) > 1:
+            array = np.ascontiguousarray(value)
+            return ("array", array.shape, array.dtype.str, hashlib.sha1(array.tobytes()).hexdigest())
+        if isinstance(value, (list, tuple)):
+            return tuple(TrajectoryCache._hashable(item) for item in value)
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
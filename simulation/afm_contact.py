@@ -3,10 +3,176 @@
 import numpy as np
 from utils.logger import get_logger
 
+# Units: lengths in nm, forces in nN, moduli in GPa (nN/nm^2), spring constants in N/m (nN/nm)
+# and works of adhesion in J/m^2 (nN/nm)
+
+
+class ContactModel:
+    """
+    Force curves of a spherical tip on an elastic sample, for whole force-volume maps at once.
+      - "hertz": F = 4/3 E* sqrt(R) d^3/2 in contact, no adhesion.
+      - "dmt": Hertz minus the adhesion 2 pi R w in contact, and an attractive tail
+        -2 pi R w (a0 / (a0 - d))^2 before contact.
+      - "jkr": the JKR contact, parametrized by the contact radius a,
+        d = a^2 / R - sqrt(2 pi w a / E*), F = 4 E* a^3 / (3 R) - sqrt(8 pi w E* a^3).
+    Each model gives one path of (indentation d, force F). With the cantilever compliance,
+    a piezo position z = d - h + F / k belongs to every point of the path, where h is the
+    local contact height. Where z(d) folds back, the cantilever jumps. On approach the
+    tip follows the running maximum of z along the path, and on retract the running
+    minimum of the reversed path. This gives jump-to-contact, pull-off and the
+    approach/retract hysteresis for any spring constant. Curves are processed in chunks,
+    and the paths are interpolated onto the common z grid with one cumulative count per chunk.
+    """
+
+    MODELS = ("hertz", "dmt", "jkr")
+    CHUNK_CURVES = 128
+
+    def __init__(self, model="dmt", tip_radius=10.0, spring_constant=1.0, poisson_ratio=0.3,
+                 interaction_range=0.3, noise=0.0, seed=None):
+        """
+        Initialize the ContactModel.
+        :param model: "hertz", "dmt" or "jkr".
+        :param tip_radius: Radius of the tip apex in nm.
+        :param spring_constant: Cantilever spring constant in N/m.
+        :param poisson_ratio: Poisson ratio of the sample; the tip is taken as rigid.
+        :param interaction_range: Decay length a0 of the DMT attraction before contact, in nm.
+        :param noise: RMS force noise in nN.
+        :param seed: Seed of the noise.
+        """
+        self.logger = get_logger(__name__)
+        if model not in self.MODELS:
+            self.logger.error(f"Invalid contact model: {model}")
+            raise ValueError(f"Invalid contact model: {model}")
+        if tip_radius <= 0 or spring_constant <= 0 or interaction_range <= 0:
+            self.logger.error("Tip radius, spring constant and interaction range must be positive.")
+            raise ValueError("Tip radius, spring constant and interaction range must be positive.")
+        if not 0 <= poisson_ratio <= 0.5:
+            self.logger.error("The Poisson ratio must lie in [0, 0.5].")
+            raise ValueError("The Poisson ratio must lie in [0, 0.5].")
+        self.model = model
+        self.tip_radius = float(tip_radius)
+        self.spring_constant = float(spring_constant)
+        self.poisson_ratio = float(poisson_ratio)
+        self.interaction_range = float(interaction_range)
+        self.noise = float(noise)
+        self.rng = np.random.default_rng(seed)
+
+    def force_curves(self, z, youngs_modulus, work_of_adhesion=0.0, contact_height=0.0) -> tuple:
+        """
+        Approach and retract force curves for maps of sample properties.
+        :param z: Increasing piezo positions in nm, toward the sample; the tip touches a
+                  sample of contact height 0 at z = 0.
+        :param youngs_modulus: Young's modulus of the sample in GPa, scalar or map.
+        :param work_of_adhesion: Work of adhesion in J/m^2, scalar or map.
+        :param contact_height: Local height of the sample in nm, scalar or map.
+        :return: (approach, retract) forces in nN, each of shape map shape + (len(z),), in float32.
+        """
+        z = np.asarray(z, dtype=np.float64)
+        if z.ndim != 1 or len(z) < 2 or np.any(np.diff(z) <= 0):
+            self.logger.error("Piezo positions must be a strictly increasing 1D array.")
+            raise ValueError("Piezo positions must be a strictly increasing 1D array.")
+        modulus, adhesion, height = np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in
+                                                          (youngs_modulus, work_of_adhesion, contact_height)))
+        if np.any(modulus <= 0) or np.any(adhesion < 0):
+            self.logger.error("Young's moduli must be positive and works of adhesion non-negative.")
+            raise ValueError("Young's moduli must be positive and works of adhesion non-negative.")
+        shape = modulus.shape
+        reduced = (modulus / (1 - self.poisson_ratio ** 2)).ravel()
+        adhesion, height = adhesion.ravel(), height.ravel()
+        approach = np.empty((reduced.size, len(z)), dtype=np.float32)
+        retract = np.empty_like(approach)
+        for start in range(0, reduced.size, self.CHUNK_CURVES):
+            chunk = slice(start, start + self.CHUNK_CURVES)
+            indentation, force = self._path(reduced[chunk], adhesion[chunk], height[chunk], z[0], z[-1], len(z))
+            position = indentation - height[chunk, None] + force / self.spring_constant
+            # Stable states: the running maximum of z on approach, the running minimum on retract
+            highest = np.maximum.accumulate(position, axis=1)
+            approach[chunk] = _interpolate_rows(highest, position, force, z, "right")
+            lowest = np.minimum.accumulate(position[:, ::-1], axis=1)[:, ::-1]
+            retract[chunk] = _interpolate_rows(lowest, position, force, z, "left")
+        if self.noise > 0:
+            approach += self.rng.normal(scale=self.noise, size=approach.shape).astype(np.float32)
+            retract += self.rng.normal(scale=self.noise, size=retract.shape).astype(np.float32)
+        return approach.reshape(shape + (len(z),)), retract.reshape(shape + (len(z),))
+
+    def _path(self, reduced, adhesion, height, z_start, z_end, points) -> tuple:
+        """
+        Path of (indentation, force) from far out of contact to the deepest indentation, per curve.
+        """
+        s = np.linspace(0.0, 1.0, points)[None, :]
+        start = np.minimum(z_start + height, -1e-6)[:, None]  # Indentation at the first piezo position
+        radius = self.tip_radius
+        # The tip reaches d = z + h - F / k, beyond z + h by at most the largest adhesive force over k.
+        # For Hertz and DMT this is also the largest u = z + h - F(0) / k of the contact branch.
+        adhesive = {"hertz": 0.0, "dmt": 2.0, "jkr": 1.5}[self.model] * np.pi * radius * adhesion
+        deepest = np.maximum(z_end + height + adhesive / self.spring_constant, 0.0)[:, None]
+        outside = start * (1 - s[:, :-1])  # Up to, not including, the contact point
+        reduced, adhesion = reduced[:, None], adhesion[:, None]
+        if self.model == "jkr":
+            tail = np.zeros_like(outside)
+            # Contact radius at the deepest indentation: t = sqrt(a) solves t^4 / R - c t = d
+            c = np.sqrt(2 * np.pi * adhesion / reduced)
+            t = (radius * deepest) ** 0.25 + (c * radius) ** (1 / 3)
+            for _ in range(60):
+                t = (radius * (deepest + c * t)) ** 0.25
+            a = t * t * s
+            inside = a * a / radius - c * np.sqrt(a)
+            contact = 4 * reduced * a ** 3 / (3 * radius) - 2 * reduced * c * a ** 1.5
+        else:
+            # Sample u = d + (F - F(0)) / k = z + h - F(0) / k, the piezo position on the contact
+            # branch, so that soft cantilevers are sampled as finely as stiff ones; denser near the
+            # contact point. With t = sqrt(d), t^2 + b t^3 = u is solved by Newton steps from the
+            # upper bound min(sqrt(u), (u / b)^1/3).
+            stiffness = 4 / 3 * reduced * np.sqrt(radius)
+            b = stiffness / self.spring_constant
+            u = deepest * s * s
+            t = np.minimum(np.sqrt(u), np.cbrt(u / b))
+            for _ in range(4):  # Relative error below 1e-10 for any b
+                square = t * t
+                t -= (square + b * square * t - u) / np.maximum(2 * t + 3 * b * square, 1e-300)
+            inside = t * t
+            contact = stiffness * inside * t
+            if self.model == "dmt":
+                pull = 2 * np.pi * radius * adhesion
+                contact = contact - pull
+                tail = -pull * (self.interaction_range / (self.interaction_range - outside)) ** 2
+            else:
+                tail = np.zeros_like(outside)
+        return np.concatenate([outside, inside], axis=1), np.concatenate([tail, contact], axis=1)
+
+
+def _interpolate_rows(envelope, positions, values, targets, side) -> np.ndarray:
+    """
+    Interpolate every row of values at the same targets, the brackets being searched in
+    the non-decreasing envelope of the positions (their running maximum or minimum).
+    Instead of a search per target, every envelope point is mapped to the targets it
+    precedes, and a cumulative count per row gives the brackets of all targets at once.
+    Where the envelope repeats (a jump), side picks the values after ("right") or before
+    ("left") the repeated points, like np.searchsorted. The interpolation itself uses the
+    true positions, which still enclose the target at the ends of a jump.
+    """
+    rows, count = positions.shape
+    points = len(targets)
+    # Index of the first target that counts each position in, for the given side
+    grid = np.interp(envelope, targets, np.arange(points, dtype=np.float64), left=-1.0, right=float(points))
+    first = np.ceil(grid) if side == "right" else np.floor(grid) + 1
+    first = np.clip(first, 0, points).astype(np.int64) + np.arange(rows)[:, None] * (points + 1)
+    counts = np.bincount(first.ravel(), minlength=rows * (points + 1)).reshape(rows, points + 1)
+    upper = np.clip(np.cumsum(counts[:, :points], axis=1), 1, count - 1) + np.arange(rows)[:, None] * count
+    lower = upper - 1
+    positions, values = positions.ravel(), values.ravel()
+    width = positions[upper] - positions[lower]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(width > 0, (targets - positions[lower]) / width, 1.0 if side == "right" else 0.0)
+    fraction = np.clip(fraction, 0.0, 1.0)
+    return values[lower] + fraction * (values[upper] - values[lower])
+
+
 class AFMContactSimulation:
     """
     Models contact-mode AFM behavior. Includes methods to configure parameters,
     run the simulation, generate synthetic force-distance data, and reset the simulation state.
+    Force curves come from a ContactModel, one at a time or as whole force-volume maps.
     """
 
     def __init__(self):
@@ -20,11 +186,40 @@ class AFMContactSimulation:
     def configure_parameters(self, parameters: dict) -> None:
         """
         Configure simulation parameters such as spring constant, tip radius, and scan area.
+        Recognized keys: model ("hertz", "dmt" or "jkr"), spring_constant (N/m), tip_radius (nm),
+        youngs_modulus (GPa), poisson_ratio, work_of_adhesion (J/m^2), interaction_range (nm),
+        distance_range ((start, end) piezo positions in nm), points (per branch), noise (nN) and seed.
         :param parameters: Dictionary of simulation parameters.
         """
         self.logger.debug(f"Configuring simulation parameters: {parameters}")
         self.parameters = parameters
 
+    def contact_model(self) -> ContactModel:
+        """
+        Build the ContactModel from the configured parameters.
+        :return: The ContactModel.
+        """
+        return ContactModel(
+            model=self.parameters.get("model", "dmt"),
+            tip_radius=self.parameters.get("tip_radius", 10.0),
+            spring_constant=self.parameters.get("spring_constant", 1.0),
+            poisson_ratio=self.parameters.get("poisson_ratio", 0.3),
+            interaction_range=self.parameters.get("interaction_range", 0.3),
+            noise=self.parameters.get("noise", 0.0),
+            seed=self.parameters.get("seed"),
+        )
+
+    def piezo_positions(self) -> np.ndarray:
+        """
+        Return the piezo positions (nm) at which the curves are sampled.
+        """
+        distance_range = self.parameters.get("distance_range", (-10.0, 5.0))
+        points = self.parameters.get("points", 512)
+        if points < 2 or distance_range[1] <= distance_range[0]:
+            self.logger.error("The force curves need at least 2 points over an increasing z range.")
+            raise ValueError("The force curves need at least 2 points over an increasing z range.")
+        return np.linspace(distance_range[0], distance_range[1], points)
+
     def run_simulation(self) -> None:
         """
         Run the contact-mode AFM simulation.
@@ -36,21 +231,43 @@ class AFMContactSimulation:
     def generate_synthetic_data(self) -> np.ndarray:
         """
         Generate synthetic force-distance data for the simulation.
-        :return: A NumPy array containing the synthetic data (distance, force).
+        :return: A NumPy array containing the synthetic data (distance, force): the approach
+                 with increasing piezo position, followed by the retract.
         """
         self.logger.debug("Generating synthetic force-distance data.")
         try:
-            # Example synthetic data generation (replace with actual model)
-            distance = np.linspace(0, 10, 100)  # Distance values
-            spring_constant = self.parameters.get('spring_constant', 1)  # Default spring constant
-            force = spring_constant * distance  # Hooke's law: F = kx
-            synthetic_data = np.vstack((distance, force)).T  # Combine distance and force into a 2D array
-            self.logger.debug(f"Synthetic data generated: {synthetic_data}")
+            distance = self.piezo_positions()
+            approach, retract = self.contact_model().force_curves(
+                distance,
+                self.parameters.get("youngs_modulus", 1.0),
+                self.parameters.get("work_of_adhesion", 0.05),
+            )
+            synthetic_data = np.vstack((np.concatenate([distance, distance[::-1]]),
+                                        np.concatenate([approach, retract[::-1]]))).T
+            self.logger.debug("Synthetic data generated: %d points.", len(synthetic_data))
             return synthetic_data
         except Exception as e:
             self.logger.error(f"Error generating synthetic data: {e}")
             raise
 
+    def force_volume(self, youngs_modulus=None, work_of_adhesion=None, heights=0.0) -> tuple:
+        """
+        Simulate a force-volume map: one approach and one retract curve per pixel.
+        :param youngs_modulus: Map of Young's moduli (GPa); defaults to the configured value.
+        :param work_of_adhesion: Map of works of adhesion (J/m^2); defaults to the configured value.
+        :param heights: Map of sample heights (nm), shifting the contact point of every curve.
+        :return: (piezo positions, approach forces, retract forces), forces of shape map shape + (points,).
+        """
+        if youngs_modulus is None:
+            youngs_modulus = self.parameters.get("youngs_modulus", 1.0)
+        if work_of_adhesion is None:
+            work_of_adhesion = self.parameters.get("work_of_adhesion", 0.05)
+        distance = self.piezo_positions()
+        self.logger.info("Simulating force volume of shape %s.",
+                         np.broadcast(np.asarray(youngs_modulus), np.asarray(work_of_adhesion), np.asarray(heights)).shape)
+        approach, retract = self.contact_model().force_curves(distance, youngs_modulus, work_of_adhesion, heights)
+        return distance, approach, retract
+
     def reset_simulation(self) -> None:
         """
         Reset the simulation state.
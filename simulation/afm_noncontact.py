@@ -2,9 +2,154 @@
 import numpy as np
 from utils.logger import get_logger
 
+# Units: lengths in nm, energies in eV, forces in nN, spring constants in N/m (nN/nm), frequencies in Hz
+NN_PER_EV_PER_NM = 0.1602176634  # 1 eV/nm in nN
+
+
+class ForceLaw:
+    """
+    Tip-sample force of an FM-AFM tip at distance z from the sample: the short-range
+    bond of the apex atom plus the van der Waals attraction of the tip as a sphere.
+      - "lennard_jones": F = 12 E_b / z ((r_e / z)^12 - (r_e / z)^6)
+      - "morse": F = 2 E_b / lambda (exp(-2 (z - r_e) / lambda) - exp(-(z - r_e) / lambda))
+      - van der Waals: F = -H R / (6 z^2)
+    Positive forces are repulsive.
+    """
+
+    LAWS = ("lennard_jones", "morse")
+
+    def __init__(self, law="lennard_jones", binding_energy=0.5, equilibrium_distance=0.35,
+                 decay_length=0.07, hamaker=0.6, tip_radius=5.0):
+        """
+        Initialize the ForceLaw.
+        :param law: "lennard_jones" or "morse" short-range force.
+        :param binding_energy: Depth E_b of the short-range potential in eV.
+        :param equilibrium_distance: Distance r_e of the potential minimum in nm.
+        :param decay_length: Decay length lambda of the Morse potential in nm.
+        :param hamaker: Hamaker constant H in eV; 0 disables the van der Waals force.
+        :param tip_radius: Radius R of the tip in nm.
+        """
+        self.logger = get_logger(__name__)
+        if law not in self.LAWS:
+            self.logger.error(f"Invalid force law: {law}")
+            raise ValueError(f"Invalid force law: {law}")
+        if equilibrium_distance <= 0 or decay_length <= 0 or tip_radius <= 0:
+            self.logger.error("Equilibrium distance, decay length and tip radius must be positive.")
+            raise ValueError("Equilibrium distance, decay length and tip radius must be positive.")
+        self.law = law
+        self.binding_energy = float(binding_energy)
+        self.equilibrium_distance = float(equilibrium_distance)
+        self.decay_length = float(decay_length)
+        self.hamaker = float(hamaker)
+        self.tip_radius = float(tip_radius)
+
+    def force(self, z) -> np.ndarray:
+        """
+        Tip-sample force at the distances z.
+        :param z: Positive distances in nm.
+        :return: Forces in nN.
+        """
+        z = np.asarray(z, dtype=np.float64)
+        if self.law == "lennard_jones":
+            attraction = (self.equilibrium_distance / z) ** 6
+            short_range = 12 * self.binding_energy / z * (attraction * attraction - attraction)
+        else:
+            decay = np.exp(-(z - self.equilibrium_distance) / self.decay_length)
+            short_range = 2 * self.binding_energy / self.decay_length * (decay * decay - decay)
+        return (short_range - self.hamaker * self.tip_radius / (6 * z * z)) * NN_PER_EV_PER_NM
+
+    def key(self) -> tuple:
+        """Return the parameters that define the force law."""
+        return (self.law, self.binding_energy, self.equilibrium_distance, self.decay_length,
+                self.hamaker, self.tip_radius)
+
+
+class FrequencyShiftTable:
+    """
+    Frequency shift of an FM-AFM cantilever, tabulated over closest distance and amplitude.
+    At each grid point the shift follows from Giessibl's weighted average of the force
+    over an oscillation cycle,
+        df(z, A) = -f0 / (pi k A) * integral_-1^1 F(z + A (1 + u)) u / sqrt(1 - u^2) du,
+    evaluated by Gauss-Chebyshev quadrature. Its nodes cluster at the turning points,
+    where the short-range force acts. The number of nodes grows as sqrt(A / dz), so
+    large amplitudes still resolve the steep force near the lower turning point.
+    Distances are spaced uniformly and amplitudes logarithmically, so a lookup is
+    index arithmetic and a bilinear interpolation, for any number of pixels at once.
+    """
+
+    MIN_NODES = 64
+    MAX_NODES = 8192
+
+    def __init__(self, force_law, resonance_frequency=150e3, spring_constant=40.0,
+                 distances=(0.2, 5.0, 1024), amplitudes=(0.01, 50.0, 96)):
+        """
+        Initialize the FrequencyShiftTable and compute the table.
+        :param force_law: ForceLaw of the tip and sample.
+        :param resonance_frequency: Free resonance frequency f0 of the cantilever in Hz.
+        :param spring_constant: Spring constant k of the cantilever in N/m.
+        :param distances: (smallest, largest, count) closest tip-sample distances in nm.
+        :param amplitudes: (smallest, largest, count) oscillation amplitudes in nm.
+        """
+        self.logger = get_logger(__name__)
+        if resonance_frequency <= 0 or spring_constant <= 0:
+            self.logger.error("Resonance frequency and spring constant must be positive.")
+            raise ValueError("Resonance frequency and spring constant must be positive.")
+        if not 0 < distances[0] < distances[1] or not 0 < amplitudes[0] < amplitudes[1] \
+                or distances[2] < 2 or amplitudes[2] < 2:
+            self.logger.error("Table ranges must be positive, increasing and hold at least 2 points.")
+            raise ValueError("Table ranges must be positive, increasing and hold at least 2 points.")
+        self.force_law = force_law
+        self.resonance_frequency = float(resonance_frequency)
+        self.spring_constant = float(spring_constant)
+        self.distances = np.linspace(distances[0], distances[1], int(distances[2]))
+        self.amplitudes = np.geomspace(amplitudes[0], amplitudes[1], int(amplitudes[2]))
+        self.table = np.empty((len(self.distances), len(self.amplitudes)))
+        spacing = self.distances[1] - self.distances[0]
+        for column, amplitude in enumerate(self.amplitudes):
+            nodes = int(np.clip(np.ceil(4 * np.pi * np.sqrt(amplitude / (2 * spacing))), self.MIN_NODES, self.MAX_NODES))
+            self.table[:, column] = self.integrate(self.distances, amplitude, nodes)
+        self.logger.debug("Computed a %dx%d frequency shift table.", *self.table.shape)
+
+    def integrate(self, distance, amplitude, nodes) -> np.ndarray:
+        """
+        Frequency shift by direct Gauss-Chebyshev quadrature of the weighted force average.
+        :param distance: 1D array of closest tip-sample distances in nm.
+        :param amplitude: Oscillation amplitude in nm.
+        :param nodes: Number of quadrature nodes.
+        :return: Frequency shifts in Hz.
+        """
+        u = np.cos((2 * np.arange(1, nodes + 1) - 1) * np.pi / (2 * nodes))
+        forces = self.force_law.force(np.asarray(distance, dtype=np.float64)[:, None] + amplitude * (1 + u))
+        return -self.resonance_frequency / (self.spring_constant * amplitude * nodes) * (forces @ u)
+
+    def lookup(self, distance, amplitude) -> np.ndarray:
+        """
+        Frequency shifts at arbitrary distances and amplitudes, by bilinear interpolation
+        in the table. Values outside the table are clamped to its edges.
+        :param distance: Closest tip-sample distances in nm, scalar or array.
+        :param amplitude: Oscillation amplitudes in nm, scalar or array broadcastable to distance.
+        :return: Frequency shifts in Hz with the broadcast shape.
+        """
+        distance, amplitude = np.broadcast_arrays(np.asarray(distance, dtype=np.float64),
+                                                  np.asarray(amplitude, dtype=np.float64))
+        rows = (distance - self.distances[0]) / (self.distances[1] - self.distances[0])
+        columns = np.log(np.maximum(amplitude, self.amplitudes[0]) / self.amplitudes[0]) \
+            / np.log(self.amplitudes[1] / self.amplitudes[0])
+        rows = np.clip(rows, 0, len(self.distances) - 1)
+        columns = np.clip(columns, 0, len(self.amplitudes) - 1)
+        row = np.minimum(rows.astype(np.int64), len(self.distances) - 2)
+        column = np.minimum(columns.astype(np.int64), len(self.amplitudes) - 2)
+        t, s = rows - row, columns - column
+        table = self.table
+        return (table[row, column] * (1 - t) * (1 - s) + table[row + 1, column] * t * (1 - s)
+                + table[row, column + 1] * (1 - t) * s + table[row + 1, column + 1] * t * s)
+
+
 class AFMNonContactSimulation:
     """
     Models non-contact AFM behavior. Generates synthetic frequency shift data.
+    Frequency shifts come from a FrequencyShiftTable, which is computed once per set of
+    force-law and cantilever parameters and then reused for every curve and image.
     """
 
     def __init__(self):
@@ -14,15 +159,44 @@ class AFMNonContactSimulation:
         self.parameters = {}  # Dictionary to store simulation parameters
         self.simulation_data = None  # Placeholder for simulation results
         self.logger = get_logger(__name__)  # Logger for debugging
+        self._table = None  # Cached FrequencyShiftTable
+        self._table_key = None  # Parameters the cached table was computed for
 
     def configure_parameters(self, parameters: dict) -> None:
         """
         Configure simulation parameters such as tip-sample distance, oscillation amplitude, etc.
+        Recognized keys: tip_sample_distance (closest distance in nm), oscillation_amplitude (nm),
+        distance_span (nm covered by the frequency shift curve), points, force_law
+        ("lennard_jones" or "morse"), binding_energy (eV), equilibrium_distance (nm),
+        decay_length (nm), hamaker (eV), tip_radius (nm), resonance_frequency (Hz)
+        and spring_constant (N/m).
         :param parameters: Dictionary of simulation parameters.
         """
         self.parameters = parameters
         self.logger.debug(f"Simulation parameters configured: {self.parameters}")
 
+    def frequency_shift_table(self) -> FrequencyShiftTable:
+        """
+        Return the FrequencyShiftTable for the configured parameters, computing it if they changed.
+        :return: The FrequencyShiftTable.
+        """
+        force_law = ForceLaw(
+            law=self.parameters.get("force_law", "lennard_jones"),
+            binding_energy=self.parameters.get("binding_energy", 0.5),
+            equilibrium_distance=self.parameters.get("equilibrium_distance", 0.35),
+            decay_length=self.parameters.get("decay_length", 0.07),
+            hamaker=self.parameters.get("hamaker", 0.6),
+            tip_radius=self.parameters.get("tip_radius", 5.0),
+        )
+        resonance_frequency = self.parameters.get("resonance_frequency", 150e3)
+        spring_constant = self.parameters.get("spring_constant", 40.0)
+        key = force_law.key() + (resonance_frequency, spring_constant)
+        if self._table is None or self._table_key != key:
+            self.logger.info("Computing the frequency shift table.")
+            self._table = FrequencyShiftTable(force_law, resonance_frequency, spring_constant)
+            self._table_key = key
+        return self._table
+
     def run_simulation(self) -> None:
         """
         Run the non-contact AFM simulation.
@@ -34,26 +208,49 @@ class AFMNonContactSimulation:
     def generate_synthetic_data(self) -> np.ndarray:
         """
         Generate synthetic frequency shift data based on the configured parameters.
-        :return: A NumPy array containing the synthetic frequency shift data.
+        :return: A NumPy array containing the synthetic frequency shift data: the frequency
+                 shift (Hz) at closest distances from tip_sample_distance over distance_span.
         """
         self.logger.debug("Generating synthetic frequency shift data.")
         try:
-            # Example: Simple harmonic oscillator model
             tip_sample_distance = self.parameters.get("tip_sample_distance", 1.0)
             oscillation_amplitude = self.parameters.get("oscillation_amplitude", 0.1)
+            distance_span = self.parameters.get("distance_span", 2.0)
+            points = self.parameters.get("points", 100)
 
             if tip_sample_distance <= 0:
                 raise ValueError("Tip-sample distance must be positive.")
+            if oscillation_amplitude <= 0:
+                raise ValueError("Oscillation amplitude must be positive.")
 
-            frequency_shift = (
-                np.sin(np.linspace(0, 2 * np.pi, 100)) * oscillation_amplitude / tip_sample_distance
-            )
-            self.logger.debug(f"Synthetic frequency shift data generated: {frequency_shift}")
+            distances = np.linspace(tip_sample_distance, tip_sample_distance + distance_span, points)
+            frequency_shift = self.frequency_shift_table().lookup(distances, oscillation_amplitude)
+            self.logger.debug("Synthetic frequency shift data generated: %d points.", len(frequency_shift))
             return frequency_shift
         except Exception as e:
             self.logger.error(f"Error generating synthetic frequency shift data: {e}")
             raise
 
+    def frequency_shift_map(self, heights, tip_height=None, amplitude=None) -> np.ndarray:
+        """
+        Constant-height frequency shift image of a height map, one table lookup per pixel.
+        :param heights: 2D array of sample heights in nm.
+        :param tip_height: Height of the lower turning point of the tip in nm; defaults to
+                           tip_sample_distance above the highest point.
+        :param amplitude: Oscillation amplitude in nm, scalar or map; defaults to oscillation_amplitude.
+        :return: Frequency shifts in Hz with the shape of heights.
+        """
+        heights = np.asarray(heights, dtype=np.float64)
+        if tip_height is None:
+            tip_height = heights.max() + self.parameters.get("tip_sample_distance", 1.0)
+        if amplitude is None:
+            amplitude = self.parameters.get("oscillation_amplitude", 0.1)
+        distances = tip_height - heights
+        if np.any(distances <= 0):
+            self.logger.error("The tip must stay above the sample.")
+            raise ValueError("The tip must stay above the sample.")
+        return self.frequency_shift_table().lookup(distances, amplitude)
+
     def reset_simulation(self) -> None:
         """
         Reset the simulation state.
@@ -61,4 +258,6 @@ class AFMNonContactSimulation:
         self.logger.info("Resetting non-contact AFM simulation.")
         self.parameters = {}
         self.simulation_data = None
-        self.logger.info("Non-contact AFM simulation reset.")
\ No newline at end of file
+        self._table = None
+        self._table_key = None
+        self.logger.info("Non-contact AFM simulation reset.")
@@ -1,53 +1,307 @@
 #  File: simulation/stm.py
 
 import numpy as np
+from simulation.surface import Surface
 from utils.logger import get_logger
 
+# Units: lengths in nm, voltages in V, currents in nA, energies in eV
+KAPPA_PER_SQRT_EV = 5.1231  # sqrt(2 m_e * 1 eV) / hbar in 1/nm
+QUANTUM_CONDUCTANCE = 7.748e4  # 2 e^2 / h in nA/V
+
+
+class TunnelingModel:
+    """
+    Tunneling current between a tip and a surface height map: I = G0 * V * exp(-2 kappa d),
+    with kappa = sqrt(2 m phi) / hbar from the work function phi.
+    A tip of apex radius R sees the surface through its parabolic apex. The gap under
+    it grows by r^2 / (2R), so its current weight falls off as exp(-kappa r^2 / R). That
+    is a Gaussian of sigma = sqrt(R / (2 kappa)) applied to exp(2 kappa h), and the
+    current and the constant-current height follow from one separable blur. The blur
+    runs in blocks of rows, each referred to its own maximum, so the exponentials
+    do not overflow on rough surfaces.
+    """
+
+    BLOCK_ROWS = 512
+    FLOAT32_EXPONENT_RANGE = -80.0  # exp() of smaller exponents underflows single precision
+
+    def __init__(self, bias_voltage=0.1, work_function=4.5, setpoint_current=1.0, tip_radius=0.0,
+                 pixel_size=(1.0, 1.0)):
+        """
+        Initialize the TunnelingModel.
+        :param bias_voltage: Sample bias in V; the sign only sets the current direction.
+        :param work_function: Effective barrier height in eV.
+        :param setpoint_current: Current the constant-current feedback regulates to, in nA.
+        :param tip_radius: Apex radius of the tip in nm; 0 for a single-atom tip.
+        :param pixel_size: (x, y) size of a height map pixel in nm.
+        """
+        if work_function <= 0:
+            raise ValueError("Work function must be positive.")
+        if setpoint_current <= 0:
+            raise ValueError("Setpoint current must be positive.")
+        if tip_radius < 0:
+            raise ValueError("Tip radius must not be negative.")
+        if bias_voltage == 0:
+            raise ValueError("Bias voltage must not be zero.")
+        self.bias_voltage = float(bias_voltage)
+        self.work_function = float(work_function)
+        self.setpoint_current = float(setpoint_current)
+        self.tip_radius = float(tip_radius)
+        self.pixel_size = (float(pixel_size[0]), float(pixel_size[1]))
+        self.logger = get_logger(__name__)
+
+    @property
+    def kappa(self) -> float:
+        """Decay constant of the tunneling current in 1/nm."""
+        return KAPPA_PER_SQRT_EV * np.sqrt(self.work_function)
+
+    @property
+    def setpoint_gap(self) -> float:
+        """Gap in nm at which a flat surface gives the setpoint current."""
+        return np.log(QUANTUM_CONDUCTANCE * abs(self.bias_voltage) / self.setpoint_current) / (2 * self.kappa)
+
+    def current(self, gap) -> np.ndarray:
+        """
+        Current through a gap in front of a flat surface.
+        :param gap: Tip-sample distance(s) in nm.
+        :return: Current(s) in nA, with the sign of the bias.
+        """
+        return QUANTUM_CONDUCTANCE * self.bias_voltage * np.exp(-2 * self.kappa * np.asarray(gap, dtype=np.float64))
+
+    def constant_height(self, heights, tip_height) -> np.ndarray:
+        """
+        Current map of a tip scanned at a fixed height.
+        :param heights: 2D surface height map in nm.
+        :param tip_height: Height of the tip apex in nm; must be above the surface.
+        :return: Current map in nA.
+        """
+        heights = np.asarray(heights)
+        if tip_height <= heights.max():
+            self.logger.error("The tip must be above the highest point of the surface.")
+            raise ValueError("The tip must be above the highest point of the surface.")
+        return self.current(tip_height - self.effective_heights(heights))
+
+    def constant_current(self, heights) -> np.ndarray:
+        """
+        Tip height map of an ideal constant-current feedback (the STM topography).
+        :param heights: 2D surface height map in nm.
+        :return: Tip apex height in nm at every pixel.
+        """
+        topography = self.effective_heights(heights)
+        topography += self.setpoint_gap
+        return topography
+
+    def effective_heights(self, heights) -> np.ndarray:
+        """
+        Height of the flat surface that would give the same current as the surface under
+        the tip apex: log(sum of tip weights * exp(2 kappa h)) / (2 kappa). For a
+        single-atom tip this is the height map itself.
+        :param heights: 2D surface height map in nm.
+        :return: New 2D array of effective heights in nm, of the floating point type of the heights.
+        """
+        heights = np.asarray(heights)
+        if heights.dtype.kind != "f":
+            heights = heights.astype(np.float64)
+        two_kappa = 2 * self.kappa
+        if self.tip_radius == 0:
+            return heights.copy()
+        sigma = np.sqrt(self.tip_radius / two_kappa)
+        sigma_x, sigma_y = sigma / self.pixel_size[0], sigma / self.pixel_size[1]
+        halo_x, halo_y = _blur_radius(sigma_x), _blur_radius(sigma_y)
+        rows, cols = heights.shape
+        # Blocks are large against their halo, so few rows are blurred twice
+        block_rows = max(self.BLOCK_ROWS, 8 * halo_y)
+        effective = np.empty_like(heights)
+        for start in range(0, rows, block_rows):
+            end = min(rows, start + block_rows)
+            low, high = max(0, start - halo_y), min(rows, end + halo_y)
+            block = heights[low:high]
+            reference = float(block.max())
+            # Single precision halves the memory traffic of the blur; blocks whose
+            # weights would underflow it are computed in double precision
+            exponent_range = two_kappa * (float(block.min()) - reference)
+            dtype = np.float32 if exponent_range > self.FLOAT32_EXPONENT_RANGE else np.float64
+            # Weights of the block, padded to the halo by replicating the surface edges
+            top, bottom = halo_y - (start - low), halo_y - (high - end)
+            weight = np.empty((top + high - low + bottom, cols), dtype=dtype)
+            inner = weight[top:top + high - low]
+            np.subtract(block, reference, out=inner)
+            inner *= dtype(two_kappa)
+            np.exp(inner, out=inner)
+            weight[:top] = inner[0]
+            weight[top + high - low:] = inner[-1]
+            weight = _gaussian_blur(weight, sigma_y)
+            # Every step of the blur adds whole contiguous rows, so the pass along the rows
+            # runs on a transposed copy of the block, which holds no halo rows any more
+            transposed = np.empty((halo_x + cols + halo_x, end - start), dtype=dtype)
+            transposed[halo_x:halo_x + cols] = weight.T
+            transposed[:halo_x] = transposed[halo_x]
+            transposed[halo_x + cols:] = transposed[halo_x + cols - 1]
+            weight = _gaussian_blur(transposed, sigma_x)
+            np.maximum(weight, np.finfo(dtype).tiny, out=weight)
+            np.log(weight, out=weight)
+            np.multiply(weight.T, 1.0 / two_kappa, out=effective[start:end], casting="unsafe")
+            effective[start:end] += reference
+        return effective
+
+
+def _blur_radius(sigma) -> int:
+    """
+    Number of pixels _gaussian_blur reaches on either side.
+    """
+    if sigma < 0.2:
+        return 0
+    if sigma < 2.0:
+        return int(np.ceil(3 * sigma))
+    return sum(width // 2 for width in _box_widths(sigma))
+
+
+def _box_widths(sigma, passes=3):
+    """
+    Odd widths of the box filters whose repeated application approximates a Gaussian.
+    """
+    ideal = np.sqrt(12 * sigma * sigma / passes + 1)
+    lower = int(np.floor(ideal))
+    lower -= 1 - lower % 2
+    upper = lower + 2
+    # Number of passes with the lower width so that the variances add up to sigma^2
+    count = int(round((12 * sigma * sigma - passes * lower * lower - 4 * passes * lower - 3 * passes) / (-4 * lower - 4)))
+    return [lower if i < count else upper for i in range(passes)]
+
+
+def _gaussian_blur(values, sigma):
+    """
+    Gaussian filter along the first axis of values padded by _blur_radius(sigma) rows on
+    either side, returning the rows in between. Narrow kernels are applied as weighted
+    shifted sums; wide ones as three box filters, so the cost does not grow with sigma.
+    Every step adds whole contiguous rows. The padded values may be overwritten.
+    """
+    radius = _blur_radius(sigma)
+    if radius == 0:
+        return values
+    length = len(values) - 2 * radius
+    if sigma < 2.0:
+        taps = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+        taps = (taps / taps.sum()).astype(values.dtype)
+        result = taps[0] * values[:length]
+        scratch = np.empty_like(result)
+        for k in range(1, len(taps)):
+            result += np.multiply(taps[k], values[k:k + length], out=scratch)
+        return result
+    widths = _box_widths(sigma)
+    for width in widths:
+        values = _box_sum(values, width)
+    values *= values.dtype.type(1.0 / np.prod(widths, dtype=np.float64))
+    return values
+
+
+def _box_sum(values, width):
+    """
+    Sums over all windows of width rows that lie within values, along the first axis.
+    The window sums are a suffix sum within one block of width rows plus a prefix sum
+    within the next block (van Herk / Gil-Werman), so only positive terms are added.
+    A running cumulative sum would subtract large partial sums and lose the small
+    weights of low-lying pixels next to high ones. The values are overwritten.
+    """
+    count = len(values) - width + 1
+    full = len(values) // width * width  # Windows start within the whole blocks
+    prefix = values.copy()
+    blocked_prefix = prefix[:full].reshape((-1, width) + values.shape[1:])
+    suffix = values[:full].reshape((-1, width) + values.shape[1:])
+    # Running sums over the rows of each block, one vectorized addition per row
+    for k in range(1, width):
+        blocked_prefix[:, k] += blocked_prefix[:, k - 1]
+        suffix[:, width - 1 - k] += suffix[:, width - k]
+    for k in range(full + 1, len(values)):
+        prefix[k] += prefix[k - 1]
+    blocked_prefix[:, -1] = 0.0  # A window starting at a block boundary lies within that block
+    result = values[:count]
+    result += prefix[width - 1:width - 1 + count]
+    return result
+
 
 class STMSimulation:
     """
     Models Scanning Tunneling Microscopy (STM) scanning behavior.
     Includes methods to configure parameters, run the simulation,
     generate synthetic data, and reset the simulation state.
+    The image is computed from a Surface height map with a TunnelingModel.
     """
 
-    def __init__(self):
+    MODES = ("constant_current", "constant_height")
+
+    def __init__(self, surface=None):
         """
         Initialize the STMSimulation class.
+        :param surface: Surface whose height map (in nm) is scanned; a sine wave
+                        surface is generated at the scan resolution if omitted.
         """
         self.parameters = {}  # Dictionary to store simulation parameters
         self.simulation_data = None  # Placeholder for simulation results
         self.simulating = False  # Flag to indicate if the simulation is running
+        self.surface = surface
         self.logger = get_logger(__name__)  # Logger for debugging
 
     def configure_parameters(self, parameters: dict) -> None:
         """
         Configure the simulation parameters.
+        Recognized keys: resolution, scan_area (nm), mode ("constant_current" or
+        "constant_height"), bias_voltage (V), work_function (eV), setpoint_current (nA),
+        tip_radius (nm) and gap (nm above the highest point in constant-height mode).
         :param parameters: Dictionary of simulation parameters.
         """
         self.logger.debug(f"Configuring simulation parameters: {parameters}")
         self.parameters = parameters
 
+    def set_surface(self, surface) -> None:
+        """
+        Set the Surface that is scanned.
+        :param surface: Surface with generated height data.
+        """
+        self.surface = surface
+        self.simulation_data = None
+
+    def tunneling_model(self) -> TunnelingModel:
+        """
+        Build the TunnelingModel from the configured parameters.
+        :return: The TunnelingModel.
+        """
+        resolution = self.parameters.get("resolution", 100)
+        scan_area = self.parameters.get("scan_area", (10, 10))
+        return TunnelingModel(
+            bias_voltage=self.parameters.get("bias_voltage", 0.1),
+            work_function=self.parameters.get("work_function", 4.5),
+            setpoint_current=self.parameters.get("setpoint_current", 1.0),
+            tip_radius=self.parameters.get("tip_radius", 0.0),
+            pixel_size=(scan_area[0] / resolution, scan_area[1] / resolution),
+        )
+
     def run_simulation(self) -> None:
         """
-        Run the STM simulation.
+        Run the STM simulation. In constant-current mode the result is the tip height
+        map (nm); in constant-height mode it is the current map (nA).
         """
         self.logger.info("Starting STM simulation.")
         self.simulating = True
         try:
-            # Example: Generate synthetic data based on parameters
             resolution = self.parameters.get("resolution", 100)
             scan_area = self.parameters.get("scan_area", (10, 10))
+            mode = self.parameters.get("mode", "constant_current")
 
             if resolution <= 0:
                 raise ValueError("Resolution must be a positive integer.")
             if scan_area[0] <= 0 or scan_area[1] <= 0:
                 raise ValueError("Scan area dimensions must be positive.")
+            if mode not in self.MODES:
+                raise ValueError(f"Invalid STM mode: {mode}")
 
-            self.simulation_data = (
-                np.random.random((resolution, resolution)) * scan_area[0] * scan_area[1]
-            )
-            self.logger.debug(f"Generated synthetic data: {self.simulation_data}")
+            model = self.tunneling_model()
+            heights = self._height_map(resolution)
+            if mode == "constant_current":
+                self.simulation_data = model.constant_current(heights)
+            else:
+                gap = self.parameters.get("gap", model.setpoint_gap)
+                self.simulation_data = model.constant_height(heights, heights.max() + gap)
+            self.logger.debug("Generated synthetic data of shape %s.", self.simulation_data.shape)
         except Exception as e:
             self.logger.error(f"Error during STM simulation: {e}")
             raise
@@ -55,6 +309,24 @@ class STMSimulation:
             self.simulating = False
             self.logger.info("STM simulation completed.")
 
+    def _height_map(self, resolution) -> np.ndarray:
+        """
+        Return the surface heights on the resolution x resolution scan grid.
+        """
+        if self.surface is None:
+            self.surface = Surface()
+            self.surface.generate_sine_wave_surface(0.05, 4, resolution)
+        heights = self.surface.get_height_data()
+        if heights is None:
+            raise ValueError("The surface has no height data.")
+        heights = np.asarray(heights)
+        if heights.shape != (resolution, resolution):
+            # Nearest pixel of the surface under every scan pixel
+            rows = np.rint(np.linspace(0, heights.shape[0] - 1, resolution)).astype(np.int64)
+            cols = np.rint(np.linspace(0, heights.shape[1] - 1, resolution)).astype(np.int64)
+            heights = heights[np.ix_(rows, cols)]
+        return heights
+
     def generate_synthetic_data(self) -> np.ndarray:
         """
         Generate and return synthetic data for the simulation.
@@ -73,4 +345,4 @@ class STMSimulation:
         self.parameters = {}
         self.simulation_data = None
         self.simulating = False
-        self.logger.info("STM simulation state reset.")
\ No newline at end of file
+        self.logger.info("STM simulation state reset.")
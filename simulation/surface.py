@@ -1,8 +1,33 @@
 #  File: simulation/surface.py
 
+import os
+import tempfile
 import numpy as np
 from utils.logger import get_logger
 
+FFT_CHUNK_BYTES = 64 * 1024 ** 2  # Size of the blocks moved through the FFTs of large surfaces
+SPLAT_CHUNK_PIXELS = 1024 ** 2  # Pixels of Gaussian bumps, and of the rows they cover, summed at a time
+SLICE_BUMP_PIXELS = 32 ** 2  # Bumps this large are added slice by slice rather than scattered
+
+# Crystalline surfaces for generate_lattice_surface. Lengths in nm. The unit cell is spanned
+# by a1 = (a, 0) and a2 rotated by "cell_angle", times "period" for reconstructions; atoms
+# are (i, j, relative height) in units of the 1x1 lattice vectors, negative heights are holes.
+LATTICES = {
+    "square": {"lattice_constant": 0.3, "cell_angle": 90.0, "period": 1, "step_height": 0.3,
+               "atoms": [(0, 0, 1.0)]},
+    # HOPG as seen by STM: only every other atom of a graphene layer appears
+    "hexagonal": {"lattice_constant": 0.246, "cell_angle": 60.0, "period": 1, "step_height": 0.335,
+                  "atoms": [(0, 0, 1.0)]},
+    # Both sublattices of graphene
+    "honeycomb": {"lattice_constant": 0.246, "cell_angle": 60.0, "period": 1, "step_height": 0.335,
+                  "atoms": [(1 / 3, 1 / 3, 1.0), (2 / 3, 2 / 3, 1.0)]},
+    # Adatoms and corner holes of the dimer-adatom-stacking fault model; the faulted half is brighter
+    "si111_7x7": {"lattice_constant": 0.384, "cell_angle": 60.0, "period": 7, "step_height": 0.314,
+                  "atoms": [(1, 1, 1.0), (5, 1, 1.0), (1, 5, 1.0), (3, 1, 0.9), (1, 3, 0.9), (3, 3, 0.9),
+                            (6, 6, 1.1), (2, 6, 1.1), (6, 2, 1.1), (4, 6, 1.0), (6, 4, 1.0), (4, 4, 1.0),
+                            (0, 0, -1.5)]},
+}
+
 class Surface:
     """
     Models atomic surface topography for SPM simulations.
@@ -14,6 +39,7 @@ class Surface:
         Initialize the Surface class.
         """
         self.surface_data = None  # Placeholder for surface height data
+        self.pixel_size = 1.0  # Lateral size of a pixel
         self.logger = get_logger(__name__)  # Logger for debugging
 
     def generate_sine_wave_surface(self, amplitude: float, frequency: float, size: int) -> None:
@@ -60,6 +86,314 @@ class Surface:
             self.logger.error(f"Error generating random rough surface: {e}")
             raise
 
+    def generate_fractal_surface(self, size: int, hurst: float = 0.8, correlation_length: float = None,
+                                 rms: float = 1.0, pixel_size: float = 1.0, seed: int = None,
+                                 dtype=np.float32, memmap_path: str = None) -> None:
+        """
+        Generate a self-affine (fractal) rough surface by spectral synthesis: random phases
+        shaped by the power spectrum C(q) ~ (1 + (q * correlation_length)^2)^-(1 + hurst),
+        which is flat below 1 / correlation_length and falls off as a power law with
+        fractal dimension 3 - hurst above it. Without a correlation length the surface is
+        self-affine at all scales. The inverse FFT runs in single precision, column and
+        row blocks at a time, so with memmap_path both the spectrum and the heights live
+        on disk and a 16k x 16k surface needs only a few blocks of memory.
+        :param size: Size of the surface (size x size).
+        :param hurst: Hurst exponent (0 < hurst < 1); low values give rougher surfaces.
+        :param correlation_length: Lateral correlation length in units of pixel_size, or None.
+        :param rms: Target RMS roughness of the heights (the mean height is zero).
+        :param pixel_size: Lateral size of a pixel.
+        :param seed: Seed of the random phases, for reproducible surfaces.
+        :param dtype: Floating point type of the heights.
+        :param memmap_path: File to back the heights with np.memmap, or None to keep them in memory.
+        """
+        self.logger.info(f"Generating fractal surface with size={size}, hurst={hurst}, "
+                         f"correlation_length={correlation_length}, rms={rms}")
+        try:
+            if size <= 1:
+                raise ValueError("Size must be an integer greater than 1.")
+            if not 0 < hurst < 1:
+                raise ValueError("The Hurst exponent must lie between 0 and 1.")
+            if correlation_length is not None and correlation_length <= 0:
+                raise ValueError("Correlation length must be positive.")
+            if rms <= 0:
+                raise ValueError("RMS roughness must be positive.")
+            if pixel_size <= 0:
+                raise ValueError("Pixel size must be positive.")
+
+            rng = np.random.default_rng(seed)
+            columns = size // 2 + 1
+            frequencies_x = 2 * np.pi * np.fft.rfftfreq(size, d=pixel_size)
+            frequencies_y = 2 * np.pi * np.fft.fftfreq(size, d=pixel_size)
+            if memmap_path is None:
+                spectrum = np.empty((size, columns), dtype=np.complex64)
+                heights = np.empty((size, size), dtype=dtype)
+            else:
+                # The spectrum scratch file is removed when it is closed
+                scratch = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(memmap_path)))
+                spectrum = np.memmap(scratch, dtype=np.complex64, mode="w+", shape=(size, columns))
+                heights = np.memmap(memmap_path, dtype=dtype, mode="w+", shape=(size, size))
+
+            # Random spectrum with amplitudes sqrt(C(q)), block of rows by block of rows
+            rows = max(1, FFT_CHUNK_BYTES // (columns * spectrum.itemsize))
+            for start in range(0, size, rows):
+                stop = min(size, start + rows)
+                q = np.hypot(frequencies_y[start:stop, None], frequencies_x[None, :])
+                with np.errstate(divide="ignore"):
+                    if correlation_length is None:
+                        amplitude = q ** -(1 + hurst)
+                    else:
+                        amplitude = (1 + (q * correlation_length) ** 2) ** (-(1 + hurst) / 2)
+                if start == 0:
+                    amplitude[0, 0] = 0.0  # Zero mean height
+                # Real and imaginary parts are drawn in pairs, row after row, so the surface
+                # does not depend on the block size
+                block = rng.standard_normal((stop - start, columns, 2), dtype=np.float32).view(np.complex64)[..., 0]
+                block *= amplitude.astype(np.float32)
+                spectrum[start:stop] = block
+
+            # Inverse transform along the columns, then along the rows into the heights
+            block_columns = max(1, FFT_CHUNK_BYTES // (size * spectrum.itemsize))
+            for start in range(0, columns, block_columns):
+                stop = min(columns, start + block_columns)
+                spectrum[:, start:stop] = np.fft.ifft(spectrum[:, start:stop], axis=0)
+            sum_of_squares = 0.0
+            for start in range(0, size, rows):
+                stop = min(size, start + rows)
+                block = np.fft.irfft(spectrum[start:stop], n=size, axis=1)
+                sum_of_squares += float(np.dot(block.ravel(), block.ravel()))
+                heights[start:stop] = block
+            del spectrum
+            if memmap_path is not None:
+                scratch.close()
+
+            scale = rms / np.sqrt(sum_of_squares / size ** 2)
+            for start in range(0, size, rows):
+                heights[start:start + rows] *= heights.dtype.type(scale)
+            if memmap_path is not None:
+                heights.flush()
+            self.surface_data = heights
+            self.pixel_size = pixel_size
+            self.logger.debug("Fractal surface generated successfully.")
+        except Exception as e:
+            self.logger.error(f"Error generating fractal surface: {e}")
+            raise
+
+    def generate_lattice_surface(self, size: int, lattice: str = "hexagonal", pixel_size: float = 0.01,
+                                 lattice_constant: float = None, corrugation: float = 0.05,
+                                 atom_radius: float = None, angle: float = 0.0, vacancy_fraction: float = 0.0,
+                                 adsorbate_density: float = 0.0, adsorbate_height: float = 0.2,
+                                 adsorbate_radius: float = 0.2, terrace_width: float = None,
+                                 step_height: float = None, step_angle: float = None, seed: int = None,
+                                 dtype=np.float32) -> None:
+        """
+        Generate an atomically resolved crystalline surface in physical units (nm), e.g. as
+        ground truth for lattice analysis and drift correction. Atoms are Gaussians of the
+        given radius. The heights of one unit cell are tabulated once and looked up for
+        every pixel through its fractional lattice coordinates, so an 8k x 8k image takes
+        about a second. The positions of the lattice, defects and adsorbates are kept in
+        lattice_info.
+        :param size: Size of the surface (size x size pixels).
+        :param lattice: "square", "hexagonal" (HOPG), "honeycomb" (graphene) or "si111_7x7".
+        :param pixel_size: Lateral size of a pixel.
+        :param lattice_constant: Constant of the 1x1 lattice; defaults to the lattice's own.
+        :param corrugation: Height of an atom above the background.
+        :param atom_radius: Gaussian radius (sigma) of an atom; defaults to a fifth of the lattice constant.
+        :param angle: Rotation of the lattice in degrees, counterclockwise from the x axis.
+        :param vacancy_fraction: Fraction of atoms removed at random.
+        :param adsorbate_density: Adsorbates per nm^2, placed at random.
+        :param adsorbate_height: Height of an adsorbate.
+        :param adsorbate_radius: Gaussian radius (sigma) of an adsorbate.
+        :param terrace_width: Width of the terraces between monatomic steps, or None for a flat surface.
+        :param step_height: Height of a step; defaults to the lattice's monatomic step.
+        :param step_angle: Direction of the step edges in degrees; defaults to the a1 lattice direction.
+        :param seed: Seed of the defect and adsorbate positions.
+        :param dtype: Floating point type of the heights.
+        """
+        self.logger.info(f"Generating {lattice} lattice surface with size={size}, pixel_size={pixel_size}, angle={angle}")
+        try:
+            if lattice not in LATTICES:
+                raise ValueError(f"Unknown lattice: {lattice}. Choose from {sorted(LATTICES)}.")
+            if size <= 0:
+                raise ValueError("Size must be a positive integer.")
+            if pixel_size <= 0:
+                raise ValueError("Pixel size must be positive.")
+            if not 0 <= vacancy_fraction <= 1:
+                raise ValueError("The vacancy fraction must lie between 0 and 1.")
+            if adsorbate_density < 0:
+                raise ValueError("The adsorbate density must not be negative.")
+            if terrace_width is not None and terrace_width <= 0:
+                raise ValueError("Terrace width must be positive.")
+
+            definition = LATTICES[lattice]
+            constant = lattice_constant or definition["lattice_constant"]
+            radius = atom_radius or constant / 5
+            rotation = np.radians(angle)
+            cell_angle = np.radians(definition["cell_angle"])
+            # Rotated 1x1 lattice vectors as columns, and the (super)cell they repeat in
+            vectors = constant * np.array([[np.cos(rotation), np.cos(rotation + cell_angle)],
+                                           [np.sin(rotation), np.sin(rotation + cell_angle)]])
+            cell = vectors * definition["period"]
+            atoms = np.array(definition["atoms"], dtype=np.float64)
+            sites = atoms[:, :2] / definition["period"]  # Fractional coordinates in the cell
+            heights_per_atom = corrugation * atoms[:, 2]
+            radii = np.where(atoms[:, 2] < 0, 2.5 * radius, radius)  # Holes are wider than atoms
+
+            # Heights of one cell, tabulated finer than the pixels and the atoms (a power of two
+            # for the wrap-around)
+            entries = np.linalg.norm(cell, axis=0).max() * max(1.5 / pixel_size, 32 / radius)
+            table_size = int(2 ** np.clip(np.ceil(np.log2(entries)), 6, 10))
+            # Each atom is added over the table entries within five radii, wrapped around the
+            # cell, which sums all its periodic images in reach
+            to_cell = np.linalg.inv(cell)
+            table = np.zeros(table_size * table_size)
+            for site, height, sigma in zip(sites, heights_per_atom, radii):
+                reach = np.ceil(5 * sigma * np.linalg.norm(to_cell, axis=1) * table_size).astype(int)
+                u = np.arange(-reach[0], reach[0] + 2) + int(np.floor(site[0] * table_size))
+                v = np.arange(-reach[1], reach[1] + 2) + int(np.floor(site[1] * table_size))
+                offset_u, offset_v = (u + 0.5) / table_size - site[0], (v + 0.5) / table_size - site[1]
+                distance_x = offset_u[:, None] * cell[0, 0] + offset_v[None, :] * cell[0, 1]
+                distance_y = offset_u[:, None] * cell[1, 0] + offset_v[None, :] * cell[1, 1]
+                values = height * np.exp(-(distance_x ** 2 + distance_y ** 2) / (2 * sigma ** 2))
+                entries = (u[:, None] % table_size) * table_size + v[None, :] % table_size
+                table += np.bincount(entries.ravel(), values.ravel(), minlength=table.size)
+            table = table.astype(dtype).ravel()
+
+            # Fractional cell coordinates of the pixels in fixed point, so that the wrap-around
+            # into the table is a bit mask; the (u, v) of a pixel is its column part plus its row part
+            shift = 16
+            to_fraction = to_cell * table_size * 2 ** shift
+            coordinates = np.arange(size) * pixel_size
+
+            def fixed_point(values):
+                return np.round(values).astype(np.int64).astype(np.int32)  # Wraps like the table
+
+            u_columns, u_rows = fixed_point(to_fraction[0, 0] * coordinates), fixed_point(to_fraction[0, 1] * coordinates)
+            v_columns, v_rows = fixed_point(to_fraction[1, 0] * coordinates), fixed_point(to_fraction[1, 1] * coordinates)
+            if terrace_width is not None:
+                edge = np.radians(angle if step_angle is None else step_angle)
+                step = definition["step_height"] if step_height is None else step_height
+                # Distance across the step edges, in terraces
+                across_columns = (-np.sin(edge) * coordinates / terrace_width).astype(np.float32)
+                across_rows = (np.cos(edge) * coordinates / terrace_width).astype(np.float32)
+
+            heights = np.empty((size, size), dtype=dtype)
+            mask = np.int32(table_size - 1)
+            block_rows = max(1, FFT_CHUNK_BYTES // (16 * size))
+            for start in range(0, size, block_rows):
+                stop = min(size, start + block_rows)
+                u = np.add(u_rows[start:stop, None], u_columns[None, :])
+                u >>= shift
+                u &= mask
+                v = np.add(v_rows[start:stop, None], v_columns[None, :])
+                v >>= shift
+                v &= mask
+                u *= table_size
+                u += v
+                np.take(table, u, out=heights[start:stop])
+                if terrace_width is not None:
+                    terraces = np.floor(np.add(across_rows[start:stop, None], across_columns[None, :]))
+                    terraces *= np.float32(step)
+                    heights[start:stop] += terraces
+
+            # Point defects remove random atoms, adsorbates sit at random positions
+            rng = np.random.default_rng(seed)
+            extent = size * pixel_size
+            present = atoms[:, 2] > 0  # Holes cannot be vacant
+            lattice_sites, atom_index = self._lattice_sites(cell, sites[present], extent)
+            removed = rng.random(len(lattice_sites)) < vacancy_fraction
+            vacancies = lattice_sites[removed]
+            self._add_gaussians(heights, vacancies, -heights_per_atom[present][atom_index[removed]], radius, pixel_size)
+            adsorbates = rng.random((rng.poisson(adsorbate_density * extent ** 2), 2)) * extent
+            self._add_gaussians(heights, adsorbates, np.full(len(adsorbates), adsorbate_height), adsorbate_radius, pixel_size)
+
+            self.surface_data = heights
+            self.pixel_size = pixel_size
+            self.lattice_info = {"lattice": lattice, "lattice_vectors": vectors, "cell_vectors": cell,
+                                 "angle": angle, "vacancies": vacancies, "adsorbates": adsorbates}
+            self.logger.debug(f"Lattice surface generated with {len(vacancies)} vacancies and {len(adsorbates)} adsorbates.")
+        except Exception as e:
+            self.logger.error(f"Error generating lattice surface: {e}")
+            raise
+
+    @staticmethod
+    def _lattice_sites(cell, sites, extent) -> tuple:
+        """
+        Positions of all atoms of a lattice inside the square [0, extent)^2, cell by cell.
+        :param cell: Cell vectors as columns.
+        :param sites: Fractional coordinates of the atoms in the cell.
+        :param extent: Width of the square.
+        :return: (N, 2) array of positions and the index of every position's atom in sites.
+        """
+        corners = np.linalg.inv(cell) @ np.array([[0, extent, 0, extent], [0, 0, extent, extent]])
+        low, high = np.floor(corners.min(axis=1)).astype(int) - 1, np.ceil(corners.max(axis=1)).astype(int) + 1
+        i, j = np.meshgrid(np.arange(low[0], high[0] + 1), np.arange(low[1], high[1] + 1), indexing="ij")
+        fractions = np.stack([i.ravel(), j.ravel()], axis=1)[:, None, :] + sites[None, :, :]
+        positions = (fractions @ cell.T).reshape(-1, 2)
+        atom_index = np.tile(np.arange(len(sites)), i.size)
+        inside = np.all((positions >= 0) & (positions < extent), axis=1)
+        return positions[inside], atom_index[inside]
+
+    @staticmethod
+    def _add_gaussians(heights, positions, amplitudes, sigma, pixel_size) -> None:
+        """
+        Add Gaussian bumps to a height map in place, each within three radii of its center.
+        A bump is the outer product of its row and column profiles. Bumps of at least
+        SLICE_BUMP_PIXELS pixels are added to their slice of the map one by one; smaller
+        ones are sorted by row and summed in chunks with np.bincount over the band of rows
+        they cover, so that neither the bumps nor the band exceed SPLAT_CHUNK_PIXELS at a time.
+        :param heights: Height map, pixel (row, column) at (column, row) * pixel_size.
+        :param positions: (N, 2) array of (x, y) centers.
+        :param amplitudes: Height of every bump.
+        :param sigma: Gaussian radius of the bumps.
+        :param pixel_size: Lateral size of a pixel.
+        """
+        if len(positions) == 0:
+            return
+        rows, cols = heights.shape
+        reach = int(np.ceil(3 * sigma / pixel_size))
+        offsets = np.arange(-reach, reach + 1)
+        centers = np.rint(positions / pixel_size).astype(np.int64)
+        order = np.argsort(centers[:, 1], kind="stable")
+        positions, amplitudes, centers = positions[order], np.asarray(amplitudes)[order], centers[order]
+        bumps_per_chunk = max(1, SPLAT_CHUNK_PIXELS // len(offsets) ** 2)
+        rows_per_chunk = max(1, SPLAT_CHUNK_PIXELS // cols)
+        start = 0
+        while start < len(positions):
+            stop = min(start + bumps_per_chunk,
+                       int(np.searchsorted(centers[:, 1], centers[start, 1] + rows_per_chunk)))
+            band_start = max(0, int(centers[start, 1]) - reach)
+            band_stop = min(rows, int(centers[stop - 1, 1]) + reach + 1)
+            chunk = slice(start, stop)
+            start = stop
+            if band_start >= band_stop:
+                continue
+            column_index = centers[chunk, 0, None] + offsets
+            row_index = centers[chunk, 1, None] + offsets
+            column_profile = np.exp(-(column_index * pixel_size - positions[chunk, 0, None]) ** 2 / (2 * sigma ** 2))
+            row_profile = np.exp(-(row_index * pixel_size - positions[chunk, 1, None]) ** 2 / (2 * sigma ** 2))
+            row_profile *= amplitudes[chunk, None]
+            if len(offsets) ** 2 >= SLICE_BUMP_PIXELS:
+                row_profile, column_profile = row_profile.astype(heights.dtype), column_profile.astype(heights.dtype)
+                for bump in range(stop - chunk.start):
+                    row_lo, row_hi = np.searchsorted(row_index[bump], [0, rows])
+                    column_lo, column_hi = np.searchsorted(column_index[bump], [0, cols])
+                    if row_lo < row_hi and column_lo < column_hi:
+                        heights[row_index[bump, row_lo]:row_index[bump, row_hi - 1] + 1,
+                                column_index[bump, column_lo]:column_index[bump, column_hi - 1] + 1] += (
+                            row_profile[bump, row_lo:row_hi, None] * column_profile[bump, column_lo:column_hi])
+                continue
+            # Pixels outside of the map get no weight, at an index clipped into the band
+            column_profile[(column_index < 0) | (column_index >= cols)] = 0.0
+            row_profile[(row_index < band_start) | (row_index >= band_stop)] = 0.0
+            np.clip(column_index, 0, cols - 1, out=column_index)
+            np.clip(row_index, band_start, band_stop - 1, out=row_index)
+            row_index -= band_start
+            row_index *= cols
+            flat_index = row_index[:, :, None] + column_index[:, None, :]
+            values = row_profile[:, :, None] * column_profile[:, None, :]
+            band = np.bincount(flat_index.ravel(), values.ravel(), minlength=(band_stop - band_start) * cols)
+            heights[band_start:band_stop] += band.reshape(-1, cols).astype(heights.dtype)
+
     def get_height_data(self) -> np.ndarray:
         """
         Retrieve the height data of the surface.
@@ -0,0 +1,207 @@
+# File: simulation/tiled_surface.py
+
+import numpy as np
+from simulation.surface import Surface
+from utils.byte_budget_cache import ByteBudgetCache
+from utils.logger import get_logger
+
+
+class TileCache(ByteBudgetCache):
+    """
+    Byte-budget LRU cache of surface tiles, keyed by (tile row, tile column).
+    """
+
+    def put(self, key, tile) -> None:
+        """
+        Store a tile, read-only, evicting least recently used tiles to stay within budget.
+        :param key: (tile row, tile column).
+        :param tile: 2D array of heights.
+        """
+        tile.flags.writeable = False
+        super().put(key, tile)
+
+
+class TiledSurface(Surface):
+    """
+    Surface whose heights are computed on demand, tile by tile, from a procedural
+    height function, so that an area of any size can be simulated at atomic resolution:
+    a scan only computes the tiles its trajectory visits, and an LRU cache with a byte
+    budget keeps the recently used tiles. The full height array is never built, so
+    get_height_data() is not available; read windows with window(), points with sample()
+    or pixels with pixels().
+    """
+
+    def __init__(self, height_function, size=(100.0, 100.0), pixel_size=0.1, tile_size=256,
+                 max_bytes=256 * 1024 ** 2, dtype=np.float32):
+        """
+        Initialize the TiledSurface.
+        :param height_function: Callable f(x, y) returning the heights on the grid of the
+                                1D coordinate arrays x (columns) and y (rows), shape (len(y), len(x)).
+        :param size: (width, height) of the surface in physical units, starting at (0, 0).
+        :param pixel_size: Lateral size of a pixel.
+        :param tile_size: Width and height of a tile in pixels.
+        :param max_bytes: Byte budget of the tile cache.
+        :param dtype: Floating point type of the heights.
+        """
+        super().__init__()
+        self.logger = get_logger(__name__)
+        if pixel_size <= 0:
+            self.logger.error("Pixel size must be positive.")
+            raise ValueError("Pixel size must be positive.")
+        if tile_size <= 0:
+            self.logger.error("Tile size must be positive.")
+            raise ValueError("Tile size must be positive.")
+        self.height_function = height_function
+        self.size = (float(size[0]), float(size[1]))
+        self.pixel_size = float(pixel_size)
+        self.tile_size = int(tile_size)
+        self.dtype = np.dtype(dtype)
+        self.shape = (int(np.ceil(self.size[1] / self.pixel_size)), int(np.ceil(self.size[0] / self.pixel_size)))
+        self.cache = TileCache(max_bytes)
+
+    def tile(self, tile_row, tile_column) -> np.ndarray:
+        """
+        Return a tile from the cache, computing it if needed.
+        :param tile_row: Row of the tile in the tile grid.
+        :param tile_column: Column of the tile in the tile grid.
+        :return: Read-only 2D array of heights; tiles at the far edges are truncated.
+        """
+        key = (int(tile_row), int(tile_column))
+        tile = self.cache.get(key)
+        if tile is None:
+            rows = np.arange(key[0] * self.tile_size, min(self.shape[0], (key[0] + 1) * self.tile_size))
+            columns = np.arange(key[1] * self.tile_size, min(self.shape[1], (key[1] + 1) * self.tile_size))
+            if len(rows) == 0 or len(columns) == 0:
+                self.logger.error(f"Tile {key} lies outside the surface.")
+                raise ValueError(f"Tile {key} lies outside the surface.")
+            tile = np.asarray(self.height_function(columns * self.pixel_size, rows * self.pixel_size), dtype=self.dtype)
+            if tile.shape != (len(rows), len(columns)):
+                self.logger.error(f"The height function returned shape {tile.shape} for a {len(rows)}x{len(columns)} tile.")
+                raise ValueError("The height function must return an array of shape (len(y), len(x)).")
+            self.cache.put(key, tile)
+        return tile
+
+    def window(self, x_start, x_end, y_start, y_end) -> np.ndarray:
+        """
+        Assemble the heights of the pixels whose centers lie in a window, from the tiles it overlaps.
+        :param x_start: Start of the window along x.
+        :param x_end: End of the window along x.
+        :param y_start: Start of the window along y.
+        :param y_end: End of the window along y.
+        :return: 2D array of heights, rows along y.
+        """
+        row_start, row_end = self._pixel_range(y_start, y_end, self.shape[0])
+        column_start, column_end = self._pixel_range(x_start, x_end, self.shape[1])
+        heights = np.empty((row_end - row_start, column_end - column_start), dtype=self.dtype)
+        size = self.tile_size
+        for tile_row in range(row_start // size, (row_end - 1) // size + 1 if row_end > row_start else 0):
+            for tile_column in range(column_start // size, (column_end - 1) // size + 1 if column_end > column_start else 0):
+                tile = self.tile(tile_row, tile_column)
+                r0, r1 = max(row_start, tile_row * size), min(row_end, (tile_row + 1) * size)
+                c0, c1 = max(column_start, tile_column * size), min(column_end, (tile_column + 1) * size)
+                heights[r0 - row_start:r1 - row_start, c0 - column_start:c1 - column_start] = \
+                    tile[r0 - tile_row * size:r1 - tile_row * size, c0 - tile_column * size:c1 - tile_column * size]
+        return heights
+
+    def sample(self, x, y) -> np.ndarray:
+        """
+        Heights of the pixels nearest to a set of points, computing only the tiles they fall in.
+        :param x: x coordinates of the points.
+        :param y: y coordinates of the points.
+        :return: Heights with the shape of x.
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        return self.pixels(np.rint(y / self.pixel_size).astype(np.int64), np.rint(x / self.pixel_size).astype(np.int64))
+
+    def pixels(self, rows, columns) -> np.ndarray:
+        """
+        Heights of individual pixels, computing only the tiles they fall in.
+        :param rows: Row indices; indices beyond the surface read its edge.
+        :param columns: Column indices, broadcastable with rows.
+        :return: Heights with the broadcast shape of rows and columns.
+        """
+        rows, columns = np.broadcast_arrays(np.asarray(rows), np.asarray(columns))
+        shape = rows.shape
+        rows = np.clip(rows.ravel(), 0, self.shape[0] - 1).astype(np.int64)
+        columns = np.clip(columns.ravel(), 0, self.shape[1] - 1).astype(np.int64)
+        tile_rows, tile_columns = rows // self.tile_size, columns // self.tile_size
+        keys, inverse = np.unique(tile_rows * (self.shape[1] // self.tile_size + 1) + tile_columns, return_inverse=True)
+        heights = np.empty(rows.shape, dtype=self.dtype)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+        for index in range(len(keys)):
+            points = order[bounds[index]:bounds[index + 1]]
+            tile_row, tile_column = tile_rows[points[0]], tile_columns[points[0]]
+            heights[points] = self.tile(tile_row, tile_column)[rows[points] - tile_row * self.tile_size,
+                                                               columns[points] - tile_column * self.tile_size]
+        return heights.reshape(shape)
+
+    def get_height_data(self) -> np.ndarray:
+        """
+        Not available: the full height array of a tiled surface is never built.
+        :raises RuntimeError: Always; use window() or sample() instead.
+        """
+        self.logger.error("A tiled surface is not materialized; use window() or sample().")
+        raise RuntimeError("A tiled surface is not materialized; use window() or sample().")
+
+    def reset_surface(self) -> None:
+        """
+        Drop all cached tiles.
+        """
+        self.logger.info("Clearing the tile cache.")
+        self.cache.clear()
+
+    def _pixel_range(self, start, end, count) -> tuple:
+        """
+        Range of pixel indices whose centers lie in [start, end], clipped to the surface.
+        """
+        if end < start:
+            start, end = end, start
+        first = max(0, int(np.ceil(start / self.pixel_size - 1e-9)))
+        last = min(count, int(np.floor(end / self.pixel_size + 1e-9)) + 1)
+        return first, max(first, last)
+
+
+class PlaneWaveRoughness:
+    """
+    Procedural self-affine roughness for a TiledSurface: a sum of plane waves with random
+    directions and phases whose wavelengths are spread logarithmically between the pixel
+    size and the surface size, weighted by the spectrum (1 + (q * correlation_length)^2)^-(1 + hurst).
+    It is defined everywhere, so every tile agrees with its neighbours. A tile is evaluated
+    as two matrix products, using cos(a + b) = cos a cos b - sin a sin b.
+    """
+
+    def __init__(self, hurst=0.8, correlation_length=None, rms=1.0, wavelengths=(0.2, 100.0), waves=256, seed=None):
+        """
+        Initialize the PlaneWaveRoughness.
+        :param hurst: Hurst exponent (0 < hurst < 1).
+        :param correlation_length: Lateral correlation length, or None for self-affine at all scales.
+        :param rms: RMS roughness of the heights.
+        :param wavelengths: (shortest, longest) wavelength of the waves.
+        :param waves: Number of plane waves.
+        :param seed: Seed of the directions and phases.
+        """
+        if not 0 < hurst < 1:
+            raise ValueError("The Hurst exponent must lie between 0 and 1.")
+        rng = np.random.default_rng(seed)
+        q = 2 * np.pi / np.exp(rng.uniform(np.log(wavelengths[0]), np.log(wavelengths[1]), waves))
+        if correlation_length is None:
+            spectrum = q ** (-2 * (1 + hurst))
+        else:
+            spectrum = (1 + (q * correlation_length) ** 2) ** -(1 + hurst)
+        # With log-uniform wavenumbers each wave stands for a band of width ~ q, of area ~ q^2
+        amplitudes = np.sqrt(spectrum * q * q)
+        amplitudes *= rms / np.sqrt(np.sum(amplitudes ** 2) / 2)
+        angles = rng.uniform(0, 2 * np.pi, waves)
+        self.wavevectors = np.stack([q * np.cos(angles), q * np.sin(angles)], axis=1)
+        self.amplitudes = amplitudes
+        self.phases = rng.uniform(0, 2 * np.pi, waves)
+
+    def __call__(self, x, y) -> np.ndarray:
+        """
+        Heights on the grid of the coordinate arrays x (columns) and y (rows).
+        """
+        along_x = np.outer(x, self.wavevectors[:, 0])
+        along_y = np.outer(y, self.wavevectors[:, 1]) + self.phases
+        return (np.cos(along_y) * self.amplitudes) @ np.cos(along_x).T - \
+               (np.sin(along_y) * self.amplitudes) @ np.sin(along_x).T
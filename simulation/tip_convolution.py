@@ -0,0 +1,335 @@
+# File: simulation/tip_convolution.py
+
+import numpy as np
+from utils.logger import get_logger
+
+TAP_BATCH = 32  # Taps applied to a tile between checks of the remaining support
+MIN_RUN_TAPS = 4  # Shortest straight run of a tip column dilated as a whole instead of tap by tap
+
+
+class TipConvolution:
+    """
+    Applies the shape of an AFM tip to a surface height map by grayscale dilation:
+    image(x) = max_u [surface(x + u) - tip(u)], where tip(u) >= 0 is the height of the
+    tip surface above its apex at lateral offset u. This is the image an ideal
+    feedback records, since the tip touches the surface wherever it first hits it.
+    The naive dilation costs one pass over the image per tip pixel; instead
+      - parabolic tips are separable into two 1D dilations,
+      - conical tips are decomposed into V-shaped line dilations along four directions
+        (an octagonal cone), each computed exactly in two sweeps,
+      - separable custom tips are dilated as two 1D profiles; other custom tips are split
+        into columns, and each straight run of a column (flat or sloped) is one running
+        max costing log2 of its length in passes. Only the remaining tip pixels cost a
+        pass each. Both are applied tile by tile, visiting only the parts of the tip
+        that can still touch the surface around the tile.
+    All tips must be sampled with the pixel size of the surface.
+    """
+
+    SHAPES = ("parabolic", "conical", "custom")
+
+    def __init__(self, pixel_size=(1.0, 1.0), dtype=np.float32, block_shape=(64, 256)):
+        """
+        Initialize the TipConvolution.
+        :param pixel_size: (x, y) size of a surface pixel, in the units of the heights.
+        :param dtype: Floating point type of the computation and the result.
+        :param block_shape: (rows, columns) of the image tiles processed at a time.
+        """
+        if pixel_size[0] <= 0 or pixel_size[1] <= 0:
+            raise ValueError("Pixel size must be positive.")
+        self.pixel_size = (float(pixel_size[0]), float(pixel_size[1]))
+        self.dtype = dtype
+        self.block_shape = (int(block_shape[0]), int(block_shape[1]))
+        self.logger = get_logger(__name__)
+
+    def apply(self, surface, shape="parabolic", **parameters) -> np.ndarray:
+        """
+        Dilate a surface with a tip by shape name.
+        :param surface: Surface with height data, or a 2D height array.
+        :param shape: "parabolic" (radius), "conical" (half_angle, apex_radius) or "custom" (tip).
+        :param parameters: Keyword arguments of the matching method.
+        :return: The dilated height map.
+        """
+        methods = {"parabolic": self.parabolic, "conical": self.conical, "custom": self.custom}
+        if shape not in methods:
+            self.logger.error(f"Invalid tip shape: {shape}")
+            raise ValueError(f"Invalid tip shape: {shape}")
+        return methods[shape](surface, **parameters)
+
+    def parabolic(self, surface, radius) -> np.ndarray:
+        """
+        Dilate with a paraboloid tip(u) = |u|^2 / (2 radius), the usual model of a tip apex.
+        :param surface: Surface with height data, or a 2D height array.
+        :param radius: Apex radius of curvature.
+        :return: The dilated height map.
+        """
+        if radius <= 0:
+            self.logger.error("Tip radius must be positive.")
+            raise ValueError("Tip radius must be positive.")
+        heights = self._heights(surface)
+        height_range = float(heights.max() - heights.min())
+        for axis, pixel in ((1, self.pixel_size[0]), (0, self.pixel_size[1])):
+            # Offsets whose tip height exceeds the height range can never touch the surface
+            reach = min(int(np.floor(np.sqrt(2 * radius * height_range) / pixel)), heights.shape[axis] - 1)
+            offsets = np.repeat(np.arange(reach + 1), 2)[1:] * np.tile([1, -1], reach + 1)[:-1]
+            costs = (offsets * pixel) ** 2 / (2 * radius)
+            zeros = np.zeros_like(offsets)
+            heights = _dilate_taps(heights, costs, *((offsets, zeros) if axis == 0 else (zeros, offsets)),
+                                   self.block_shape)
+        return heights
+
+    def conical(self, surface, half_angle, apex_radius=0.0) -> np.ndarray:
+        """
+        Dilate with a cone of the given half opening angle, optionally with a rounded apex.
+        The circular cone is approximated by an octagonal one whose flanks lie within
+        4% of it; the rounded apex is a paraboloid applied first, since dilating with
+        the apex and then with the cone equals dilating with the rounded cone.
+        :param surface: Surface with height data, or a 2D height array.
+        :param half_angle: Half opening angle of the cone in degrees (0 < half_angle < 90).
+        :param apex_radius: Radius of the rounded apex; 0 for a sharp cone.
+        :return: The dilated height map.
+        """
+        if not 0 < half_angle < 90:
+            self.logger.error("The half opening angle must lie between 0 and 90 degrees.")
+            raise ValueError("The half opening angle must lie between 0 and 90 degrees.")
+        heights = self.parabolic(surface, apex_radius) if apex_radius > 0 else self._heights(surface)
+        # Combining V-shaped lines of equal slope along 0, 45, 90 and 135 degrees gives a cone
+        # whose level lines are regular octagons with their corners on those lines. Scale
+        # the octagon halfway between the inscribed and the circumscribed one of the circle.
+        circumradius = (1.0 + 1.0 / np.cos(np.pi / 8)) / 2
+        slope = 1.0 / (np.tan(np.radians(half_angle)) * circumradius)  # Tip height per unit length along a line
+        dx, dy = self.pixel_size
+        heights = _dilate_cone_rows(heights, slope * dy, 0)
+        heights = _dilate_cone_rows(heights.T.copy(), slope * dx, 0).T.copy()
+        diagonal = slope * np.hypot(dx, dy)
+        heights = _dilate_cone_rows(heights, diagonal, 1)
+        heights = _dilate_cone_rows(heights, diagonal, -1)
+        return heights
+
+    def custom(self, surface, tip, tolerance=0.0) -> np.ndarray:
+        """
+        Dilate with a tip given as a 2D array of heights, e.g. from blind tip reconstruction.
+        The apex is the lowest tip pixel; pixels that are not finite are not part of the
+        tip. Each column of the tip is split into straight runs, and a run of n pixels
+        costs log2(n) passes over the image instead of n. Each image tile only
+        visits the runs and pixels that are lower, relative to the apex, than the height
+        range of the surface around the tile. In the worst case, a tip whose columns are
+        curved or irregular throughout, this is one pass per tip pixel within reach of
+        the surface; a smoothly curved tip such as a sampled cone can be split into runs
+        with a small tolerance instead.
+        :param surface: Surface with height data, or a 2D height array.
+        :param tip: 2D array of tip surface heights on the surface pixel grid.
+        :param tolerance: Largest tip height error allowed when a column is approximated by
+                          straight runs; 0 only accepts runs that are straight to rounding.
+        :return: The dilated height map.
+        """
+        tip = np.asarray(tip, dtype=np.float64)
+        if tip.ndim != 2 or not np.any(np.isfinite(tip)):
+            self.logger.error("The tip must be a 2D array with finite heights.")
+            raise ValueError("The tip must be a 2D array with finite heights.")
+        if tolerance < 0:
+            self.logger.error("The tolerance must not be negative.")
+            raise ValueError("The tolerance must not be negative.")
+        tip = np.where(np.isfinite(tip), tip, np.inf)
+        heights = self._heights(surface)
+        apex = np.unravel_index(np.argmin(tip), tip.shape)
+        tip = tip - tip[apex]
+        row_profile, column_profile = tip[:, apex[1]], tip[apex[0], :]
+        if np.all(np.isfinite(tip)) and np.allclose(tip, row_profile[:, None] + column_profile[None, :]):
+            # A separable tip is the sum of a row and a column profile: two 1D dilations
+            for axis, profile in ((1, column_profile), (0, row_profile)):
+                offsets = np.arange(len(profile)) - apex[axis]
+                order = np.lexsort((offsets != 0, profile))
+                zeros = np.zeros_like(offsets)
+                heights = _dilate_taps(heights, profile[order],
+                                       *((offsets[order], zeros) if axis == 0 else (zeros, offsets[order])),
+                                       self.block_shape)
+            return heights
+        # Rounding of the tip heights is not an approximation
+        tolerance = max(float(tolerance), 16 * np.finfo(np.float64).eps * float(np.max(tip[np.isfinite(tip)])))
+        taps = []  # (lowest cost, cost at the first pixel, row offset, column offset, length, slope)
+        for j, profile in enumerate(tip.T):
+            for start, stop in _straight_runs(profile, tolerance):
+                if stop - start < MIN_RUN_TAPS:
+                    taps.extend((profile[i], profile[i], i - apex[0], j - apex[1], 1, 0.0) for i in range(start, stop))
+                    continue
+                slope = (profile[stop - 1] - profile[start]) / (stop - start - 1)
+                taps.append((min(profile[start], profile[stop - 1]), profile[start], start - apex[0], j - apex[1],
+                             stop - start, slope))
+        taps = [(0.0, 0.0, 0, 0, 1, 0.0)] + sorted(taps)  # The apex first, even if it lies in a run
+        lowest, costs, offset_rows, offset_cols, lengths, slopes = (np.array(column) for column in zip(*taps))
+        return _dilate_taps(heights, costs, offset_rows, offset_cols, self.block_shape, lengths=lengths, slopes=slopes)
+
+    def tip_array(self, shape, size, **parameters) -> np.ndarray:
+        """
+        Sample a parabolic or conical tip on the pixel grid, e.g. as input for custom().
+        :param shape: "parabolic" (radius) or "conical" (half_angle, apex_radius).
+        :param size: Width of the square array in pixels (odd, apex in the center).
+        :return: 2D array of tip heights above the apex.
+        """
+        half = size // 2
+        y, x = np.mgrid[-half:size - half, -half:size - half]
+        distance = np.hypot(x * self.pixel_size[0], y * self.pixel_size[1])
+        if shape == "parabolic":
+            return distance ** 2 / (2 * parameters["radius"])
+        if shape == "conical":
+            slope = 1.0 / np.tan(np.radians(parameters["half_angle"]))
+            apex_radius = parameters.get("apex_radius", 0.0)
+            if apex_radius <= 0:
+                return slope * distance
+            # Paraboloid apex joined to the cone where their slopes are equal
+            joint = apex_radius * slope
+            return np.where(distance < joint, distance ** 2 / (2 * apex_radius),
+                            slope * distance - joint * slope / 2)
+        self.logger.error(f"Invalid tip shape: {shape}")
+        raise ValueError(f"Invalid tip shape: {shape}")
+
+    def _heights(self, surface) -> np.ndarray:
+        """
+        Return the height map of a Surface or array as a new array of the working type.
+        """
+        heights = surface.get_height_data() if hasattr(surface, "get_height_data") else surface
+        if heights is None:
+            self.logger.error("The surface has no height data.")
+            raise ValueError("The surface has no height data.")
+        heights = np.array(heights, dtype=self.dtype)
+        if heights.ndim != 2:
+            self.logger.error("The surface height map must be 2D.")
+            raise ValueError("The surface height map must be 2D.")
+        return heights
+
+
+def _dilate_taps(heights, costs, offset_rows, offset_cols, block_shape, lengths=None, slopes=None) -> np.ndarray:
+    """
+    Dilation with a structuring function given as taps: result(x) = max over taps k of
+    heights(x + offset_k) - costs[k], with the taps sorted by cost and the apex first.
+    A tap may also be a straight run down the columns, covering lengths[k] pixels from
+    its offset at costs[k] + slopes[k] * i; runs are sorted by their lowest cost.
+    The image is processed in tiles small enough to stay in cache. Within a tile the taps
+    are applied in batches, and the remaining taps are skipped once their cost exceeds
+    the highest surface in reach minus the lowest result so far.
+    """
+    rows, cols = heights.shape
+    result = heights.copy()
+    if len(costs) <= 1:
+        return result
+    lengths = np.ones(len(costs), dtype=int) if lengths is None else lengths
+    slopes = np.zeros(len(costs)) if slopes is None else slopes
+    lowest = costs + np.minimum(0.0, slopes * (lengths - 1))
+    up, down = max(0, -int(offset_rows.min())), max(0, int((offset_rows + lengths - 1).max()))
+    left, right = max(0, -int(offset_cols.min())), max(0, int(offset_cols.max()))
+    scratch = np.empty(block_shape, dtype=heights.dtype)
+    longest = int(lengths.max())
+    if longest > 1:
+        run_scratch = np.empty((2, block_shape[0] + longest, block_shape[1]), dtype=heights.dtype)
+    taps = list(zip(costs.astype(heights.dtype).tolist(), offset_rows.tolist(), offset_cols.tolist(),
+                    lengths.tolist(), slopes.tolist()))
+    for r0 in range(0, rows, block_shape[0]):
+        r1 = min(rows, r0 + block_shape[0])
+        for c0 in range(0, cols, block_shape[1]):
+            c1 = min(cols, c0 + block_shape[1])
+            peak = float(heights[max(0, r0 - up):min(rows, r1 + down), max(0, c0 - left):min(cols, c1 + right)].max())
+            tile = result[r0:r1, c0:c1]
+            k = 1
+            while True:
+                # Taps costing more than the highest surface in reach minus the lowest
+                # result so far cannot raise the tile any further
+                support = int(np.searchsorted(lowest, peak - float(tile.min()), side="right"))
+                if k >= support:
+                    break
+                for cost, dr, dc, length, slope in taps[k:min(support, k + TAP_BATCH)]:
+                    # Part of the tile whose offset pixel lies inside the surface
+                    a0, a1 = max(r0, -dr - length + 1), min(r1, rows - dr)
+                    b0, b1 = max(c0, -dc), min(c1, cols - dc)
+                    if a0 >= a1 or b0 >= b1:
+                        continue
+                    if length > 1:
+                        shifted = _run_max(heights, a0, a1, b0 + dc, b1 + dc, dr, length, slope, run_scratch)
+                        np.subtract(shifted, cost, out=shifted)
+                    else:
+                        shifted = np.subtract(heights[a0 + dr:a1 + dr, b0 + dc:b1 + dc], cost,
+                                              out=scratch[:a1 - a0, :b1 - b0])
+                    target = result[a0:a1, b0:b1]
+                    np.maximum(target, shifted, out=target)
+                k = min(support, k + TAP_BATCH)
+    return result
+
+
+def _run_max(heights, a0, a1, b0, b1, dr, length, slope, run_scratch) -> np.ndarray:
+    """
+    Running max down the columns b0:b1 with a linear cost, for the rows a0:a1:
+    max over 0 <= i < length of heights(row + dr + i) - slope * i, over the rows inside
+    the surface. Windows are doubled until they cover half the run, and two overlapping
+    ones give the whole run, so a run costs log2(length) passes over the tile.
+    """
+    rows = heights.shape[0]
+    count, span = a1 - a0, a1 - a0 + length - 1
+    values, shifted = run_scratch[:, :span, :b1 - b0]
+    # Rows of the surface from a0 + dr on, padded with -inf outside of it
+    i0, i1 = max(0, a0 + dr), min(rows, a0 + dr + span)
+    values[:i0 - a0 - dr] = -np.inf
+    values[i0 - a0 - dr:i1 - a0 - dr] = heights[i0:i1, b0:b1]
+    values[i1 - a0 - dr:] = -np.inf
+    width = 1
+    while 2 * width <= length:
+        # Window of 2 * width rows from the ones of width rows at t and t + width
+        np.subtract(values[width:span], slope * width, out=shifted[:span - width])
+        np.maximum(values[:span - width], shifted[:span - width], out=values[:span - width])
+        span -= width
+        width *= 2
+    if width < length:
+        np.subtract(values[length - width:length - width + count], slope * (length - width), out=shifted[:count])
+        np.maximum(values[:count], shifted[:count], out=values[:count])
+    return values[:count]
+
+
+def _dilate_cone_rows(heights, step_cost, column_shift) -> np.ndarray:
+    """
+    Dilation with the V-shaped function step_cost * |t| along the line through each
+    pixel that advances one row and column_shift columns per step. A forward and a
+    backward sweep over the rows give the exact result; each step is vectorized over
+    a whole row.
+    """
+    result = heights.copy()
+    cost = heights.dtype.type(step_cost)
+    rows, cols = heights.shape
+    # Columns of row i that have a neighbour in row i - 1 along the line, and that neighbour
+    if column_shift > 0:
+        current, previous = slice(column_shift, cols), slice(0, cols - column_shift)
+    elif column_shift < 0:
+        current, previous = slice(0, cols + column_shift), slice(-column_shift, cols)
+    else:
+        current = previous = slice(0, cols)
+    scratch = np.empty(cols, dtype=heights.dtype)[current]
+    for i in range(1, rows):
+        np.subtract(result[i - 1, previous], cost, out=scratch)
+        np.maximum(result[i, current], scratch, out=result[i, current])
+    for i in range(rows - 2, -1, -1):
+        np.subtract(result[i + 1, current], cost, out=scratch)
+        np.maximum(result[i, previous], scratch, out=result[i, previous])
+    return result
+
+
+def _straight_runs(profile, tolerance) -> list:
+    """
+    Split the finite part of a 1D profile into maximal runs [start, stop) whose values
+    lie within tolerance of the line through the first and the last value of the run.
+    """
+    runs = []
+    finite = np.isfinite(profile)
+    start, count = 0, len(profile)
+    while start < count:
+        if not finite[start]:
+            start += 1
+            continue
+        stop = start + 1
+        while stop < count and finite[stop]:
+            # Extend the run while all its values stay close to the chord
+            values = profile[start:stop + 1]
+            chord = np.linspace(values[0], values[-1], len(values))
+            if np.max(np.abs(values - chord)) > tolerance:
+                break
+            stop += 1
+        runs.append((start, stop))
+        start = stop
+    return runs
+
@@ -0,0 +1,180 @@
+# File: simulation/z_sensor.py
+
+import numpy as np
+from control.motion_controller import MotionController
+from simulation.tiled_surface import TiledSurface
+from utils.logger import get_logger
+
+
+class SurfaceZSensor:
+    """
+    Simulated Z sensor: the height of a Surface at arbitrary stage coordinates.
+    Whole lines are sampled at once with vectorized nearest, bilinear or bicubic
+    (Catmull-Rom) interpolation. A TiledSurface is only read at the pixels around the
+    points, so lines on a huge lazy surface only compute the tiles they cross.
+    """
+
+    INTERPOLATIONS = ("nearest", "bilinear", "bicubic")
+
+    def __init__(self, surface, interpolation="bilinear", pixel_size=None, origin=(0.0, 0.0), noise=0.0, seed=None):
+        """
+        Initialize the SurfaceZSensor.
+        :param surface: Surface to sample; pixel (0, 0) lies at the origin.
+        :param interpolation: "nearest", "bilinear" or "bicubic".
+        :param pixel_size: Lateral size of a surface pixel in stage units; defaults to surface.pixel_size.
+        :param origin: Stage (x, y) coordinates of pixel (0, 0).
+        :param noise: RMS of Gaussian noise added to every reading.
+        :param seed: Seed of the noise.
+        """
+        self.logger = get_logger(__name__)
+        if interpolation not in self.INTERPOLATIONS:
+            self.logger.error(f"Invalid interpolation: {interpolation}")
+            raise ValueError(f"Invalid interpolation: {interpolation}")
+        self.surface = surface
+        self.interpolation = interpolation
+        self.pixel_size = float(pixel_size if pixel_size is not None else surface.pixel_size)
+        if self.pixel_size <= 0:
+            self.logger.error("Pixel size must be positive.")
+            raise ValueError("Pixel size must be positive.")
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.noise = float(noise)
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, xs, ys) -> np.ndarray:
+        """
+        Heights of the surface at stage coordinates; points beyond the edge read the edge.
+        :param xs: X coordinates of the points.
+        :param ys: Y coordinates of the points.
+        :return: Array of heights with the shape of xs.
+        """
+        xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+        columns = ((xs - self.origin[0]) / self.pixel_size).ravel()
+        rows = ((ys - self.origin[1]) / self.pixel_size).ravel()
+        if self.interpolation == "nearest":
+            row_taps, column_taps = np.rint(rows)[:, None], np.rint(columns)[:, None]
+            row_weights = column_weights = np.ones((len(rows), 1))
+        else:
+            row_base, column_base = np.floor(rows), np.floor(columns)
+            kernel = _linear_weights if self.interpolation == "bilinear" else _cubic_weights
+            row_offsets, row_weights = kernel(rows - row_base)
+            column_offsets, column_weights = kernel(columns - column_base)
+            row_taps = row_base[:, None] + row_offsets
+            column_taps = column_base[:, None] + column_offsets
+        neighbours = self._neighbours(row_taps.astype(np.int64), column_taps.astype(np.int64))
+        values = np.einsum("ni,nij,nj->n", row_weights, neighbours, column_weights)
+        if self.noise > 0:
+            values += self.rng.normal(scale=self.noise, size=values.shape)
+        return values.reshape(xs.shape)
+
+    def _neighbours(self, row_taps, column_taps) -> np.ndarray:
+        """
+        Return the heights at every pair of row and column taps of every point, shape
+        (points, row taps, column taps); taps beyond the surface read its edge.
+        A TiledSurface is read pixel by pixel, so only the tiles holding taps are computed.
+        """
+        if isinstance(self.surface, TiledSurface):
+            return self.surface.pixels(row_taps[:, :, None], column_taps[:, None, :])
+        heights = self.surface.get_height_data()
+        if heights is None:
+            self.logger.error("The surface has no height data.")
+            raise ValueError("The surface has no height data.")
+        row_taps = np.clip(row_taps, 0, heights.shape[0] - 1)
+        column_taps = np.clip(column_taps, 0, heights.shape[1] - 1)
+        return heights[row_taps[:, :, None], column_taps[:, None, :]]
+
+
+class SimulatedMotionController(MotionController):
+    """
+    MotionController whose Z readings come from a SurfaceZSensor instead of a stored
+    value, so that a ScanManager driving it records the simulated topography. Lines
+    run through execute_line are sampled in one vectorized call; point-by-point moves
+    read the sensor at the current position.
+    """
+
+    def __init__(self, sensor, z_offset=0.0):
+        """
+        Initialize the SimulatedMotionController.
+        :param sensor: SurfaceZSensor providing the heights.
+        :param z_offset: Constant added to the surface heights, e.g. the Z position of the sample.
+        """
+        super().__init__()
+        self.logger = get_logger(__name__)
+        self.sensor = sensor
+        self.z_offset = float(z_offset)
+        self._last_line = (None, None, None)
+
+    def get_z_position(self):
+        """Read the Z sensor at the current XY position."""
+        self.z_position = float(self.sensor.sample(self.x_position, self.y_position)) + self.z_offset
+        return self.z_position
+
+    def move(self, x, y, z):
+        """Move the stage to the specified XY position; Z follows the surface."""
+        if not all(isinstance(value, (int, float)) for value in [x, y]):
+            raise TypeError("Position must be a numeric value.")
+        self.x_position = x
+        self.y_position = y
+
+    def execute_line(self, xs, ys):
+        """
+        Move along a whole scan line and return the surface height at every point.
+        :param xs: X coordinates of the line.
+        :param ys: Y coordinates of the line.
+        :return: NumPy array with one Z value per point.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if xs.shape != ys.shape or xs.ndim != 1:
+            raise ValueError("Line coordinates must be 1D arrays of equal length.")
+        z_values = self.sensor.sample(xs, ys) + self.z_offset
+        if len(xs):
+            self.x_position = float(xs[-1])
+            self.y_position = float(ys[-1])
+            self.z_position = float(z_values[-1])
+        self._last_line = (xs, ys, z_values)
+        return z_values
+
+    def read_channels(self, names, xs, ys):
+        """
+        Read signal channels for the points of the last executed line.
+        Supported channels: "topography" (Z-position) and "error" (setpoint minus Z-position).
+        :param names: Channel names to read.
+        :param xs: X coordinates of the points.
+        :param ys: Y coordinates of the points.
+        :return: Dict mapping channel names to NumPy arrays.
+        """
+        last_xs, last_ys, z_values = self._last_line
+        if last_xs is None or not (np.array_equal(last_xs, xs) and np.array_equal(last_ys, ys)):
+            z_values = self.sensor.sample(xs, ys) + self.z_offset
+        values = {}
+        for name in names:
+            if name == "topography":
+                values[name] = z_values.copy()
+            elif name == "error":
+                values[name] = self.setpoint - z_values
+            else:
+                self.logger.error(f"Unsupported channel: {name}")
+                raise ValueError(f"Unsupported channel: {name}")
+        return values
+
+
+def _linear_weights(fraction) -> tuple:
+    """
+    Offsets and weights of the two taps of linear interpolation.
+    """
+    return np.array([0, 1]), np.stack([1 - fraction, fraction], axis=1)
+
+
+def _cubic_weights(fraction) -> tuple:
+    """
+    Offsets and weights of the four taps of Catmull-Rom (Keys, a = -0.5) cubic interpolation.
+    """
+    t = fraction[:, None]
+    t2, t3 = t * t, t * t * t
+    weights = np.concatenate([
+        -0.5 * t3 + t2 - 0.5 * t,
+        1.5 * t3 - 2.5 * t2 + 1,
+        -1.5 * t3 + 2 * t2 + 0.5 * t,
+        0.5 * t3 - 0.5 * t2,
+    ], axis=1)
+    return np.array([-1, 0, 1, 2]), weights
@@ -0,0 +1,145 @@
+# File: tests/test_afm_contact.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+import numpy as np
+from simulation.afm_contact import AFMContactSimulation, ContactModel
+
+
+def quasi_static_dmt(z, spring_constant, youngs_modulus=1.0, work_of_adhesion=0.05, tip_radius=10.0,
+                     interaction_range=0.3, poisson_ratio=0.3):
+    """
+    Reference DMT curves by following the cantilever equilibrium d + F(d) / k = z on a dense
+    grid of indentations: on approach to the nearest equilibrium ahead, on retract behind.
+    """
+    d = np.linspace(-40.0, 20.0, 600001)
+    pull = 2 * np.pi * tip_radius * work_of_adhesion
+    hertz = 4 / 3 * youngs_modulus / (1 - poisson_ratio ** 2) * np.sqrt(tip_radius) * np.maximum(d, 0.0) ** 1.5
+    tail = -pull * (interaction_range / (interaction_range - np.minimum(d, 0.0))) ** 2
+    force = np.where(d >= 0, hertz - pull, tail)
+    position = d + force / spring_constant
+
+    def follow(targets, index, step):
+        forces = []
+        for target in targets:
+            while 0 <= index + step < len(d) and (position[index] - target) * step < 0:
+                index += step
+            forces.append(force[index])
+        return np.array(forces), index
+
+    approach, index = follow(z, 0, 1)
+    retract, _ = follow(z[::-1], index, -1)
+    return approach, retract[::-1]
+
+
+class TestContactModel(unittest.TestCase):
+    """
+    Unit tests for the ContactModel and the AFMContactSimulation built on it.
+    """
+
+    def setUp(self):
+        self.z = np.linspace(-10.0, 5.0, 601)
+
+    def test_hertz_with_stiff_cantilever(self):
+        """
+        Test that a very stiff cantilever measures the Hertz force at indentation z, without hysteresis.
+        """
+        model = ContactModel("hertz", tip_radius=20.0, spring_constant=1e6, poisson_ratio=0.5)
+        approach, retract = model.force_curves(self.z, 0.1)
+        expected = 4 / 3 * (0.1 / 0.75) * np.sqrt(20.0) * np.maximum(self.z, 0.0) ** 1.5
+        np.testing.assert_allclose(approach, expected, rtol=1e-3, atol=1e-4)
+        np.testing.assert_allclose(retract, approach)
+
+    def test_pull_off_forces(self):
+        """
+        Test the DMT and JKR pull-off forces, 2 pi R w and 3/2 pi R w, and the hysteresis.
+        """
+        z = np.linspace(-20.0, 5.0, 2001)
+        for name, pull_off in (("dmt", 2.0), ("jkr", 1.5)):
+            with self.subTest(model=name):
+                model = ContactModel(name, tip_radius=10.0, spring_constant=0.5)
+                approach, retract = model.force_curves(z, 1.0, 0.05)
+                self.assertAlmostEqual(float(retract.min()), -pull_off * np.pi * 10.0 * 0.05, delta=0.02)
+                self.assertGreater(float(approach.min()), float(retract.min()) + 0.5)
+                # Both branches agree far from the sample and deep in contact
+                np.testing.assert_allclose(approach[:100], retract[:100], atol=1e-4)
+                np.testing.assert_allclose(approach[-100:], retract[-100:], rtol=1e-4)
+        # Without adhesion, JKR and DMT are Hertz
+        hertz = ContactModel("hertz").force_curves(self.z, 1.0)[0]
+        np.testing.assert_allclose(ContactModel("jkr").force_curves(self.z, 1.0, 0.0)[0], hertz, rtol=1e-4, atol=1e-5)
+
+    def test_ranges_ending_in_the_adhesive_region(self):
+        """
+        Test curves that end before the repulsive contact, where the tip is pulled deeper
+        than the piezo position, against the quasi-static cantilever equilibrium.
+        """
+        for spring_constant, z_end in ((1.0, 0.5), (0.1, -1.0), (0.1, 2.0)):
+            with self.subTest(spring_constant=spring_constant, z_end=z_end):
+                z = np.linspace(-10.0, z_end, 400)
+                approach, retract = ContactModel("dmt", spring_constant=spring_constant).force_curves(z, 1.0, 0.05)
+                expected_approach, expected_retract = quasi_static_dmt(z, spring_constant)
+                np.testing.assert_allclose(approach, expected_approach, atol=3e-3)
+                np.testing.assert_allclose(retract, expected_retract, atol=3e-3)
+        # JKR against the same curves sampled 20 times finer
+        model = ContactModel("jkr", spring_constant=0.1)
+        z, fine = np.linspace(-10.0, 2.0, 400), np.linspace(-10.0, 2.0, 7981)
+        for coarse_curve, fine_curve in zip(model.force_curves(z, 1.0, 0.05), model.force_curves(fine, 1.0, 0.05)):
+            np.testing.assert_allclose(coarse_curve, fine_curve[::20], atol=1e-3)
+
+    def test_force_volume_matches_single_curves(self):
+        """
+        Test a batch of curves with per-pixel properties against curves computed one at a time.
+        """
+        rng = np.random.default_rng(2)
+        modulus = rng.uniform(0.5, 2.0, (3, 50))
+        adhesion = rng.uniform(0.0, 0.1, (3, 50))
+        heights = rng.normal(0.0, 1.0, (3, 50))
+        model = ContactModel("jkr", spring_constant=2.0)
+        model.CHUNK_CURVES = 16
+        approach, retract = model.force_curves(self.z, modulus, adhesion, heights)
+        self.assertEqual(approach.shape, (3, 50, len(self.z)))
+        self.assertEqual(approach.dtype, np.float32)
+        for index in [(0, 0), (1, 17), (2, 49)]:
+            single = model.force_curves(self.z, modulus[index], adhesion[index], heights[index])
+            np.testing.assert_allclose(approach[index], single[0], rtol=1e-6, atol=1e-6)
+            np.testing.assert_allclose(retract[index], single[1], rtol=1e-6, atol=1e-6)
+        # A higher sample is touched earlier: the curve shifts by its height
+        shifted = model.force_curves(self.z, 1.0, 0.05, 1.0)[0]
+        reference = model.force_curves(self.z + 1.0, 1.0, 0.05)[0]
+        np.testing.assert_allclose(shifted, reference, rtol=1e-5, atol=1e-5)
+
+    def test_simulation(self):
+        """
+        Test the synthetic curve, a force-volume map, noise and invalid parameters.
+        """
+        simulation = AFMContactSimulation()
+        simulation.configure_parameters({"spring_constant": 0.5, "points": 200, "model": "jkr"})
+        data = simulation.generate_synthetic_data()
+        self.assertEqual(data.shape, (400, 2))
+        np.testing.assert_allclose(data[:200, 0], data[:199:-1, 0])
+        distance, approach, retract = simulation.force_volume(np.full((4, 5), 1.0), heights=np.zeros((4, 5)))
+        self.assertEqual(approach.shape, (4, 5, 200))
+        np.testing.assert_allclose(approach[2, 3], data[:200, 1], rtol=1e-6)
+
+        simulation.configure_parameters({"noise": 0.1, "seed": 1})
+        noisy = simulation.generate_synthetic_data()[:, 1] - AFMContactSimulation().generate_synthetic_data()[:, 1]
+        self.assertAlmostEqual(float(noisy.std()), 0.1, delta=0.01)
+
+        with self.assertRaises(ValueError):
+            ContactModel("maugis")
+        with self.assertRaises(ValueError):
+            ContactModel().force_curves(self.z[::-1], 1.0)
+        with self.assertRaises(ValueError):
+            ContactModel().force_curves(self.z, -1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
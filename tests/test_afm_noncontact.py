@@ -0,0 +1,89 @@
+# File: tests/test_afm_noncontact.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+import numpy as np
+from simulation.afm_noncontact import AFMNonContactSimulation, ForceLaw, FrequencyShiftTable, NN_PER_EV_PER_NM
+
+
+class TestFrequencyShift(unittest.TestCase):
+    """
+    Unit tests for the FrequencyShiftTable and the AFMNonContactSimulation built on it.
+    """
+
+    def setUp(self):
+        self.law = ForceLaw()
+        self.table = FrequencyShiftTable(self.law, resonance_frequency=150e3, spring_constant=40.0)
+
+    def test_small_amplitude_measures_force_gradient(self):
+        """
+        Test that a small amplitude gives df = -f0 / (2k) dF/dz at the center of the oscillation.
+        """
+        amplitude = 1e-3
+        z = np.linspace(0.3, 2.0, 50) + amplitude
+        gradient = (self.law.force(z + 1e-5) - self.law.force(z - 1e-5)) / 2e-5
+        shift = self.table.integrate(z - amplitude, amplitude, 256)
+        expected = -150e3 / (2 * 40.0) * gradient
+        np.testing.assert_allclose(shift, expected, atol=1e-3 * np.abs(expected).max())
+
+    def test_large_amplitude_van_der_waals(self):
+        """
+        Test the large-amplitude limit k A^3/2 df / f0 = -C / (2 sqrt(2)) z^-3/2 for F = -C / z^2.
+        """
+        law = ForceLaw(binding_energy=0.0, hamaker=0.6, tip_radius=5.0)
+        z, amplitude = np.array([0.5, 0.75, 1.0]), 40.0
+        shift = FrequencyShiftTable(law, distances=(0.2, 5.0, 8), amplitudes=(1.0, 50.0, 2)).integrate(z, amplitude, 4096)
+        strength = 0.6 * 5.0 / 6 * NN_PER_EV_PER_NM
+        np.testing.assert_allclose(40.0 * amplitude ** 1.5 * shift / 150e3, -strength / (2 * np.sqrt(2)) * z ** -1.5, rtol=0.03)
+
+    def test_lookup_matches_integral(self):
+        """
+        Test table lookups against the direct integral between the grid points.
+        """
+        rng = np.random.default_rng(5)
+        distance = rng.uniform(0.5, 3.0, 200)
+        amplitude = np.exp(rng.uniform(np.log(0.02), np.log(40.0), 200))
+        direct = np.array([self.table.integrate([d], a, 4096)[0] for d, a in zip(distance, amplitude)])
+        np.testing.assert_allclose(self.table.lookup(distance, amplitude), direct, rtol=5e-3)
+        np.testing.assert_allclose(self.table.lookup(self.table.distances[:, None], self.table.amplitudes), self.table.table)
+
+    def test_simulation(self):
+        """
+        Test the frequency shift curve, a constant-height image, the table cache and invalid parameters.
+        """
+        simulation = AFMNonContactSimulation()
+        simulation.configure_parameters({"tip_sample_distance": 0.5, "oscillation_amplitude": 0.2, "force_law": "morse"})
+        curve = simulation.generate_synthetic_data()
+        self.assertEqual(curve.shape, (100,))
+        self.assertTrue(np.all(curve < 0))
+        self.assertTrue(np.all(np.diff(curve) > 0))  # The attraction weakens with distance
+        table = simulation.frequency_shift_table()
+        heights = np.zeros((16, 24))
+        heights[8, 12] = 0.1
+        image = simulation.frequency_shift_map(heights)
+        self.assertIs(simulation.frequency_shift_table(), table)
+        self.assertEqual(image.shape, (16, 24))
+        self.assertAlmostEqual(float(image[8, 12]), float(curve[0]))
+        self.assertGreater(float(image[0, 0]), float(image[8, 12]))
+
+        simulation.configure_parameters({"oscillation_amplitude": 0.2})
+        self.assertIsNot(simulation.frequency_shift_table(), table)
+        with self.assertRaises(ValueError):
+            simulation.frequency_shift_map(heights, tip_height=0.05)
+        with self.assertRaises(ValueError):
+            ForceLaw("buckingham")
+        simulation.configure_parameters({"tip_sample_distance": -1.0})
+        with self.assertRaises(ValueError):
+            simulation.generate_synthetic_data()
+
+
+if __name__ == "__main__":
+    unittest.main()
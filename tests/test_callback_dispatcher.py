@@ -0,0 +1,82 @@
+# File: tests/test_callback_dispatcher.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+import numpy as np
+from scan_engine.callback_dispatcher import CallbackDispatcher
+
+
+class FakeClock:
+    """
+    Manually advanced clock.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCallbackDispatcher(unittest.TestCase):
+    """
+    Unit tests for the CallbackDispatcher class.
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.progress = []
+        self.blocks = []
+        self.dispatcher = CallbackDispatcher(
+            lambda percent, current_position: self.progress.append(percent),
+            self.blocks.append,
+            progress_rate=10.0,
+            log_interval=0.5,
+            clock=self.clock,
+        )
+        self.dispatcher.begin(100)
+
+    def add_lines(self, count, dt):
+        for _ in range(count):
+            xs = np.arange(10, dtype=float)
+            self.dispatcher.add_line(xs, xs, xs)
+            self.clock.now += dt
+
+    def test_progress_is_rate_limited(self):
+        """
+        Test that progress updates are coalesced.
+        """
+        self.add_lines(9, 0.01)
+        self.assertEqual(self.progress, [10])
+        self.dispatcher.finish()
+        self.assertEqual(self.progress, [10, 100])
+
+    def test_points_are_delivered_in_blocks(self):
+        """
+        Test that logged points arrive as blocks and none are lost.
+        """
+        self.add_lines(10, 0.2)
+        self.dispatcher.finish()
+        self.assertLess(len(self.blocks), 10)
+        self.assertEqual(sum(len(block) for block in self.blocks), 100)
+        self.assertEqual(self.blocks[0].shape[1], 3)
+
+    def test_aborted_scan_does_not_report_completion(self):
+        """
+        Test that an aborted scan reports its real progress.
+        """
+        self.add_lines(3, 1.0)
+        self.dispatcher.finish(completed=False)
+        self.assertEqual(self.progress[-1], 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+# File: tests/test_checkpoint.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import tempfile
+import unittest
+import numpy as np
+from control.motion_controller import MotionController
+from scan_engine.checkpoint import ScanCheckpoint
+from scan_engine.scan_manager import ScanManager
+
+
+def height(xs, ys, z):
+    return xs + 10 * ys
+
+
+class TestScanCheckpoint(unittest.TestCase):
+    """
+    Unit tests for scan checkpoints and ScanManager.resume_scan.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "scan.ckpt")
+        self.motion_controller = MotionController()
+        self.scan_manager = ScanManager(self.motion_controller)
+        self.scan_manager.configure_channels({"height": height})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def interrupted_scan(self, lines_before_stop):
+        """Run a 5 x 4 raster that is stopped after the given number of lines."""
+        def stop_after(line_index, line_data):
+            if line_index == lines_before_stop - 1:
+                self.scan_manager.stop_scan()
+        return self.scan_manager.run_trajectory(
+            self.scan_manager.trajectory_planner.raster(0, 4, 0, 3, 1), line_callback=stop_after,
+            checkpoint_path=self.path
+        )
+
+    def test_checkpoint_records_lines(self):
+        """
+        Test that every finished line is appended with its data and controller state.
+        """
+        self.motion_controller.setpoint = 2.5
+        self.assertTrue(self.scan_manager.raster_scan(0, 4, 0, 3, 1, checkpoint_path=self.path))
+        header, lines, _ = ScanCheckpoint.read(self.path)
+        self.assertEqual(header["pattern"], "raster")
+        self.assertEqual(header["columns"], ["x", "y", "z", "timestamp", "height"])
+        self.assertEqual(header["controller_state"]["setpoint"], 2.5)
+        self.assertEqual([line[0] for line in lines], [0, 1, 2, 3])
+        np.testing.assert_array_equal(lines[1][1], self.scan_manager.scan_buffer.line_view(1))
+
+    def test_resume_completes_scan(self):
+        """
+        Test that a resumed scan produces the same image as an uninterrupted one.
+        """
+        self.assertFalse(self.interrupted_scan(2))
+        self.assertEqual(len(ScanCheckpoint.read(self.path)[1]), 2)
+
+        resumed = ScanManager(MotionController())
+        resumed.configure_channels({"height": height})
+        acquired = []
+        progress = []
+        self.assertTrue(resumed.resume_scan(
+            self.path, progress_callback=lambda p, current_position: progress.append(p),
+            line_callback=lambda index, data: acquired.append(index)
+        ))
+        self.assertEqual(acquired, [2, 3])
+        self.assertEqual(progress[-1], 100)
+        xs, ys = np.meshgrid(np.arange(5.0), np.arange(4.0))
+        np.testing.assert_array_equal(resumed.scan_buffer.image("height"), xs + 10 * ys)
+        self.assertEqual([line[0] for line in ScanCheckpoint.read(self.path)[1]], [0, 1, 2, 3])
+
+    def test_truncated_record_is_discarded(self):
+        """
+        Test that a record cut short by a crash is dropped and the line acquired again.
+        """
+        self.interrupted_scan(3)
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 7)
+        self.assertEqual(len(ScanCheckpoint.read(self.path)[1]), 2)
+
+        acquired = []
+        self.assertTrue(self.scan_manager.resume_scan(self.path, line_callback=lambda i, d: acquired.append(i)))
+        self.assertEqual(acquired, [2, 3])
+        self.assertEqual(self.scan_manager.scan_buffer.lines_completed, 4)
+
+    def test_resume_restores_controller_state(self):
+        """
+        Test that the controller state of the last completed line is restored.
+        """
+        self.motion_controller.setpoint = 1.5
+        self.interrupted_scan(1)
+        controller = MotionController()
+        resumed = ScanManager(controller)
+        resumed.configure_channels({"height": height})
+        resumed.resume_scan(self.path)
+        self.assertEqual(controller.setpoint, 1.5)
+
+    def test_resume_restores_channels(self):
+        """
+        Test that the channels are restored from the checkpoint, whatever is configured,
+        and that callable channels need their callable.
+        """
+        self.interrupted_scan(1)
+        resumed = ScanManager(MotionController())
+        resumed.configure_channels(["topography"])
+        self.assertTrue(resumed.resume_scan(self.path, channels={"height": height}))
+        self.assertEqual(resumed.scan_buffer.columns, ("x", "y", "z", "timestamp", "height"))
+        self.assertEqual(list(resumed.channels), ["topography"])
+
+        # Controller channels are read from the controller again
+        self.scan_manager.configure_channels(["error"])
+        self.interrupted_scan(1)
+        self.assertTrue(ScanManager(MotionController()).resume_scan(self.path))
+
+        self.scan_manager.configure_channels({"height": height})
+        self.interrupted_scan(1)
+        with self.assertRaises(ValueError):
+            ScanManager(MotionController()).resume_scan(self.path)
+
+    def test_resume_point_list(self):
+        """
+        Test that a point-list scan is planned again from the points stored in its checkpoint.
+        """
+        points = np.random.default_rng(3).random((40, 2)) * 4
+        trajectory = self.scan_manager.trajectory_planner.point_list(points, line_length=10)
+
+        def stop_after_first(line_index, line_data):
+            self.scan_manager.stop_scan()
+        self.scan_manager.run_trajectory(trajectory, line_callback=stop_after_first, checkpoint_path=self.path)
+        self.assertTrue(self.scan_manager.resume_scan(self.path))
+        np.testing.assert_array_equal(self.scan_manager.trajectory.points, trajectory.points)
+
+    def test_resume_rejects_different_trajectory(self):
+        """
+        Test that a checkpoint whose parameters now plan a different trajectory is rejected.
+        """
+        trajectory = self.scan_manager.trajectory_planner.raster(0, 4, 0, 3, 1)
+        trajectory.parameters["y_end"] = 5  # Plans 6 lines instead of the 4 stored
+        checkpoint = ScanCheckpoint.create(self.path, trajectory, ("x", "y", "z", "timestamp", "height"))
+        checkpoint.append_line(0, np.zeros((5, 5)))
+        checkpoint.close()
+        self.assertEqual(ScanCheckpoint.read(self.path)[0]["num_points"], 20)
+        with self.assertRaises(ValueError):
+            self.scan_manager.resume_scan(self.path)
+
+    def test_invalid_file(self):
+        """
+        Test reading a file that is not a checkpoint.
+        """
+        with open(self.path, "wb") as file:
+            file.write(b"not a checkpoint")
+        with self.assertRaises(ValueError):
+            ScanCheckpoint.read(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+# File: tests/test_drift.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+from unittest import mock
+import numpy as np
+from control.motion_controller import MotionController
+from scan_engine.drift import DriftTracker, phase_correlation
+import scan_engine.scan_manager as scan_manager_module
+from scan_engine.scan_manager import ScanManager
+from scan_engine.trajectory import TrajectoryPlanner
+
+rng = np.random.default_rng(5)
+BLOB_X, BLOB_Y = rng.random(60) * 48, rng.random(60) * 48
+
+
+def blobs(xs, ys):
+    """A non-periodic test sample: a sum of Gaussian blobs."""
+    xs, ys = np.asarray(xs)[..., np.newaxis], np.asarray(ys)[..., np.newaxis]
+    return np.exp(-((xs - BLOB_X) ** 2 + (ys - BLOB_Y) ** 2) / 8).sum(axis=-1)
+
+
+def smooth_surface(correlation_length, seed):
+    """A smooth random sample: a sum of long-wavelength cosines with random directions and phases."""
+    waves = np.random.default_rng(seed)
+    wave_vectors = waves.normal(0.0, 1.0 / (2 * np.pi * correlation_length), (40, 2))
+    amplitudes, phases = waves.normal(size=40), waves.uniform(0.0, 2 * np.pi, 40)
+
+    def surface(xs, ys):
+        xs, ys = np.asarray(xs)[..., np.newaxis], np.asarray(ys)[..., np.newaxis]
+        return (amplitudes * np.cos(2 * np.pi * (xs * wave_vectors[:, 0] + ys * wave_vectors[:, 1]) + phases)).sum(axis=-1)
+    return surface
+
+
+class TestDrift(unittest.TestCase):
+    """
+    Unit tests for phase correlation, the DriftTracker and drift-compensated scans.
+    """
+
+    def setUp(self):
+        y, x = np.mgrid[0:32, 0:32].astype(np.float64)
+        self.x, self.y = x + 8, y + 8
+        self.reference = blobs(self.x, self.y)
+
+    def shifted(self, row_shift, col_shift):
+        return blobs(self.x - col_shift, self.y - row_shift)
+
+    def test_phase_correlation_sub_pixel(self):
+        """
+        Test that integer and sub-pixel shifts of a non-periodic image are recovered.
+        """
+        for shift in ((0.0, 0.0), (3.0, -2.0), (0.3, -1.7), (2.45, 3.1), (-4.8, 0.05)):
+            with self.subTest(shift=shift):
+                measured = phase_correlation(self.reference, self.shifted(*shift))
+                np.testing.assert_allclose(measured, shift, atol=0.25)
+
+    def test_phase_correlation_on_smooth_surfaces(self):
+        """
+        Test that shifts of smooth random surfaces, whose windowed correlation peak is
+        pulled towards zero, are recovered without bias.
+        """
+        y, x = np.mgrid[0:96, 0:96].astype(np.float64)
+        for correlation_length in (8.0, 16.0):
+            for seed, shift in ((1, (2.0, 3.0)), (2, (-4.6, 1.3)), (3, (0.4, -5.75))):
+                with self.subTest(correlation_length=correlation_length, shift=shift):
+                    surface = smooth_surface(correlation_length, seed)
+                    measured = phase_correlation(surface(x, y), surface(x - shift[1], y - shift[0]))
+                    np.testing.assert_allclose(measured, shift, atol=0.02)
+
+    def test_phase_correlation_ignores_missing_lines(self):
+        """
+        Test correlating a frame in progress whose unscanned lines are NaN.
+        """
+        image = self.shifted(1.0, 2.0)
+        image[24:] = np.nan
+        np.testing.assert_allclose(phase_correlation(self.reference, image, upsample=1), (1.0, 2.0))
+
+    def test_tracker_velocity_and_prediction(self):
+        """
+        Test the drift position, velocity and prediction from frames with known shifts.
+        """
+        tracker = DriftTracker(pixel_size=(0.5, 0.5))
+        self.assertIsNone(tracker.update(self.reference, 0.0))
+        for frame in range(1, 4):
+            drift = tracker.update(self.shifted(0.4 * frame, -0.8 * frame), 10.0 * frame)
+        np.testing.assert_allclose(drift, (-1.2, 0.6), atol=0.1)
+        np.testing.assert_allclose(tracker.velocity, (-0.04, 0.02), atol=0.005)
+        np.testing.assert_allclose(tracker.predict(40.0), (-1.6, 0.8), atol=0.15)
+
+    def test_tracker_accounts_for_scan_offset(self):
+        """
+        Test that a shift caused by moving the scan is not mistaken for drift.
+        """
+        tracker = DriftTracker()
+        tracker.update(self.reference, 0.0)
+        # The scan followed a drift of 2 in x exactly, so the frame did not move
+        np.testing.assert_allclose(tracker.update(self.reference, 1.0, offset=(2.0, 0.0)), (2.0, 0.0))
+
+    def test_update_block(self):
+        """
+        Test measuring drift from a block of lines before the frame is complete.
+        """
+        tracker = DriftTracker()
+        tracker.update(self.reference, 0.0)
+        block = self.shifted(0.0, 1.5)[8:24]
+        np.testing.assert_allclose(tracker.update_block(block, 8, 1.0), (1.5, 0.0), atol=0.15)
+        with self.assertRaises(RuntimeError):
+            DriftTracker().update_block(block, 8, 1.0)
+
+    def test_planner_applies_offset(self):
+        """
+        Test that the planner shifts trajectories by the offset and the drift per line.
+        """
+        planner = TrajectoryPlanner()
+        tracker = DriftTracker()
+        tracker.update(self.reference, 0.0)
+        tracker.update(self.reference, 1.0, offset=(1.0, -0.5))
+        tracker.apply(planner, 1.0, line_duration=0.1)
+        np.testing.assert_allclose(planner.offset, (1.05, -0.525))
+        np.testing.assert_allclose(planner.drift_per_line, (0.1, -0.05))
+
+        plain = TrajectoryPlanner().raster(0, 3, 0, 2, 1)
+        compensated = planner.plan("raster", x_start=0, x_end=3, y_start=0, y_end=2, step_size=1)
+        line_index = np.repeat(np.arange(3), 4)[:, np.newaxis]
+        np.testing.assert_allclose(
+            compensated.points, plain.points + np.array(planner.offset) + line_index * np.array(planner.drift_per_line)
+        )
+        self.assertEqual(compensated.offset, planner.offset)
+        # The pattern methods leave the compensation to plan()
+        np.testing.assert_array_equal(planner.raster(0, 3, 0, 2, 1).points, plain.points)
+        planner.reset_drift()
+        np.testing.assert_array_equal(
+            planner.plan("raster", x_start=0, x_end=3, y_start=0, y_end=2, step_size=1).points, plain.points
+        )
+
+    def test_drift_corrected_scan_keeps_frames_registered(self):
+        """
+        Test repeated scans of a sample drifting at constant velocity.
+        The scan runs on a virtual clock that advances by a fixed time per acquired point,
+        so the drift per frame does not depend on the speed of the machine.
+        """
+        class VirtualClock:
+            now = 1000.0
+
+            def time(self):
+                return self.now
+
+            perf_counter = time
+
+        clock = VirtualClock()
+        point_time = 1e-3
+        # About one pixel of drift per 25 x 25 frame
+        velocity = np.array([0.8, -0.6]) / (625 * point_time)
+
+        def drifting_sample(xs, ys, z):
+            times = clock.now + point_time * np.arange(1, len(xs) + 1)
+            clock.now = float(times[-1])
+            drift = velocity[:, np.newaxis] * (times - 1000.0)
+            return blobs(np.asarray(xs) - drift[0], np.asarray(ys) - drift[1])
+
+        scan_manager = ScanManager(MotionController())
+        scan_manager.configure_channels({"sample": drifting_sample})
+        drifts = []
+        with mock.patch.object(scan_manager_module, "time", clock):
+            images = scan_manager.drift_corrected_scan(
+                16, 40, 16, 40, 1, frames=5, channel="sample",
+                frame_callback=lambda index, image, drift: drifts.append(drift)
+            )
+        self.assertEqual(len(images), 5)
+        self.assertIsNone(drifts[0])
+        np.testing.assert_allclose(drifts[1], [0.8, -0.6], atol=0.1)
+        # The last frames are registered with each other although the sample kept moving
+        remaining = phase_correlation(images[-2], images[-1])
+        self.assertLess(np.hypot(*remaining), 0.2)
+        self.assertEqual(scan_manager.trajectory_planner.offset, (0.0, 0.0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+# File: tests/test_logger.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import logging
+import unittest
+from logging.handlers import QueueHandler
+from utils.logger import (
+    RateLimitFilter, configure_logging, get_hot_path_logger, get_logger, set_module_level, shutdown_logging
+)
+
+
+class FakeClock:
+    """
+    Manually advanced clock.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingArgument:
+    """
+    Counts how often it is formatted.
+    """
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "value"
+
+
+class TestLogger(unittest.TestCase):
+    """
+    Unit tests for utils.logger.
+    """
+
+    def tearDown(self):
+        configure_logging(level=logging.DEBUG, asynchronous=False, hot_path_level=logging.WARNING)
+        set_module_level("tests.logger_demo", None)
+        set_module_level("tests.logger_demo.child", None)
+
+    def test_hot_path_logger_is_disabled_by_default(self):
+        """
+        Test that disabled hot-path messages are never formatted.
+        """
+        hot_logger = get_hot_path_logger("tests.logger_demo")
+        argument = CountingArgument()
+        for _ in range(100):
+            hot_logger.debug("z=%s", argument)
+        self.assertFalse(hot_logger.isEnabledFor(logging.DEBUG))
+        self.assertEqual(argument.formatted, 0)
+
+    def test_module_levels(self):
+        """
+        Test per-module levels with longest-prefix matching.
+        """
+        logger = get_logger("tests.logger_demo.child")
+        set_module_level("tests.logger_demo", "WARNING")
+        self.assertEqual(logger.level, logging.WARNING)
+        set_module_level("tests.logger_demo.child", "INFO")
+        self.assertEqual(logger.level, logging.INFO)
+
+    def test_asynchronous_mode_uses_queue_handler(self):
+        """
+        Test that asynchronous mode routes records through a queue.
+        """
+        logger = logging.getLogger("tests.logger_demo.async")
+        logger.propagate = False
+        get_logger("tests.logger_demo.async")
+        configure_logging(asynchronous=True)
+        self.assertTrue(any(isinstance(h, QueueHandler) for h in logger.handlers))
+        shutdown_logging()
+
+    def test_rate_limit_filter(self):
+        """
+        Test that a call site is limited to the configured rate.
+        """
+        clock = FakeClock()
+        rate_filter = RateLimitFilter(max_per_second=2.0, clock=clock)
+        record = logging.LogRecord("demo", logging.DEBUG, "file.py", 10, "msg", (), None)
+        results = []
+        for _ in range(10):
+            results.append(rate_filter.filter(record))
+            clock.now += 0.1
+        self.assertEqual(results.count(True), 2)
+        self.assertEqual(rate_filter.suppressed, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
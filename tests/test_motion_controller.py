@@ -81,6 +81,28 @@ class TestMotionController(unittest.TestCase):
             self.motion_controller.move_z(None)  # Invalid input
         logger.info("move_z_invalid test passed.")
 
+    def test_execute_line(self):
+        logger.info("Testing execute_line...")
+        self.motion_controller.move_z(12.5)
+        z_values = self.motion_controller.execute_line([0.0, 1.0, 2.0], [5.0, 5.0, 5.0])
+        self.assertEqual(z_values.tolist(), [12.5, 12.5, 12.5])
+        self.assertEqual((self.motion_controller.x_position, self.motion_controller.y_position), (2.0, 5.0))
+        with self.assertRaises(ValueError):
+            self.motion_controller.execute_line([0.0, 1.0], [0.0])
+        logger.info("execute_line test passed.")
+
+    def test_mock_controller_execute_line(self):
+        logger.info("Testing MockController execute_line...")
+        with self.assertRaises(ConnectionError):
+            self.mock_controller.execute_line([0.0], [0.0])
+        self.mock_controller.connect()
+        z_values = self.mock_controller.execute_line([1.0, 2.0, 3.0], [4.0, 4.0, 4.0])
+        self.assertEqual(len(z_values), 3)
+        self.assertEqual(self.mock_controller.get_position()[:2], (3.0, 4.0))
+        with self.assertRaises(ValueError):
+            self.mock_controller.execute_line([0.0, 500.0], [0.0, 0.0])
+        logger.info("MockController execute_line test passed.")
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
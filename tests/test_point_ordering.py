@@ -0,0 +1,120 @@
+# File: tests/test_point_ordering.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import time
+import unittest
+import numpy as np
+from scan_engine.point_ordering import PointOrderer
+from scan_engine.trajectory import TrajectoryPlanner
+
+
+class TestPointOrderer(unittest.TestCase):
+    """
+    Unit tests for the PointOrderer class.
+    """
+
+    def setUp(self):
+        self.orderer = PointOrderer()
+        self.points = np.random.default_rng(1).random((3000, 2)) * 100
+
+    def assertPermutation(self, order, count):
+        np.testing.assert_array_equal(np.sort(order), np.arange(count))
+
+    def test_hilbert_visits_grid_in_unit_steps(self):
+        """
+        Test that the Hilbert order of a square grid only takes unit steps.
+        """
+        grid = np.array([(x, y) for x in range(16) for y in range(16)], dtype=np.float64)
+        order = self.orderer.hilbert(grid)
+        self.assertPermutation(order, len(grid))
+        self.assertEqual(self.orderer.path_length(grid, order), len(grid) - 1)
+
+    def test_orders_shorten_travel(self):
+        """
+        Test that every method is a permutation and much shorter than a random order.
+        """
+        random_length = self.orderer.path_length(self.points)
+        for method in ("hilbert", "morton", "nearest_neighbor"):
+            with self.subTest(method=method):
+                order = self.orderer.order(self.points, method)
+                self.assertPermutation(order, len(self.points))
+                self.assertLess(self.orderer.path_length(self.points, order), random_length / 10)
+
+    def test_two_opt_never_lengthens(self):
+        """
+        Test that the 2-opt improves a space-filling curve order.
+        """
+        initial = self.orderer.morton(self.points)
+        improved = self.orderer.two_opt(self.points, initial)
+        self.assertPermutation(improved, len(self.points))
+        self.assertLess(self.orderer.path_length(self.points, improved), self.orderer.path_length(self.points, initial))
+
+    def test_euclidean_nearest_neighbor(self):
+        """
+        Test the nearest-neighbour tour with the euclidean metric on clustered points.
+        """
+        orderer = PointOrderer("euclidean")
+        clusters = np.concatenate([self.points[:100] / 10, self.points[100:200] / 10 + 90])
+        order = orderer.nearest_neighbor(clusters)
+        self.assertPermutation(order, len(clusters))
+        # One jump between the clusters
+        steps = np.hypot(*np.diff(clusters[order], axis=0).T)
+        self.assertEqual(int((steps > 50).sum()), 1)
+
+    def test_nearest_neighbor_matches_brute_force(self):
+        """
+        Test the k-d tree walk against a brute-force greedy walk on clustered points with a
+        far outlier, and that the outlier does not slow down the walk.
+        """
+        rng = np.random.default_rng(3)
+        points = np.concatenate([rng.normal(0, 1, (300, 2)), rng.normal(50, 0.1, (300, 2)), [[1e5, 1e5]]])
+        for metric in ("manhattan", "euclidean"):
+            with self.subTest(metric=metric):
+                remaining, expected = np.ones(len(points), dtype=bool), [0]
+                remaining[0] = False
+                for _ in range(len(points) - 1):
+                    offsets = np.abs(points - points[expected[-1]])
+                    distance = offsets.sum(axis=1) if metric == "manhattan" else np.hypot(*offsets.T)
+                    distance[~remaining] = np.inf
+                    expected.append(int(np.argmin(distance)))
+                    remaining[expected[-1]] = False
+                np.testing.assert_array_equal(PointOrderer(metric).nearest_neighbor(points), expected)
+
+        grid = np.stack(np.meshgrid(np.arange(100.0), np.arange(100.0)), axis=-1).reshape(-1, 2)
+        start = time.perf_counter()
+        self.assertPermutation(self.orderer.nearest_neighbor(np.concatenate([grid, [[1e6, 1e6]]])), 10001)
+        self.assertLess(time.perf_counter() - start, 5.0)
+
+    def test_point_list_trajectory(self):
+        """
+        Test planning a point list split into lines.
+        """
+        trajectory = TrajectoryPlanner().point_list(self.points[:1000], line_length=300)
+        self.assertEqual(trajectory.shape, (4, 300))
+        np.testing.assert_array_equal(trajectory.line_offsets, [0, 300, 600, 900, 1000])
+        np.testing.assert_array_equal(trajectory.points, self.points[:1000][trajectory.source_indices])
+
+    def test_invalid_method(self):
+        """
+        Test an unknown ordering method.
+        """
+        with self.assertRaises(ValueError):
+            self.orderer.order(self.points, "random")
+
+    def test_none_keeps_the_given_order(self):
+        """
+        Test that the "none" method returns the points in the given order, without 2-opt.
+        """
+        np.testing.assert_array_equal(self.orderer.order(self.points, "none"), np.arange(len(self.points)))
+
+
+if __name__ == "__main__":
+    unittest.main()
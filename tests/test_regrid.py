@@ -0,0 +1,128 @@
+# File: tests/test_regrid.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+import numpy as np
+from scan_engine.regrid import Regridder
+from scan_engine.scan_manager import ScanManager
+from scan_engine.trajectory import TrajectoryPlanner
+
+
+def plane(xs, ys):
+    return 2 * xs - 3 * ys + 1
+
+
+class PlaneController:
+    """Controller whose measured height is a tilted plane."""
+
+    def execute_line(self, xs, ys):
+        return plane(xs, ys)
+
+
+class TestRegridder(unittest.TestCase):
+    """
+    Unit tests for the Regridder class.
+    """
+
+    def setUp(self):
+        self.regridder = Regridder((11, 21), (0, 20), (0, 10))
+
+    def test_bin_on_pixel_centers(self):
+        """
+        Test that samples on pixel centers are binned exactly, with empty pixels NaN.
+        """
+        ys, xs = np.mgrid[0:11:2, 0:21:2].astype(np.float64)
+        image, counts = self.regridder.bin(xs.ravel(), ys.ravel(), plane(xs, ys).ravel())
+        np.testing.assert_allclose(image[::2, ::2], plane(xs, ys))
+        self.assertTrue(np.isnan(image[1, 1]))
+        self.assertEqual(int(counts.sum()), xs.size)
+
+    def test_bilinear_reproduces_plane(self):
+        """
+        Test that bilinear regridding of dense scattered samples reproduces a plane
+        away from the edges, where samples only lie on one side of a pixel.
+        """
+        rng = np.random.default_rng(0)
+        xs, ys = rng.random(20000) * 20, rng.random(20000) * 10
+        image = self.regridder.regrid(xs, ys, plane(xs, ys), "bilinear")
+        grid_y, grid_x = np.mgrid[0:11, 0:21].astype(np.float64)
+        np.testing.assert_allclose(image[1:-1, 1:-1], plane(grid_x, grid_y)[1:-1, 1:-1], atol=0.5)
+
+    def test_fill_holes(self):
+        """
+        Test that holes are filled from their neighbours.
+        """
+        image = np.ones((5, 5))
+        image[1:4, 1:4] = np.nan
+        filled = Regridder.fill_holes(image)
+        np.testing.assert_allclose(filled, 1.0)
+        self.assertTrue(np.isnan(image[2, 2]))
+
+    def test_invalid_method(self):
+        """
+        Test an unknown regridding method.
+        """
+        with self.assertRaises(ValueError):
+            self.regridder.regrid([1.0], [1.0], [1.0], "cubic")
+
+
+class TestFastScanPatterns(unittest.TestCase):
+    """
+    Unit tests for the Lissajous and constant-velocity spiral patterns.
+    """
+
+    def setUp(self):
+        self.planner = TrajectoryPlanner()
+
+    def test_lissajous_covers_area(self):
+        """
+        Test that the Lissajous figure stays inside and spans its rectangle.
+        """
+        trajectory = self.planner.lissajous(0, 10, 2, 6, 7, 8, 5000, line_length=1000)
+        self.assertEqual(trajectory.num_points, 5000)
+        self.assertEqual(trajectory.num_lines, 5)
+        self.assertAlmostEqual(trajectory.x.min(), 0, places=3)
+        self.assertAlmostEqual(trajectory.x.max(), 10, places=3)
+        self.assertGreaterEqual(trajectory.y.min(), 2 - 1e-9)
+        self.assertLessEqual(trajectory.y.max(), 6 + 1e-9)
+
+    def test_clv_spiral_constant_spacing(self):
+        """
+        Test that constant-velocity spiral samples are evenly spaced along the path.
+        """
+        trajectory = self.planner.clv_spiral(0, 0, 5, 0.5, 0.05)
+        steps = np.hypot(*np.diff(trajectory.points, axis=0).T)
+        np.testing.assert_allclose(steps[20:], 0.05, rtol=0.01)
+        self.assertLessEqual(np.hypot(trajectory.x, trajectory.y).max(), 5 + 1e-9)
+        self.assertGreater(np.hypot(trajectory.x, trajectory.y).max(), 5 - 0.05)
+
+    def test_lissajous_scan_image(self):
+        """
+        Test that a Lissajous scan is regridded into an image of the surface.
+        """
+        scan_manager = ScanManager(motion_controller=PlaneController())
+        image = scan_manager.lissajous_scan(0, 10, 0, 10, 63, 64, 80000, image_shape=(32, 32))
+        grid_y, grid_x = np.meshgrid(np.linspace(0, 10, 32), np.linspace(0, 10, 32), indexing="ij")
+        self.assertFalse(np.isnan(image).any())
+        np.testing.assert_allclose(image[1:-1, 1:-1], plane(grid_x, grid_y)[1:-1, 1:-1], atol=0.5)
+
+    def test_clv_spiral_scan_image(self):
+        """
+        Test that a constant-velocity spiral scan yields an image of the enclosing square.
+        """
+        scan_manager = ScanManager(motion_controller=PlaneController())
+        image = scan_manager.clv_spiral_scan(5, 5, 5, 0.2, 0.1, image_shape=(16, 16))
+        self.assertEqual(image.shape, (16, 16))
+        self.assertAlmostEqual(image[8, 8], plane(5.33, 5.33), delta=1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+# File: tests/test_scan_buffer.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+import numpy as np
+from scan_engine.scan_buffer import ScanBuffer, ScanDataView
+from scan_engine.trajectory import TrajectoryPlanner
+
+
+class TestScanBuffer(unittest.TestCase):
+    """
+    Unit tests for the ScanBuffer and ScanDataView classes.
+    """
+
+    def setUp(self):
+        self.trajectory = TrajectoryPlanner().raster(0, 3, 0, 1, 1)
+        self.buffer = ScanBuffer(self.trajectory, channels=("current",))
+
+    def test_backward_lines_fill_image_in_place(self):
+        """
+        Test that a backward line lands in image order without reshaping.
+        """
+        line = self.trajectory.line(1)
+        self.buffer.write_line(1, x=line[:, 0], y=line[:, 1], z=[10, 20, 30, 40])
+        np.testing.assert_array_equal(self.buffer.image("x")[1], [0, 1, 2, 3])
+        np.testing.assert_array_equal(self.buffer.image("z")[1], [40, 30, 20, 10])
+        np.testing.assert_array_equal(self.buffer.line_view(1, "z"), [10, 20, 30, 40])
+
+    def test_line_view_is_zero_copy(self):
+        """
+        Test that line views share memory with the image.
+        """
+        self.assertTrue(np.shares_memory(self.buffer.line_view(1, "z"), self.buffer.image("z")))
+
+    def test_extra_channel(self):
+        """
+        Test that extra channels are stored as their own plane.
+        """
+        self.buffer.write_line(0, current=[1, 2, 3, 4])
+        np.testing.assert_array_equal(self.buffer.image("current")[0], [1, 2, 3, 4])
+        with self.assertRaises(KeyError):
+            self.buffer.image("phase")
+
+    def test_scan_data_view(self):
+        """
+        Test the list-of-dicts compatibility view.
+        """
+        for i in range(self.trajectory.num_lines):
+            line = self.trajectory.line(i)
+            self.buffer.write_line(i, x=line[:, 0], y=line[:, 1], z=line[:, 0] * 0.5)
+        view = ScanDataView(self.buffer)
+        self.assertEqual(len(view), 8)
+        self.assertEqual(view[4], {"x": 3.0, "y": 1.0, "z": 1.5})
+        self.assertEqual(view[-1], {"x": 0.0, "y": 1.0, "z": 0.0})
+        self.assertEqual([p["x"] for p in view[:4]], [0.0, 1.0, 2.0, 3.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+# File: tests/test_scan_estimator.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import time
+import unittest
+from control.motion_controller import MotionController
+from hardware.mock_controller import MockController
+from hardware.motion_model import MotionModel
+from hardware.stepper_motor import StepperMotor
+from scan_engine.scan_buffer import ScanBuffer
+from scan_engine.scan_estimator import ScanEstimator
+from scan_engine.scan_manager import LineTimingModel, ScanManager
+from scan_engine.trajectory import TrajectoryPlanner
+
+
+class TestScanEstimator(unittest.TestCase):
+    """
+    Unit tests for the ScanEstimator class.
+    """
+
+    def setUp(self):
+        self.planner = TrajectoryPlanner()
+        self.estimator = ScanEstimator(StepperMotor().get_motion_model(), channels=2, dwell_time=0.001)
+
+    def test_closed_form_matches_trajectory(self):
+        """
+        Test that the closed-form rectangular estimates match the planned trajectories.
+        """
+        cases = [
+            ("raster", dict(x_start=0, x_end=2, y_start=1, y_end=2.5, step_size=0.25)),
+            ("trace_retrace", dict(x_start=0, x_end=2, y_start=1, y_end=2.5, step_size=0.25)),
+            ("grid", dict(x_start=0, x_end=3, y_start=0, y_end=1, rows=4, cols=7)),
+        ]
+        for pattern, parameters in cases:
+            with self.subTest(pattern=pattern):
+                closed = self.estimator.estimate(pattern, **parameters)
+                planned = self.estimator.estimate_trajectory(self.planner.plan(pattern, **parameters))
+                self.assertEqual(closed.num_points, planned.num_points)
+                self.assertEqual(closed.num_lines, planned.num_lines)
+                self.assertAlmostEqual(closed.travel, planned.travel)
+                self.assertAlmostEqual(closed.duration, planned.duration)
+                self.assertEqual(closed.peak_memory_bytes, planned.peak_memory_bytes)
+
+    def test_stepper_motion_model(self):
+        """
+        Test the StepperMotor travel time of a raster scan.
+        """
+        estimate = self.estimator.estimate("raster", x_start=0, x_end=10, y_start=0, y_end=10, step_size=1)
+        travel = 11 * 10 + 10
+        self.assertEqual(estimate.num_points, 121)
+        self.assertAlmostEqual(estimate.motion_time, travel * StepperMotor.SECONDS_PER_UNIT)
+        self.assertAlmostEqual(estimate.duration, travel * 0.01 + 121 * 0.001)
+
+    def test_buffer_memory(self):
+        """
+        Test that the estimated buffer size matches the allocated scan buffer.
+        """
+        trajectory = self.planner.trace_retrace(0, 5, 0, 3, 0.5)
+        buffer = ScanBuffer(trajectory, ("current", "phase"))
+        estimate = self.estimator.estimate_trajectory(trajectory)
+        self.assertEqual(estimate.buffer_bytes, buffer.nbytes)
+        self.assertGreater(estimate.peak_memory_bytes, buffer.nbytes + trajectory.points.nbytes)
+
+    def test_trajectory_memory_includes_index_tables(self):
+        """
+        Test the trajectory memory against the arrays of a planned trajectory, with its
+        line and buffer index tables built.
+        """
+        for pattern, parameters in (("raster", dict(x_start=0, x_end=63, y_start=0, y_end=31, step_size=1)),
+                                    ("point_list", dict(points=[(0, 0), (5, 5), (1, 2)]))):
+            with self.subTest(pattern=pattern):
+                trajectory = self.planner.plan(pattern, **parameters)
+                estimate = ScanEstimator().estimate(pattern, **parameters)
+                arrays = (trajectory.points, trajectory.line_offsets, trajectory.directions, trajectory.line_rows,
+                          trajectory.line_passes, trajectory.line_index, trajectory.buffer_index,
+                          trajectory.source_indices)
+                trajectory_bytes = sum(array.nbytes for array in arrays if array is not None)
+                line_bytes = 2 * int(max(trajectory.line_offsets[1:] - trajectory.line_offsets[:-1])) * 8
+                self.assertEqual(estimate.peak_memory_bytes, estimate.buffer_bytes + trajectory_bytes + line_bytes)
+
+    def test_chunked_lines_pay_latency_per_chunk(self):
+        """
+        Test that lines split into execute_line chunks pay the move latency per chunk.
+        """
+        line_timing = LineTimingModel()
+        for points in (10, 20, 40):
+            line_timing.record(points, 0.01 + 0.001 * points)
+        estimator = ScanEstimator(MotionModel(move_latency=0.01), line_timing=line_timing, abort_latency=0.05)
+        estimate = estimator.estimate("raster", x_start=0, x_end=99, y_start=0, y_end=9, step_size=1)
+        # Chunks of 40 points: three calls per line of 100 points
+        self.assertEqual(estimator.moves_per_line(100), 3)
+        self.assertAlmostEqual(estimate.motion_time, 10 * 3 * 0.01)
+        self.assertAlmostEqual(ScanEstimator(MotionModel(move_latency=0.01)).estimate(
+            "raster", x_start=0, x_end=99, y_start=0, y_end=9, step_size=1).motion_time, 10 * 0.01)
+
+    def test_point_by_point_latency(self):
+        """
+        Test that controllers driven point by point pay the move latency per point.
+        """
+        estimator = ScanEstimator(MotionModel(move_latency=0.5, batched_lines=False))
+        estimate = estimator.estimate("circle", center_x=0, center_y=0, radius=1, num_points=8)
+        self.assertAlmostEqual(estimate.motion_time, 4.0)
+
+    def test_scan_manager_estimate_predicts_mock_scan(self):
+        """
+        Test the estimate of a MockController scan against its actual duration.
+        """
+        controller = MockController()
+        controller.connect()
+        controller.move_latency = 0.02
+        scan_manager = ScanManager(controller)
+        scan_manager.configure_channels(["current"])
+        estimate = scan_manager.estimate_scan("raster", x_start=0, x_end=4, y_start=0, y_end=9, step_size=1)
+        self.assertEqual(estimate.buffer_bytes, 5 * 5 * 10 * 8)
+
+        start = time.perf_counter()
+        scan_manager.raster_scan(0, 4, 0, 9, 1)
+        elapsed = time.perf_counter() - start
+        self.assertAlmostEqual(estimate.duration, 0.2)
+        self.assertGreaterEqual(elapsed, estimate.duration)
+        self.assertLess(elapsed, estimate.duration + 0.5)
+
+    def test_for_controller(self):
+        """
+        Test that an estimator built from a controller's motion model predicts a non-zero duration.
+        """
+        parameters = dict(x_start=0, x_end=10, y_start=0, y_end=10, step_size=1)
+        estimate = ScanEstimator.for_controller(StepperMotor()).estimate("raster", **parameters)
+        self.assertAlmostEqual(estimate.duration, (11 * 10 + 10) * StepperMotor.SECONDS_PER_UNIT)
+        controller = MockController()
+        controller.move_latency = 0.02
+        estimate = ScanEstimator.for_controller(controller, dwell_time=0.001).estimate("raster", **parameters)
+        self.assertAlmostEqual(estimate.duration, 11 * 0.02 + 121 * 0.001)
+
+    def test_default_model_for_controller_without_model(self):
+        """
+        Test that controllers without get_motion_model move instantly in one command per line.
+        """
+        model = ScanEstimator.motion_model_for(MotionController())
+        self.assertTrue(model.batched_lines)
+        self.assertEqual(model.motion_time(100.0, 10), 0.0)
+
+    def test_describe(self):
+        """
+        Test the human-readable summary.
+        """
+        estimate = ScanEstimator(dwell_time=1.0).estimate("grid", x_start=0, x_end=1, y_start=0, y_end=1,
+                                                          rows=60, cols=60)
+        self.assertIn("3,600 points, 1:00:00", estimate.describe())
+
+
+if __name__ == "__main__":
+    unittest.main()
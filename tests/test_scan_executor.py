@@ -0,0 +1,80 @@
+# File: tests/test_scan_executor.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import time
+import unittest
+import numpy as np
+from control.motion_controller import MotionController
+from scan_engine.scan_executor import ScanExecutor
+from scan_engine.scan_manager import ScanManager
+
+
+class SlowController(MotionController):
+    """
+    MotionController that takes a fixed time per point.
+    """
+
+    def __init__(self, seconds_per_point):
+        super().__init__()
+        self.seconds_per_point = seconds_per_point
+
+    def execute_line(self, xs, ys):
+        time.sleep(self.seconds_per_point * len(xs))
+        return super().execute_line(xs, ys)
+
+
+class TestScanExecutor(unittest.TestCase):
+    """
+    Unit tests for the ScanExecutor class.
+    """
+
+    def test_streams_every_line(self):
+        """
+        Test that a background scan streams every line and then ends.
+        """
+        scan_manager = ScanManager(motion_controller=MotionController())
+        executor = ScanExecutor(scan_manager, max_queued_lines=2)
+        executor.start("raster", x_start=0, x_end=9, y_start=0, y_end=9, step_size=1)
+        lines = [index for index, data in executor.iter_results(timeout=5)]
+        self.assertTrue(executor.wait(5))
+        self.assertTrue(executor.completed)
+        self.assertEqual(lines, list(range(10)))
+        self.assertFalse(np.isnan(scan_manager.scan_buffer.image("z")).any())
+
+    def test_abort_is_fast(self):
+        """
+        Test that stopping a long scan returns within the abort latency.
+        """
+        scan_manager = ScanManager(motion_controller=SlowController(0.001))
+        scan_manager.abort_latency = 0.02
+        executor = ScanExecutor(scan_manager, stream_results=False)
+        executor.start("raster", x_start=0, x_end=999, y_start=0, y_end=999, step_size=1)
+        time.sleep(0.1)
+        t_start = time.perf_counter()
+        self.assertTrue(executor.stop(timeout=2))
+        self.assertLess(time.perf_counter() - t_start, 0.5)
+        self.assertFalse(executor.completed)
+        self.assertFalse(scan_manager.is_scanning)
+
+    def test_cannot_start_twice(self):
+        """
+        Test that a second scan cannot start while one is running.
+        """
+        scan_manager = ScanManager(motion_controller=SlowController(0.001))
+        executor = ScanExecutor(scan_manager, stream_results=False)
+        executor.start("grid", x_start=0, x_end=10, y_start=0, y_end=10, rows=100, cols=100)
+        with self.assertRaises(RuntimeError):
+            executor.start("circle", center_x=5, center_y=5, radius=1, num_points=10)
+        executor.stop(timeout=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
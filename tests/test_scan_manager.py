@@ -9,8 +9,10 @@ project_root = os.path.abspath(os.path.join(current_dir, "../"))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+import time
 import unittest
-from scan_engine.scan_manager import ScanManager  # Ensure this import is correct
+import numpy as np
+from scan_engine.scan_manager import LineTimingModel, ScanManager  # Ensure this import is correct
 
 from control.motion_controller import MotionController
 
@@ -34,5 +36,209 @@ class TestScanManager(unittest.TestCase):
         self.scan_manager.stop_scan()
         self.assertFalse(self.scan_manager.is_scanning)
 
+    def test_raster_scan_fills_buffer(self):
+        """
+        Test that a raster scan fills the scan buffer and reports 100% progress.
+        """
+        self.motion_controller.move_z(7.5)
+        progress = []
+        self.scan_manager.raster_scan(0, 2, 0, 1, 0.5, progress_callback=lambda p, **kw: progress.append(p))
+        image = self.scan_manager.scan_buffer.image("z")
+        self.assertEqual(image.shape, (3, 5))
+        np.testing.assert_array_equal(image, 7.5)
+        self.assertEqual(progress[-1], 100)
+        self.assertEqual(len(self.scan_manager.scan_data), 15)
+        self.assertEqual(self.scan_manager.scan_data[5], {"x": 2.0, "y": 0.5, "z": 7.5})
+
+    def test_trace_retrace_fills_both_images(self):
+        """
+        Test that trace/retrace scans fill separate forward and backward images in image order.
+        """
+        class SlopeController(MotionController):
+            def execute_line(self, xs, ys):
+                super().execute_line(xs, ys)
+                return 2.0 * np.asarray(xs)
+
+        scan_manager = ScanManager(motion_controller=SlopeController())
+        scan_manager.raster_scan(0, 3, 0, 2, 1, trace_retrace=True)
+        forward = scan_manager.scan_buffer.image("z", "forward")
+        backward = scan_manager.scan_buffer.image("z", "backward")
+        self.assertEqual(forward.shape, (3, 4))
+        np.testing.assert_array_equal(forward, backward)
+        np.testing.assert_array_equal(forward[0], [0, 2, 4, 6])
+        self.assertEqual(len(scan_manager.scan_data), 24)
+        self.scan_manager.raster_scan(0, 1, 0, 1, 1)
+        with self.assertRaises(ValueError):
+            self.scan_manager.scan_buffer.image("z", "backward")
+
+    def test_multi_channel_scan(self):
+        """
+        Test that declared channels are filled into the scan buffer in one pass.
+        """
+        self.motion_controller.move_z(4.0)
+        self.motion_controller.setpoint = 5.0
+        self.scan_manager.configure_channels({
+            "topography": None,
+            "error": None,
+            "current": lambda xs, ys, z: xs + ys,
+        })
+        self.scan_manager.grid_scan(0, 3, 0, 1, rows=2, cols=4)
+        buffer = self.scan_manager.scan_buffer
+        np.testing.assert_array_equal(buffer.image("topography"), 4.0)
+        np.testing.assert_array_equal(buffer.image("error"), 1.0)
+        np.testing.assert_array_equal(buffer.image("current")[1], [1, 2, 3, 4])
+        with self.assertRaises(ValueError):
+            self.scan_manager.configure_channels(["z"])
+
+    def test_adaptive_scan_refines_features(self):
+        """
+        Test that the adaptive scan spends its budget on a sparse feature.
+        """
+        class BumpController(MotionController):
+            def execute_line(self, xs, ys):
+                super().execute_line(xs, ys)
+                xs, ys = np.asarray(xs), np.asarray(ys)
+                return np.where((np.abs(xs - 20) < 3) & (np.abs(ys - 20) < 3), 5.0, 0.0)
+
+        scan_manager = ScanManager(motion_controller=BumpController())
+        image = scan_manager.adaptive_scan(0, 32, 0, 32, coarse_rows=9, coarse_cols=9, refinement=4, point_budget=300)
+        self.assertEqual(image.shape, (33, 33))
+        measured = scan_manager.scan_buffer.image("measured").astype(bool)
+        self.assertLessEqual(measured.sum(), 300)
+        self.assertGreater(measured.sum(), 81)
+        # The bump is measured at full resolution, the flat corner is only interpolated
+        self.assertTrue(measured[18:23, 18:23].all())
+        self.assertEqual(image[20, 20], 5.0)
+        self.assertFalse(measured[1:4, 1:4].any())
+        np.testing.assert_array_equal(image[0:8, 0:8], 0.0)
+
+    def test_iter_raster_lines(self):
+        """
+        Test that raster lines are yielded one by one while the scan runs.
+        """
+        lines = []
+        for line in self.scan_manager.iter_raster_lines(0, 3, 0, 2, 1):
+            # The next line has not been acquired yet
+            self.assertEqual(self.scan_manager.scan_buffer.lines_completed, line.index + 1)
+            lines.append((line.index, line.row, line.direction, len(line)))
+            self.assertLessEqual(line.t_start, line.t_end)
+        self.assertEqual(lines, [(0, 0, "forward", 4), (1, 1, "backward", 4), (2, 2, "forward", 4)])
+        self.assertFalse(self.scan_manager.is_scanning)
+
+    def test_iter_raster_lines_stops_when_closed(self):
+        """
+        Test that abandoning the generator stops the scan.
+        """
+        lines = self.scan_manager.iter_raster_lines(0, 3, 0, 9, 1)
+        first = next(lines)
+        np.testing.assert_array_equal(first.x, [0, 1, 2, 3])
+        lines.close()
+        self.assertFalse(self.scan_manager.is_scanning)
+        self.assertEqual(self.scan_manager.scan_buffer.lines_completed, 1)
+
+    def test_point_by_point_fallback(self):
+        """
+        Test controllers without execute_line are driven point by point.
+        """
+        class PointController:
+            def __init__(self):
+                self.moves = []
+
+            def get_z_position(self):
+                return 1.0
+
+            def move(self, x, y, z):
+                self.moves.append((x, y, z))
+
+        controller = PointController()
+        scan_manager = ScanManager(motion_controller=controller)
+        scan_manager.circular_scan(0, 0, 1, 8)
+        self.assertEqual(len(controller.moves), 8)
+        self.assertEqual(scan_manager.scan_buffer.image("z").shape, (1, 8))
+
+    def test_point_scan_returns_values_in_input_order(self):
+        """
+        Test that a point scan reorders the sites but returns Z in the given order.
+        """
+        class HeightController:
+            def execute_line(self, xs, ys):
+                return xs + 1000 * ys
+
+        points = np.random.default_rng(2).random((500, 2)) * 10
+        scan_manager = ScanManager(motion_controller=HeightController())
+        z_values = scan_manager.point_scan(points)
+        np.testing.assert_allclose(z_values, points[:, 0] + 1000 * points[:, 1])
+        self.assertFalse(np.array_equal(scan_manager.trajectory.points, points))
+    def test_chunks_separate_call_overhead_from_point_cost(self):
+        """
+        Test that a fixed cost per call keeps lines whole, and a cost per point splits them.
+        """
+        overhead_only = LineTimingModel()
+        overhead_only.record(16, 0.06)
+        overhead_only.record(13, 0.06)
+        self.assertEqual(overhead_only.chunk_points(100, 0.05), 100)
+
+        per_point = LineTimingModel()
+        per_point.record(16, 0.016)
+        per_point.record(50, 0.050)
+        self.assertEqual(per_point.chunk_points(1000, 0.02), 20)
+        self.assertEqual(per_point.chunk_points(10, 0.02), 10)
+
+        mixed = LineTimingModel()
+        for points in (16, 40, 100):
+            mixed.record(points, 0.03 + 0.001 * points)
+        overhead, cost = mixed.fit()
+        self.assertAlmostEqual(overhead, 0.03)
+        self.assertAlmostEqual(cost, 0.001)
+        self.assertEqual(mixed.chunk_points(1000, 0.05), 30)  # The overhead never dominates
+
+    def test_line_overhead_does_not_split_lines(self):
+        """
+        Test that a controller with a fixed time per call gets whole lines after the first probes.
+        """
+        class LatencyController:
+            def __init__(self):
+                self.calls = []
+
+            def execute_line(self, xs, ys):
+                self.calls.append(len(xs))
+                time.sleep(0.01)
+                return np.zeros(len(xs))
+
+        controller = LatencyController()
+        scan_manager = ScanManager(motion_controller=controller)
+        scan_manager.abort_latency = 0.005
+        scan_manager.raster_scan(0, 99, 0, 9, 1)
+        self.assertLessEqual(len(controller.calls), 14)
+        self.assertEqual(controller.calls[-5:], [100] * 5)
+
+
+    def test_progress_within_a_line(self):
+        """
+        Test that a single-line scan reports progress and logged points per chunk.
+        """
+        class SlowController:
+            def execute_line(self, xs, ys):
+                time.sleep(0.0002 * len(xs))
+                return np.asarray(xs, dtype=np.float64)
+
+        scan_manager = ScanManager(motion_controller=SlowController())
+        scan_manager.abort_latency = 0.01
+        scan_manager.progress_rate = 1e6
+        scan_manager.log_interval = 0.0
+        progress, blocks = [], []
+        trajectory = scan_manager.trajectory_planner.plan("grid", x_start=0, x_end=1, y_start=0, y_end=0,
+                                                          rows=1, cols=500)
+        self.assertEqual(trajectory.num_lines, 1)
+        self.assertTrue(scan_manager.run_trajectory(
+            trajectory, lambda percent, current_position: progress.append(percent), blocks.append
+        ))
+        self.assertGreater(len([percent for percent in progress if 0 < percent < 100]), 5)
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(progress[-1], 100)
+        self.assertGreater(len(blocks), 5)
+        np.testing.assert_array_equal(np.concatenate(blocks)[:, 2], trajectory.points[:, 0])
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
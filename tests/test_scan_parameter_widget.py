@@ -0,0 +1,57 @@
+# File: tests/test_scan_parameter_widget.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+from hardware.stepper_motor import StepperMotor
+
+try:
+    from PyQt5.QtWidgets import QApplication
+    from gui.widgets.scan_parameter_widget import ScanParameterWidget
+except ImportError:
+    QApplication = None
+
+
+@unittest.skipIf(QApplication is None, "PyQt5 is not installed")
+class TestScanParameterWidget(unittest.TestCase):
+    """
+    Unit tests for the scan estimate of the ScanParameterWidget.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def fill(self, widget):
+        widget.scan_range_width_input.setText("10")
+        widget.scan_range_height_input.setText("10")
+        widget.step_size_input.setText("1")
+
+    def test_estimate_disabled_without_controller(self):
+        """
+        Test that no duration is shown before a controller or estimator is set.
+        """
+        widget = ScanParameterWidget()
+        self.fill(widget)
+        self.assertEqual(widget.estimate_label.text(), "Estimate: -")
+        self.assertFalse(widget.estimate_label.isEnabled())
+
+    def test_estimate_from_controller(self):
+        """
+        Test a non-zero duration from the motion model of the connected controller.
+        """
+        widget = ScanParameterWidget(controller=StepperMotor())
+        self.fill(widget)
+        self.assertTrue(widget.estimate_label.isEnabled())
+        self.assertTrue(widget.estimate_label.text().startswith("Estimate: 121 points, 0:00:01, "))  # 1.2 s of travel
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+# File: tests/test_scan_scheduler.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import json
+import tempfile
+import unittest
+import numpy as np
+from control.mode_switcher import ModeSwitcher
+from control.motion_controller import MotionController
+from scan_engine.scan_manager import ScanManager
+from scan_engine.scan_scheduler import ScanJob, ScanScheduler
+
+
+class TestScanScheduler(unittest.TestCase):
+    """
+    Unit tests for the ScanScheduler class.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.scan_manager = ScanManager(MotionController())
+        self.mode_switcher = ModeSwitcher()
+        self.scheduler = ScanScheduler(self.scan_manager, self.directory.name, self.mode_switcher)
+
+    def tearDown(self):
+        self.scheduler.shutdown(timeout=5)
+        self.directory.cleanup()
+
+    def test_jobs_run_by_priority(self):
+        """
+        Test that queued jobs run back to back, highest priority first, and write output files.
+        """
+        started = []
+        self.scheduler.add_listener(
+            lambda version, job: job and job["state"] == ScanJob.RUNNING and job["name"] not in started
+            and started.append(job["name"])
+        )
+        self.scheduler.submit_all([
+            ScanJob("raster", (0, 4, 0, 3), 1, name="low"),
+            ScanJob("grid", (0, 1, 0, 1), (3, 3), mode="noncontact", priority=5, name="high"),
+            ScanJob("spiral", (5, 5, 2), 0.5, name="also_low"),
+        ])
+        self.scheduler.start()
+        self.assertTrue(self.scheduler.wait_until_idle(timeout=10))
+
+        self.assertEqual(started, ["high", "low", "also_low"])
+        self.assertEqual(self.mode_switcher.current_mode, "noncontact")
+        finished = self.scheduler.snapshot()["finished"]
+        self.assertEqual({job["state"] for job in finished}, {ScanJob.COMPLETED})
+        with np.load(finished[0]["output_path"]) as output:
+            self.assertEqual(output["z"].shape, (3, 3))
+            self.assertEqual(json.loads(str(output["metadata"]))["parameters"]["rows"], 3)
+
+    def test_pause_and_resume_running_job(self):
+        """
+        Test that a paused job is continued from its checkpoint.
+        """
+        def pause_on_row_two(xs, ys, z):
+            if ys[0] == 2 and not paused:
+                paused.append(True)
+                self.scheduler.pause()
+            return xs + 10 * ys
+
+        paused = []
+        job = ScanJob("raster", (0, 4, 0, 3), 1, channels={"height": pause_on_row_two})
+        self.scheduler.submit(job)
+        self.scheduler.start()
+        snapshot = self.scheduler.wait_for_change(0, timeout=5)
+        while snapshot["queued"] == [] or snapshot["queued"][0]["state"] != ScanJob.PAUSED:
+            snapshot = self.scheduler.wait_for_change(snapshot["version"], timeout=5)
+        self.assertTrue(os.path.exists(job.checkpoint_path))
+
+        self.scheduler.resume()
+        self.assertTrue(self.scheduler.wait_until_idle(timeout=10))
+        self.assertEqual(job.state, ScanJob.COMPLETED)
+        with np.load(job.output_path) as output:
+            xs, ys = np.meshgrid(np.arange(5.0), np.arange(4.0))
+            np.testing.assert_array_equal(output["height"], xs + 10 * ys)
+
+    def test_job_channels_do_not_outlive_the_job(self):
+        """
+        Test that the channels of a job are not inherited by the next job.
+        """
+        first = ScanJob("raster", (0, 2, 0, 1), 1, priority=1, channels={"height": lambda xs, ys, z: xs + 10 * ys})
+        second = self.scheduler.submit_all([first, ScanJob("raster", (0, 2, 0, 1), 1)])[1]
+        self.scheduler.start()
+        self.assertTrue(self.scheduler.wait_until_idle(timeout=5))
+        self.assertEqual(self.scan_manager.channels, {})
+        with np.load(first.output_path) as output:
+            self.assertIn("height", output.files)
+        with np.load(second.output_path) as output:
+            self.assertNotIn("height", output.files)
+
+    def test_cancel_paused_job_deletes_checkpoint(self):
+        """
+        Test that cancelling a paused job deletes its checkpoint.
+        """
+        def pause_on_row_two(xs, ys, z):
+            if ys[0] == 2:
+                self.scheduler.pause()
+            return xs
+
+        job = self.scheduler.submit(ScanJob("raster", (0, 4, 0, 3), 1, channels={"height": pause_on_row_two}))
+        self.scheduler.start()
+        snapshot = self.scheduler.wait_for_change(0, timeout=5)
+        while snapshot["queued"] == [] or snapshot["queued"][0]["state"] != ScanJob.PAUSED:
+            snapshot = self.scheduler.wait_for_change(snapshot["version"], timeout=5)
+        checkpoint_path = job.checkpoint_path
+        self.assertTrue(os.path.exists(checkpoint_path))
+        self.scheduler.cancel(job.id)
+        self.assertEqual(job.state, ScanJob.CANCELLED)
+        self.assertFalse(os.path.exists(checkpoint_path))
+        self.assertIsNone(job.checkpoint_path)
+
+    def test_cancel_queued_job(self):
+        """
+        Test that a cancelled job is skipped.
+        """
+        self.scheduler.pause()
+        job = self.scheduler.submit(ScanJob("circle", (5, 5, 1), 8))
+        self.scheduler.cancel(job.id)
+        self.scheduler.resume()
+        self.scheduler.start()
+        self.assertTrue(self.scheduler.wait_until_idle(timeout=5))
+        self.assertEqual(job.state, ScanJob.CANCELLED)
+        self.assertIsNone(job.output_path)
+
+    def test_failed_job(self):
+        """
+        Test that a failing job is reported and the queue continues.
+        """
+        failing = self.scheduler.submit(ScanJob("raster", (0, 1, 0, 1), 1, mode="invalid_mode", priority=1))
+        following = self.scheduler.submit(ScanJob("raster", (0, 1, 0, 1), 1))
+        self.scheduler.start()
+        self.assertTrue(self.scheduler.wait_until_idle(timeout=5))
+        self.assertEqual(failing.state, ScanJob.FAILED)
+        self.assertIn("invalid_mode", failing.error)
+        self.assertEqual(following.state, ScanJob.COMPLETED)
+
+    def test_wait_for_change_timeout(self):
+        """
+        Test that wait_for_change returns None when nothing changes.
+        """
+        version = self.scheduler.snapshot()["version"]
+        self.assertIsNone(self.scheduler.wait_for_change(version, timeout=0.05))
+
+    def test_invalid_job_area(self):
+        """
+        Test creating a job with an area that does not fit its pattern.
+        """
+        with self.assertRaises(ValueError):
+            ScanJob("spiral", (0, 1, 0, 1), 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+# File: tests/test_stm.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import time
+import unittest
+import numpy as np
+from simulation.stm import STMSimulation, TunnelingModel
+from simulation.surface import Surface
+
+
+class TestTunnelingModel(unittest.TestCase):
+    """
+    Unit tests for the TunnelingModel and the STMSimulation built on it.
+    """
+
+    def setUp(self):
+        self.model = TunnelingModel(bias_voltage=0.1, work_function=4.5, setpoint_current=1.0)
+
+    def test_current_decays_one_decade_per_angstrom(self):
+        """
+        Test the exponential distance dependence for a typical metal work function.
+        """
+        ratio = self.model.current(0.6) / self.model.current(0.5)
+        self.assertAlmostEqual(ratio, np.exp(-2 * self.model.kappa * 0.1))
+        self.assertTrue(0.1 < ratio < 0.13)
+        self.assertAlmostEqual(float(self.model.current(self.model.setpoint_gap)), 1.0)
+
+    def test_flat_surface(self):
+        """
+        Test both modes over a flat terrace, with and without a blunt tip.
+        """
+        heights = np.full((40, 50), 2.0)
+        for tip_radius in (0.0, 1.0):
+            with self.subTest(tip_radius=tip_radius):
+                model = TunnelingModel(tip_radius=tip_radius, pixel_size=(0.02, 0.02))
+                np.testing.assert_allclose(model.constant_current(heights), 2.0 + model.setpoint_gap, rtol=1e-6)
+                np.testing.assert_allclose(model.constant_height(heights, 2.5), model.current(0.5), rtol=1e-5)
+
+    def test_blunt_tip_matches_direct_sum(self):
+        """
+        Test the effective heights of a blunt tip against a direct sum over the apex.
+        """
+        rng = np.random.default_rng(1)
+        heights = rng.random((48, 48)) * 0.1
+        pixel = 0.01
+        for tip_radius in (0.005, 0.02, 0.3):
+            with self.subTest(tip_radius=tip_radius):
+                model = TunnelingModel(tip_radius=tip_radius, pixel_size=(pixel, pixel))
+                effective = model.effective_heights(heights)
+                # The apex at pixel (24, 24) weights the surface by exp(-2 kappa r^2 / 2R)
+                y, x = (np.mgrid[0:48, 0:48] - 24) * pixel
+                weights = np.exp(-model.kappa * (x * x + y * y) / tip_radius + 2 * model.kappa * heights)
+                reference = np.log(weights.sum() / np.exp(-model.kappa * (x * x + y * y) / tip_radius).sum())
+                self.assertAlmostEqual(effective[24, 24], reference / (2 * model.kappa), delta=2e-3)
+
+    def test_blunt_tip_broadens_features(self):
+        """
+        Test that a blunt tip images an adatom wider and lower than a sharp tip.
+        """
+        heights = np.zeros((64, 64))
+        heights[32, 32] = 0.2
+        sharp = TunnelingModel(pixel_size=(0.05, 0.05)).constant_current(heights)
+        blunt = TunnelingModel(tip_radius=2.0, pixel_size=(0.05, 0.05)).constant_current(heights)
+        base = TunnelingModel().setpoint_gap
+        self.assertEqual(int((sharp > base + 0.01).sum()), 1)
+        self.assertGreater(int((blunt > base + 0.01).sum()), 1)
+        self.assertLess(blunt.max(), sharp.max())
+
+    def test_deep_step_is_computed_in_double_precision(self):
+        """
+        Test that a 10 nm step does not clamp the lower terrace.
+        """
+        heights = np.zeros((32, 64))
+        heights[:, 32:] = 10.0
+        model = TunnelingModel(tip_radius=0.5, pixel_size=(0.05, 0.05))
+        topography = model.constant_current(heights) - model.setpoint_gap
+        np.testing.assert_allclose(topography[:, :20], 0.0, atol=1e-6)
+        np.testing.assert_allclose(topography[:, 44:], 10.0, atol=1e-6)
+
+    def test_large_map_stays_in_single_precision(self):
+        """
+        Test that a 4096 x 4096 single precision map is blurred in well under a second
+        for tip radii from 1 to 100 nm, and keeps its type.
+        """
+        heights = np.random.default_rng(2).random((4096, 4096), dtype=np.float32) * 0.5
+        for tip_radius in (1.0, 100.0):
+            with self.subTest(tip_radius=tip_radius):
+                model = TunnelingModel(tip_radius=tip_radius, pixel_size=(0.05, 0.05))
+                start = time.perf_counter()
+                effective = model.effective_heights(heights)
+                self.assertLess(time.perf_counter() - start, 1.0)
+                self.assertEqual(effective.dtype, np.float32)
+                self.assertTrue(np.all(effective <= heights.max() + 1e-6))
+
+    def test_simulation_modes(self):
+        """
+        Test the STMSimulation in both modes on a Surface.
+        """
+        surface = Surface()
+        surface.generate_sine_wave_surface(0.1, 2, 128)
+        simulation = STMSimulation(surface)
+        simulation.configure_parameters({"resolution": 64, "scan_area": (2.0, 2.0), "bias_voltage": 0.5})
+        topography = simulation.generate_synthetic_data()
+        self.assertEqual(topography.shape, (64, 64))
+        self.assertAlmostEqual(float(np.ptp(topography)), float(np.ptp(surface.get_height_data())), delta=0.02)
+
+        simulation.configure_parameters({"resolution": 64, "scan_area": (2.0, 2.0), "mode": "constant_height", "gap": 0.4})
+        simulation.run_simulation()
+        current = simulation.generate_synthetic_data()
+        self.assertTrue(np.all(current > 0))
+        self.assertAlmostEqual(float(current.max()), float(TunnelingModel().current(0.4)), places=6)
+
+        simulation.configure_parameters({"mode": "spectroscopy"})
+        with self.assertRaises(ValueError):
+            simulation.run_simulation()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+# File: tests/test_surface.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from simulation import surface as surface_module
+from simulation.surface import LATTICES, Surface
+
+
+def radial_spectrum(heights):
+    """
+    Radially averaged power spectrum of a square height map, by integer wavenumber.
+    """
+    power = np.abs(np.fft.fft2(heights.astype(np.float64))) ** 2
+    frequencies = np.fft.fftfreq(heights.shape[0]) * heights.shape[0]
+    radius = np.hypot(*np.meshgrid(frequencies, frequencies)).round().astype(int)
+    return np.bincount(radius.ravel(), power.ravel()) / np.bincount(radius.ravel())
+
+
+class TestFractalSurface(unittest.TestCase):
+    """
+    Unit tests for the spectral synthesis of fractal surfaces.
+    """
+
+    def setUp(self):
+        self.surface = Surface()
+
+    def test_rms_mean_and_seed(self):
+        """
+        Test the target RMS, the zero mean, the output type and reproducibility.
+        """
+        self.surface.generate_fractal_surface(256, hurst=0.6, correlation_length=8.0, rms=2.5, seed=7)
+        heights = self.surface.get_height_data()
+        self.assertEqual((heights.shape, heights.dtype), ((256, 256), np.float32))
+        self.assertAlmostEqual(float(heights.std()), 2.5, places=3)
+        self.assertAlmostEqual(float(heights.mean()), 0.0, places=4)
+
+        other = Surface()
+        other.generate_fractal_surface(256, hurst=0.6, correlation_length=8.0, rms=2.5, seed=7)
+        np.testing.assert_array_equal(other.get_height_data(), heights)
+        other.generate_fractal_surface(256, hurst=0.6, correlation_length=8.0, rms=2.5, seed=8)
+        self.assertFalse(np.allclose(other.get_height_data(), heights))
+
+    def test_spectrum_follows_hurst_exponent(self):
+        """
+        Test the power-law slope -2 (1 + H) of a self-affine surface, and the flat
+        spectrum below the inverse correlation length.
+        """
+        for hurst in (0.3, 0.8):
+            with self.subTest(hurst=hurst):
+                self.surface.generate_fractal_surface(512, hurst=hurst, seed=1)
+                spectrum = radial_spectrum(self.surface.get_height_data())
+                wavenumbers = np.arange(4, 200)
+                slope = np.polyfit(np.log(wavenumbers), np.log(spectrum[wavenumbers]), 1)[0]
+                self.assertAlmostEqual(slope, -2 * (1 + hurst), delta=0.15)
+
+        # C(q) is nearly flat up to wavenumber 512 / (2 pi 4) = 20: between wavenumbers
+        # of about 5 and 35 it drops by a factor of about 7, a power law would drop 343 times
+        self.surface.generate_fractal_surface(512, hurst=0.5, correlation_length=4.0, seed=1)
+        spectrum = radial_spectrum(self.surface.get_height_data())
+        self.assertTrue(4.0 < spectrum[2:8].mean() / spectrum[30:40].mean() < 15.0)
+
+    def test_memmap_backing(self):
+        """
+        Test that the heights can live in a memory-mapped file, and that the result does
+        not depend on the block size of the FFTs.
+        """
+        self.surface.generate_fractal_surface(96, hurst=0.7, correlation_length=5.0, seed=3)
+        in_memory = np.array(self.surface.get_height_data())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "surface.dat")
+            with mock.patch.object(surface_module, "FFT_CHUNK_BYTES", 4096):
+                self.surface.generate_fractal_surface(96, hurst=0.7, correlation_length=5.0, seed=3, memmap_path=path)
+            heights = self.surface.get_height_data()
+            self.assertIsInstance(heights, np.memmap)
+            np.testing.assert_allclose(heights, in_memory, rtol=1e-5, atol=1e-5)
+            self.assertEqual(os.listdir(directory), ["surface.dat"])
+            np.testing.assert_array_equal(np.memmap(path, dtype=np.float32, mode="r", shape=(96, 96)), heights)
+            del heights
+            self.surface.reset_surface()
+
+    def test_invalid_parameters(self):
+        """
+        Test the parameter checks.
+        """
+        for parameters in ({"hurst": 1.2}, {"correlation_length": 0.0}, {"rms": -1.0}, {"pixel_size": 0.0}):
+            with self.subTest(**parameters):
+                with self.assertRaises(ValueError):
+                    self.surface.generate_fractal_surface(64, **parameters)
+
+
+class TestLatticeSurface(unittest.TestCase):
+    """
+    Unit tests for the crystalline lattice generator.
+    """
+
+    def setUp(self):
+        self.surface = Surface()
+
+    def direct_sum(self, lattice, size, pixel_size, corrugation=0.05):
+        """
+        Reference heights: a Gaussian for every atom near the field, from lattice_info.
+        """
+        definition = LATTICES[lattice]
+        cell = self.surface.lattice_info["cell_vectors"]
+        sigma = definition["lattice_constant"] / 5
+        y, x = np.mgrid[0:size, 0:size] * pixel_size
+        heights = np.zeros_like(x)
+        extent = size * pixel_size
+        cells = int(np.ceil(2 * extent / np.linalg.norm(cell, axis=0).min())) + 2
+        for i, j, height in definition["atoms"]:
+            fractions = np.stack(np.meshgrid(np.arange(-cells, cells + 1), np.arange(-cells, cells + 1)), axis=-1)
+            positions = (fractions.reshape(-1, 2) + np.array([i, j]) / definition["period"]) @ cell.T
+            near = np.all((positions > -1.0) & (positions < extent + 1.0), axis=1)
+            width = 2.5 * sigma if height < 0 else sigma
+            for px, py in positions[near]:
+                heights += corrugation * height * np.exp(-((x - px) ** 2 + (y - py) ** 2) / (2 * width ** 2))
+        return heights
+
+    def test_lattices_match_direct_sum(self):
+        """
+        Test every lattice, rotated, against a sum over its atoms.
+        """
+        for lattice in LATTICES:
+            with self.subTest(lattice=lattice):
+                self.surface.generate_lattice_surface(150, lattice, pixel_size=0.02, angle=17.0, dtype=np.float64)
+                heights = self.surface.get_height_data()
+                self.assertEqual(heights.shape, (150, 150))
+                np.testing.assert_allclose(heights, self.direct_sum(lattice, 150, 0.02), atol=1.5e-3)
+                self.assertEqual(self.surface.pixel_size, 0.02)
+
+    def test_vacancies_and_adsorbates(self):
+        """
+        Test that vacancies remove atoms and adsorbates add bumps at the recorded positions.
+        """
+        parameters = {"pixel_size": 0.02, "vacancy_fraction": 0.05, "adsorbate_density": 0.5, "seed": 4}
+        self.surface.generate_lattice_surface(300, "square", **parameters)
+        heights = self.surface.get_height_data()
+        vacancies = self.surface.lattice_info["vacancies"]
+        adsorbates = self.surface.lattice_info["adsorbates"]
+        sites = (6.0 / 0.3) ** 2
+        self.assertTrue(0.02 * sites < len(vacancies) < 0.09 * sites)
+        self.assertTrue(5 <= len(adsorbates) <= 35)
+        clean = [v for v in vacancies if np.min(np.hypot(*(adsorbates - v).T), initial=np.inf) > 1.0]
+        for x, y in clean:
+            self.assertLess(heights[int(round(y / 0.02)), int(round(x / 0.02))], 0.01)
+        for x, y in adsorbates:
+            self.assertGreater(heights[int(round(y / 0.02)), int(round(x / 0.02))], 0.19)
+
+        other = Surface()
+        other.generate_lattice_surface(300, "square", **parameters)
+        np.testing.assert_array_equal(other.get_height_data(), heights)
+
+    def test_gaussians_match_dense_sum(self):
+        """
+        Test that scattered and sliced bumps, in small chunks, match a dense sum over the map.
+        """
+        rng = np.random.default_rng(2)
+        positions = rng.random((60, 2)) * [2.0, 1.6] - 0.1  # Some bumps hang over the edges
+        amplitudes = rng.standard_normal(60)
+        rows, columns = np.mgrid[0:80, 0:100]
+        for sigma in (0.04, 0.2):  # 13 and 61 pixels across
+            with self.subTest(sigma=sigma):
+                reach = np.ceil(3 * sigma / 0.02)
+                expected = np.zeros((80, 100))
+                for (px, py), amplitude in zip(positions, amplitudes):
+                    window = ((np.abs(columns - np.rint(px / 0.02)) <= reach)
+                              & (np.abs(rows - np.rint(py / 0.02)) <= reach))
+                    distance = (columns * 0.02 - px) ** 2 + (rows * 0.02 - py) ** 2
+                    expected += np.where(window, amplitude * np.exp(-distance / (2 * sigma ** 2)), 0.0)
+                heights = np.zeros((80, 100))
+                with mock.patch.object(surface_module, "SPLAT_CHUNK_PIXELS", 2000):
+                    Surface._add_gaussians(heights, positions, amplitudes, sigma, 0.02)
+                np.testing.assert_allclose(heights, expected, atol=1e-12)
+
+    def test_monatomic_steps(self):
+        """
+        Test terraces one monatomic step apart, with edges along the requested direction.
+        """
+        self.surface.generate_lattice_surface(400, "hexagonal", pixel_size=0.05, terrace_width=5.0, step_angle=90.0)
+        profile = self.surface.get_height_data().mean(axis=0)  # Edges run along y
+        terraces = profile[::100] - profile[0]
+        np.testing.assert_allclose(terraces, [0.0, -0.335, -0.67, -1.005], atol=0.01)
+
+    def test_invalid_parameters(self):
+        """
+        Test the parameter checks.
+        """
+        for parameters in ({"lattice": "fcc"}, {"pixel_size": 0.0}, {"vacancy_fraction": 2.0},
+                           {"terrace_width": -1.0}):
+            with self.subTest(**parameters):
+                with self.assertRaises(ValueError):
+                    self.surface.generate_lattice_surface(32, **parameters)
+
+
+if __name__ == "__main__":
+    unittest.main()
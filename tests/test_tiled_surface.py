@@ -0,0 +1,97 @@
+# File: tests/test_tiled_surface.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+import numpy as np
+from simulation.tiled_surface import PlaneWaveRoughness, TiledSurface
+
+
+def ramp(x, y):
+    """Height function whose value encodes the pixel position."""
+    return np.add.outer(1000.0 * y, x)
+
+
+class TestTiledSurface(unittest.TestCase):
+    """
+    Unit tests for the TiledSurface and its tile cache.
+    """
+
+    def setUp(self):
+        self.surface = TiledSurface(ramp, size=(10.0, 7.0), pixel_size=0.5, tile_size=4, max_bytes=1024)
+
+    def test_window_across_tiles(self):
+        """
+        Test that windows spanning several tiles, and the truncated edge tiles, match
+        the height function.
+        """
+        self.assertEqual(self.surface.shape, (14, 20))
+        x, y = np.arange(20) * 0.5, np.arange(14) * 0.5
+        np.testing.assert_array_equal(self.surface.window(1.0, 7.5, 0.5, 4.0), ramp(x[2:16], y[1:9]))
+        np.testing.assert_array_equal(self.surface.window(-5.0, 50.0, 5.5, 9.0), ramp(x, y[11:]))
+        self.assertEqual(self.surface.window(3.1, 3.3, 0.0, 1.0).shape, (3, 0))
+
+    def test_lru_cache_within_budget(self):
+        """
+        Test that tiles are computed once, kept read-only and evicted least recently used first.
+        """
+        tile_bytes = 4 * 4 * 4
+        surface = TiledSurface(ramp, size=(10.0, 7.0), pixel_size=0.5, tile_size=4, max_bytes=3 * tile_bytes)
+        first = surface.tile(0, 0)
+        self.assertIs(surface.tile(0, 0), first)
+        self.assertFalse(first.flags.writeable)
+        surface.tile(0, 1)
+        surface.tile(0, 2)
+        surface.tile(0, 0)  # Now (0, 1) is used least recently
+        surface.tile(1, 0)
+        self.assertEqual(len(surface.cache), 3)
+        self.assertNotIn((0, 1), surface.cache)
+        self.assertIn((0, 0), surface.cache)
+        self.assertLessEqual(surface.cache.nbytes, surface.cache.max_bytes)
+        self.assertEqual((surface.cache.hits, surface.cache.misses), (2, 4))
+        surface.reset_surface()
+        self.assertEqual((len(surface.cache), surface.cache.nbytes), (0, 0))
+
+    def test_sample_computes_visited_tiles_only(self):
+        """
+        Test nearest-pixel sampling of scattered points and that only their tiles are built.
+        """
+        x = np.array([[0.1, 1.2], [9.9, 2.6]])
+        y = np.array([[0.2, 0.4], [6.9, 0.6]])
+        heights = self.surface.sample(x, y)
+        self.assertEqual(heights.shape, (2, 2))
+        np.testing.assert_array_equal(heights, [[0.0, 501.0], [6509.5, 502.5]])  # Clipped to the last pixel
+        self.assertEqual(sorted(self.surface.cache.keys()), [(0, 0), (0, 1), (3, 4)])
+
+    def test_never_materialized(self):
+        """
+        Test that the full array is not available and that bad height functions are rejected.
+        """
+        with self.assertRaises(RuntimeError):
+            self.surface.get_height_data()
+        with self.assertRaises(ValueError):
+            TiledSurface(lambda x, y: np.zeros(3), size=(4.0, 4.0), pixel_size=1.0).tile(0, 0)
+        with self.assertRaises(ValueError):
+            self.surface.tile(10, 0)
+
+    def test_plane_wave_roughness(self):
+        """
+        Test the RMS of the procedural roughness and that tiles join seamlessly.
+        """
+        roughness = PlaneWaveRoughness(hurst=0.7, rms=2.0, wavelengths=(0.5, 20.0), seed=3)
+        surface = TiledSurface(roughness, size=(40.0, 40.0), pixel_size=0.1, tile_size=64)
+        heights = surface.window(0.0, 40.0, 0.0, 40.0)
+        self.assertAlmostEqual(float(heights.std()), 2.0, delta=0.4)
+        coordinates = np.arange(400) * 0.1
+        np.testing.assert_allclose(heights, roughness(coordinates, coordinates), atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
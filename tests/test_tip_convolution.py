@@ -0,0 +1,117 @@
+# File: tests/test_tip_convolution.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+import numpy as np
+from simulation.surface import Surface
+from simulation.tip_convolution import TipConvolution
+
+
+def direct_dilation(heights, tip):
+    """
+    Reference dilation with one pass per tip pixel, the apex at the lowest pixel.
+    """
+    apex = np.unravel_index(np.argmin(tip), tip.shape)
+    rows, cols = heights.shape
+    image = np.full(heights.shape, -np.inf)
+    for i, j in zip(*np.nonzero(np.isfinite(tip))):
+        dr, dc = i - apex[0], j - apex[1]
+        r0, r1, c0, c1 = max(0, -dr), min(rows, rows - dr), max(0, -dc), min(cols, cols - dc)
+        shifted = heights[r0 + dr:r1 + dr, c0 + dc:c1 + dc] - (tip[i, j] - tip[apex])
+        image[r0:r1, c0:c1] = np.maximum(image[r0:r1, c0:c1], shifted)
+    return image
+
+
+class TestTipConvolution(unittest.TestCase):
+    """
+    Unit tests for the TipConvolution.
+    """
+
+    def setUp(self):
+        self.heights = np.random.default_rng(3).random((50, 60)) * 2.0
+        self.convolution = TipConvolution(pixel_size=(0.5, 0.5), dtype=np.float64, block_shape=(7, 9))
+
+    def test_custom_tips_match_direct_dilation(self):
+        """
+        Test arbitrary, separable and partial tips against a pass per tip pixel.
+        """
+        rng = np.random.default_rng(4)
+        separable = np.add.outer(rng.random(7), rng.random(11))
+        partial = self.convolution.tip_array("parabolic", 15, radius=2.0)
+        partial[partial > 6.0] = np.nan
+        # Columns with flat and sloped runs, longer than the tiles
+        y, x = np.mgrid[-12:13, -12:13]
+        pyramid = 0.4 * np.maximum(np.abs(x), np.abs(y) + 0.5 * y)
+        disc = np.where(np.hypot(x, y) <= 10, 0.0, np.nan)
+        for name, tip in (("asymmetric", rng.random((9, 5)) * 3), ("separable", separable), ("partial", partial),
+                          ("pyramid", pyramid), ("disc", disc)):
+            with self.subTest(tip=name):
+                expected = direct_dilation(self.heights, np.where(np.isnan(tip), np.inf, tip))
+                np.testing.assert_allclose(self.convolution.custom(self.heights, tip), expected, atol=1e-12)
+
+    def test_custom_tip_tolerance(self):
+        """
+        Test that a cone split into runs with a tolerance stays within it of the exact image.
+        """
+        tip = self.convolution.tip_array("conical", 31, half_angle=60)
+        expected = direct_dilation(self.heights, tip)
+        np.testing.assert_allclose(self.convolution.custom(self.heights, tip), expected, atol=1e-12)
+        image = self.convolution.custom(self.heights, tip, tolerance=0.05)
+        self.assertLessEqual(np.max(np.abs(image - expected)), 0.05)
+        with self.assertRaises(ValueError):
+            self.convolution.custom(self.heights, tip, tolerance=-1.0)
+
+    def test_parabolic_tip_is_separable(self):
+        """
+        Test the separable paraboloid against the sampled paraboloid as a custom tip.
+        """
+        tip = self.convolution.tip_array("parabolic", 61, radius=4.0)
+        image = self.convolution.apply(self.heights, "parabolic", radius=4.0)
+        np.testing.assert_allclose(image, direct_dilation(self.heights, tip), atol=1e-12)
+        self.assertTrue(np.all(image >= self.heights))
+
+    def test_spike_images_the_tip(self):
+        """
+        Test that a spike on a flat surface is imaged as the inverted tip, and that the
+        octagonal cone with a rounded apex stays within 4% of the circular one.
+        """
+        heights = np.zeros((101, 101))
+        heights[50, 50] = 20.0
+        convolution = TipConvolution(pixel_size=(1.0, 1.0), dtype=np.float64)
+        tip = convolution.tip_array("conical", 101, half_angle=30, apex_radius=5.0)
+        expected = np.maximum(20.0 - tip, 0.0)
+        image = convolution.conical(heights, 30, apex_radius=5.0)
+        self.assertAlmostEqual(image[50, 50], 20.0)
+        np.testing.assert_allclose(image[50, 47:54], expected[50, 47:54], atol=1e-12)  # Rounded apex
+        flanks = (tip > 3.0) & (tip < 19.0)
+        ratios = (20.0 - image[flanks]) / tip[flanks]
+        self.assertTrue(np.all(np.abs(ratios - 1.0) < 0.04))
+
+    def test_surface_input_and_errors(self):
+        """
+        Test dilation of a Surface, a flat surface and invalid arguments.
+        """
+        surface = Surface()
+        surface.generate_sine_wave_surface(1.0, 2, 64)
+        image = TipConvolution(pixel_size=(0.1, 0.1)).apply(surface, "conical", half_angle=20)
+        self.assertEqual(image.dtype, np.float32)
+        self.assertTrue(np.all(image >= surface.get_height_data() - 1e-6))
+        np.testing.assert_array_equal(self.convolution.parabolic(np.ones((8, 8)), 1.0), 1.0)
+        with self.assertRaises(ValueError):
+            self.convolution.apply(self.heights, "spherical")
+        with self.assertRaises(ValueError):
+            self.convolution.conical(self.heights, 90)
+        with self.assertRaises(ValueError):
+            self.convolution.custom(self.heights, np.full((3, 3), np.nan))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# File: tests/test_trajectory.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import math
+import unittest
+import numpy as np
+from scan_engine.trajectory import TrajectoryPlanner
+
+
+class TestTrajectoryPlanner(unittest.TestCase):
+    """
+    Unit tests for the TrajectoryPlanner class.
+    """
+
+    def setUp(self):
+        self.planner = TrajectoryPlanner()
+
+    def test_raster_serpentine(self):
+        """
+        Test that odd raster lines run backwards.
+        """
+        trajectory = self.planner.raster(0, 2, 0, 1, 1)
+        self.assertEqual(trajectory.shape, (2, 3))
+        np.testing.assert_array_equal(trajectory.line(0)[:, 0], [0, 1, 2])
+        np.testing.assert_array_equal(trajectory.line(1)[:, 0], [2, 1, 0])
+        np.testing.assert_array_equal(trajectory.directions, [1, -1])
+
+    def test_raster_float_step(self):
+        """
+        Test that float step sizes produce the exact point count.
+        """
+        trajectory = self.planner.raster(0.0, 1.0, 0.0, 0.5, 0.1)
+        self.assertEqual(trajectory.shape, (6, 11))
+        self.assertEqual(trajectory.num_points, 66)
+        self.assertAlmostEqual(trajectory.points[:, 0].max(), 1.0)
+
+    def test_trace_retrace(self):
+        """
+        Test that every row is scanned forward and then backward.
+        """
+        trajectory = self.planner.trace_retrace(0, 2, 0, 1, 1)
+        self.assertEqual(trajectory.num_lines, 4)
+        self.assertEqual(trajectory.num_passes, 2)
+        np.testing.assert_array_equal(trajectory.line(1)[:, 0], [2, 1, 0])
+        np.testing.assert_array_equal(trajectory.line_rows, [0, 0, 1, 1])
+        np.testing.assert_array_equal(trajectory.line_passes, [0, 1, 0, 1])
+
+    def test_grid(self):
+        """
+        Test the grid pattern.
+        """
+        trajectory = self.planner.grid(0, 10, 0, 5, rows=3, cols=5)
+        self.assertEqual(trajectory.num_points, 15)
+        np.testing.assert_allclose(trajectory.line(2)[:, 1], 5.0)
+
+    def test_circle(self):
+        """
+        Test that circle points lie on the circle.
+        """
+        trajectory = self.planner.circle(5, 5, 2, 16)
+        radii = np.hypot(trajectory.x - 5, trajectory.y - 5)
+        np.testing.assert_allclose(radii, 2.0)
+
+    def test_spiral_matches_incremental_definition(self):
+        """
+        Test the vectorized spiral against the incremental spiral definition.
+        """
+        radius, step_size = 3.0, 0.5
+        expected = []
+        theta, r = 0.0, 0.0
+        while r <= radius:
+            expected.append((r * math.cos(theta), r * math.sin(theta)))
+            theta += step_size / r if r != 0 else step_size
+            r += step_size / (2 * math.pi)
+        trajectory = self.planner.spiral(0, 0, radius, step_size)
+        self.assertEqual(trajectory.num_points, len(expected))
+        np.testing.assert_allclose(trajectory.points, expected, atol=1e-9)
+
+    def test_invalid_pattern(self):
+        """
+        Test planning an unknown pattern.
+        """
+        with self.assertRaises(ValueError):
+            self.planner.plan("zigzag")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+# File: tests/test_trajectory_cache.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+import numpy as np
+from scan_engine.scan_buffer import ScanBuffer
+from scan_engine.trajectory import TrajectoryPlanner
+from scan_engine.trajectory_cache import TrajectoryCache
+
+
+def raster(size):
+    return {"x_start": 0, "x_end": size - 1, "y_start": 0, "y_end": size - 1, "step_size": 1}
+
+
+class TestTrajectoryCache(unittest.TestCase):
+    """
+    Unit tests for the TrajectoryCache and the trajectory index tables.
+    """
+
+    def setUp(self):
+        self.cache = TrajectoryCache()
+        self.planner = TrajectoryPlanner(self.cache)
+
+    def test_repeated_plans_share_read_only_trajectory(self):
+        """
+        Test that planning the same scan again returns the cached, read-only trajectory.
+        """
+        first = self.planner.plan("raster", **raster(16))
+        second = self.planner.plan("raster", **raster(16))
+        self.assertIs(first, second)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertFalse(first.points.flags.writeable)
+        self.assertFalse(first.buffer_index.flags.writeable)
+        self.assertIsNot(self.planner.plan("trace_retrace", **raster(16)), first)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_lru_eviction_within_budget(self):
+        """
+        Test that the least recently used trajectory is evicted when the budget is exceeded.
+        """
+        size = TrajectoryPlanner().raster(**raster(32)).freeze().nbytes
+        cache = TrajectoryCache(max_bytes=2 * size)
+        planner = TrajectoryPlanner(cache)
+        planner.plan("raster", **raster(32))
+        planner.plan("trace_retrace", x_start=0, x_end=31, y_start=0, y_end=15, step_size=1)
+        planner.plan("raster", **raster(32))  # Now the trace/retrace path is used least recently
+        planner.plan("raster", **raster(31))
+        self.assertIn(cache.key("raster", raster(32)), cache)
+        self.assertIn(cache.key("raster", raster(31)), cache)
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+        small = TrajectoryCache(max_bytes=size - 1)
+        TrajectoryPlanner(small).plan("raster", **raster(32))
+        self.assertEqual(len(small), 0)
+
+    def test_drift_compensation_on_cached_path(self):
+        """
+        Test that the drift offset is applied to a copy of the cached points.
+        """
+        plain = self.planner.plan("raster", **raster(8))
+        self.planner.offset = (0.5, -0.25)
+        shifted = self.planner.plan("raster", **raster(8))
+        np.testing.assert_allclose(shifted.points, plain.points + [0.5, -0.25])
+        np.testing.assert_array_equal(plain.points[0], [0.0, 0.0])
+        self.assertEqual(self.cache.hits, 1)
+        self.assertIs(shifted.buffer_index, plain.buffer_index)
+
+    def test_cache_miss_leaves_drift_compensation_alone(self):
+        """
+        Test that planning a missing trajectory neither clears the drift compensation
+        while the pattern is built nor restores a stale one afterwards.
+        """
+        self.planner.set_drift((0.5, -0.25), (0.0, 0.1))
+        seen = []
+        build_raster = self.planner.raster
+
+        def raster_during_drift_update(**parameters):
+            seen.append((self.planner.offset, self.planner.drift_per_line))
+            self.planner.set_drift((2.0, 2.0))  # A DriftTracker updating meanwhile
+            return build_raster(**parameters)
+
+        self.planner.raster = raster_during_drift_update
+        trajectory = self.planner.plan("raster", **raster(8))
+        self.assertEqual(seen, [((0.5, -0.25), (0.0, 0.1))])
+        self.assertEqual((trajectory.offset, trajectory.drift_per_line), ((0.5, -0.25), (0.0, 0.1)))
+        np.testing.assert_allclose(trajectory.line(1)[0], [7.5, 0.85])
+        self.assertEqual((self.planner.offset, self.planner.drift_per_line), ((2.0, 2.0), (0.0, 0.0)))
+
+    def test_point_list_keyed_by_content(self):
+        """
+        Test that point lists are keyed by their coordinates, not by object identity.
+        """
+        points = np.random.default_rng(2).random((200, 2))
+        first = self.planner.plan("point_list", points=points)
+        self.assertIs(self.planner.plan("point_list", points=points.tolist()), first)
+        self.assertIsNot(self.planner.plan("point_list", points=points[::-1]), first)
+
+    def test_buffer_index_matches_scan_buffer(self):
+        """
+        Test that the flat buffer index table places points like ScanBuffer.line_view.
+        """
+        trajectory = TrajectoryPlanner().trace_retrace(0, 4, 0, 2, 1)
+        buffer = ScanBuffer(trajectory)
+        for line_index in range(trajectory.num_lines):
+            buffer.write_line(line_index, x=trajectory.line(line_index)[:, 0])
+        np.testing.assert_array_equal(buffer.data[0].reshape(-1)[trajectory.buffer_index], trajectory.x)
+        np.testing.assert_array_equal(buffer.acquired("x"), trajectory.x)
+        np.testing.assert_array_equal(trajectory.line_index[[0, 4, 5, 29]], [0, 0, 1, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
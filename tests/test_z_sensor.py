@@ -0,0 +1,106 @@
+# File: tests/test_z_sensor.py
+
+import sys
+import os
+
+# Dynamically add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../"))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+import numpy as np
+from scan_engine.scan_manager import ScanManager
+from simulation.surface import Surface
+from simulation.tiled_surface import TiledSurface
+from simulation.z_sensor import SimulatedMotionController, SurfaceZSensor
+
+
+def polynomial_surface(function, shape=(20, 30)):
+    """Surface sampling a function of (x, y) on unit pixels."""
+    surface = Surface()
+    y, x = np.mgrid[0:shape[0], 0:shape[1]].astype(np.float64)
+    surface.surface_data = function(x, y)
+    return surface
+
+
+class TestSurfaceZSensor(unittest.TestCase):
+    """
+    Unit tests for the SurfaceZSensor and the SimulatedMotionController.
+    """
+
+    def setUp(self):
+        self.points = np.random.default_rng(5).random((200, 2)) * [25.0, 15.0] + 2.0
+
+    def test_interpolation_reproduces_polynomials(self):
+        """
+        Test that bilinear interpolation is exact for bilinear surfaces, bicubic for
+        quadratic ones, and nearest picks the closest pixel.
+        """
+        cases = (
+            ("bilinear", lambda x, y: 3 * x - 2 * y + 0.5 * x * y),
+            ("bicubic", lambda x, y: 0.1 * x * x - 0.3 * y * y + 0.2 * x * y + x),
+            ("nearest", lambda x, y: np.rint(x) + 100 * np.rint(y)),
+        )
+        for interpolation, function in cases:
+            with self.subTest(interpolation=interpolation):
+                sensor = SurfaceZSensor(polynomial_surface(function), interpolation)
+                xs, ys = self.points[:, 0], self.points[:, 1]
+                np.testing.assert_allclose(sensor.sample(xs, ys), function(xs, ys), atol=1e-9)
+
+    def test_pixel_size_origin_and_edges(self):
+        """
+        Test the mapping of stage coordinates to pixels and edge clamping.
+        """
+        surface = polynomial_surface(lambda x, y: x + 10 * y)
+        sensor = SurfaceZSensor(surface, "bilinear", pixel_size=0.5, origin=(1.0, 2.0))
+        np.testing.assert_allclose(sensor.sample([1.0, 2.25, 1.0], [2.0, 2.0, 3.0]), [0.0, 2.5, 20.0])
+        np.testing.assert_allclose(sensor.sample([-5.0, 100.0], [2.0, 2.0]), [0.0, 29.0])
+        self.assertEqual(sensor.sample(np.zeros((2, 3)), np.full((2, 3), 2.0)).shape, (2, 3))
+        with self.assertRaises(ValueError):
+            SurfaceZSensor(surface, "spline")
+
+    def test_tiled_surface_reads_visited_tiles_only(self):
+        """
+        Test that sampling a TiledSurface only computes the tiles around the line.
+        """
+        surface = TiledSurface(lambda x, y: np.add.outer(10 * y, x), size=(100.0, 100.0), pixel_size=0.1, tile_size=64)
+        sensor = SurfaceZSensor(surface, "bicubic")
+        xs = np.linspace(10.0, 15.0, 101)
+        np.testing.assert_allclose(sensor.sample(xs, np.full(101, 50.05)), xs + 500.5, atol=1e-3)
+        self.assertEqual(len(surface.cache), 2)
+
+        # Scattered points only compute their own tiles, not the bounding box between them
+        surface = TiledSurface(lambda x, y: np.add.outer(10 * y, x), size=(100.0, 100.0), pixel_size=0.002, tile_size=256)
+        sensor = SurfaceZSensor(surface, "bilinear")
+        points = np.random.default_rng(6).uniform(1.0, 99.0, (50, 2))
+        np.testing.assert_allclose(sensor.sample(points[:, 0], points[:, 1]), points[:, 0] + 10 * points[:, 1], rtol=1e-5)
+        self.assertLessEqual(surface.cache.misses, 200)
+
+    def test_scan_records_topography(self):
+        """
+        Test that a ScanManager driving the simulated controller records the surface.
+        """
+        surface = polynomial_surface(lambda x, y: np.sin(x / 3.0) + 0.1 * y)
+        controller = SimulatedMotionController(SurfaceZSensor(surface, "bicubic"), z_offset=5.0)
+        scan_manager = ScanManager(controller)
+        scan_manager.configure_channels(["topography", "error"])
+        scan_manager.raster_scan(0, 29, 0, 19, 1)
+        image = scan_manager.scan_buffer.image("z")
+        np.testing.assert_allclose(image, surface.get_height_data() + 5.0, atol=1e-12)
+        np.testing.assert_array_equal(scan_manager.scan_buffer.image("topography"), image)
+        np.testing.assert_array_equal(scan_manager.scan_buffer.image("error"), -image)
+        controller.move(3.0, 2.0, 0)
+        self.assertAlmostEqual(controller.get_z_position(), np.sin(1.0) + 0.2 + 5.0)
+
+    def test_noise(self):
+        """
+        Test the RMS of the sensor noise.
+        """
+        sensor = SurfaceZSensor(polynomial_surface(lambda x, y: 0 * x), noise=0.2, seed=1)
+        self.assertAlmostEqual(float(sensor.sample(np.full(20000, 5.0), np.full(20000, 5.0)).std()), 0.2, delta=0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
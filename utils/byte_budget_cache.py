@@ -0,0 +1,86 @@
+# File: utils/byte_budget_cache.py
+
+import threading
+from collections import OrderedDict
+from utils.logger import get_logger
+
+
+class ByteBudgetCache:
+    """
+    Least-recently-used cache of objects with an nbytes attribute (arrays, trajectories),
+    bounded by a byte budget. Access is thread-safe, so a worker thread and the GUI can
+    share one cache.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        """
+        Initialize the ByteBudgetCache.
+        :param max_bytes: Byte budget; least recently used entries are evicted when the
+                          cached entries exceed it.
+        """
+        self.logger = get_logger(__name__)
+        if max_bytes < 0:
+            self.logger.error(f"Invalid byte budget: {max_bytes}")
+            raise ValueError("The byte budget must not be negative.")
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up an entry and mark it as most recently used.
+        :param key: Hashable key.
+        :return: The cached value, or None.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        """
+        Store an entry, evicting least recently used entries to stay within budget.
+        Entries larger than the whole budget are not stored.
+        :param key: Hashable key.
+        :param value: Object with an nbytes attribute.
+        """
+        size = value.nbytes
+        if size > self.max_bytes:
+            self.logger.debug("Entry of %s bytes exceeds the cache budget of %s bytes.", size, self.max_bytes)
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._entries[key] = value
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.logger.debug("Evicted %s (%s bytes) from the cache.", evicted_key, evicted.nbytes)
+
+    def keys(self) -> list:
+        """
+        Keys of the cached entries, from least to most recently used.
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
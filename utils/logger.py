@@ -1,12 +1,187 @@
 #logger.py
+import atexit
 import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Loggers handed out by get_logger, so configure_logging can rewire them later
+_managed_loggers = {}
+_own_handlers = {}
+_module_levels = {}
+_default_level = logging.DEBUG
+_hot_path_level = logging.WARNING
+_queue_listener = None
+_log_queue = None
+_lock = threading.Lock()
+
 
 def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
-    if not logger.hasHandlers():
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        logger.setLevel(logging.DEBUG)
-    return logger
\ No newline at end of file
+    with _lock:
+        if not logger.hasHandlers():
+            _own_handlers[name] = _create_handler()
+            logger.addHandler(_own_handlers[name])
+        _managed_loggers[name] = logger
+        logger.setLevel(_level_for(name))
+    return logger
+
+
+def get_hot_path_logger(name: str, max_per_second: float = 10.0) -> logging.Logger:
+    """
+    Return a logger for per-point messages in scan-rate code paths.
+    The logger is named ``<name>.hot``, is disabled (WARNING) unless a level is
+    configured for it, and lets at most max_per_second records through per call site.
+    Pass message arguments lazily (``logger.debug("z=%s", z)``) so nothing is
+    formatted while the level is disabled.
+    :param name: Name of the owning module.
+    :param max_per_second: Maximum records per second and call site.
+    :return: The hot-path logger.
+    """
+    hot_name = f"{name}.hot"
+    logger = logging.getLogger(hot_name)
+    with _lock:
+        if not any(isinstance(f, RateLimitFilter) for f in logger.filters):
+            logger.addFilter(RateLimitFilter(max_per_second))
+        if hot_name not in _managed_loggers:
+            _managed_loggers[hot_name] = logger
+        logger.setLevel(_level_for(hot_name))
+    return logger
+
+
+def configure_logging(level=None, module_levels=None, asynchronous=True, hot_path_level=None) -> None:
+    """
+    Configure every logger created by get_logger.
+    :param level: Default level for modules without an explicit level.
+    :param module_levels: Mapping of logger name prefix (e.g. "scan_engine") to level.
+                          The longest matching prefix wins.
+    :param asynchronous: Route records through a QueueHandler so that the calling
+                         thread never blocks on stream I/O; a QueueListener writes them.
+    :param hot_path_level: Default level of the hot-path loggers (WARNING disables them).
+    """
+    global _default_level, _hot_path_level
+    with _lock:
+        if level is not None:
+            _default_level = _to_level(level)
+        if hot_path_level is not None:
+            _hot_path_level = _to_level(hot_path_level)
+        if module_levels:
+            _module_levels.update({prefix: _to_level(value) for prefix, value in module_levels.items()})
+
+        if asynchronous:
+            _start_listener()
+        else:
+            _stop_listener()
+
+        for name, logger in _managed_loggers.items():
+            logger.setLevel(_level_for(name))
+        _replace_own_handlers()
+
+
+def set_module_level(prefix: str, level) -> None:
+    """
+    Set the level of all loggers whose name starts with prefix.
+    :param prefix: Logger name prefix, e.g. "hardware.mock_controller".
+    :param level: Level name or number, or None to remove the prefix's level.
+    """
+    with _lock:
+        if level is None:
+            _module_levels.pop(prefix, None)
+        else:
+            _module_levels[prefix] = _to_level(level)
+        for name, logger in _managed_loggers.items():
+            logger.setLevel(_level_for(name))
+
+
+def shutdown_logging() -> None:
+    """
+    Stop the asynchronous listener after writing all queued records.
+    Loggers fall back to writing synchronously.
+    """
+    with _lock:
+        if _queue_listener is not None:
+            _stop_listener()
+            _replace_own_handlers()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most max_per_second records through per call site (file and line).
+    """
+
+    def __init__(self, max_per_second: float = 10.0, clock=time.monotonic):
+        super().__init__()
+        if max_per_second <= 0:
+            raise ValueError("Maximum rate must be positive.")
+        self.interval = 1.0 / max_per_second
+        self.clock = clock
+        self._last_emit = {}
+        self.suppressed = 0
+
+    def filter(self, record) -> bool:
+        key = (record.pathname, record.lineno)
+        now = self.clock()
+        last = self._last_emit.get(key)
+        if last is not None and now - last < self.interval:
+            self.suppressed += 1
+            return False
+        self._last_emit[key] = now
+        return True
+
+
+def _to_level(level) -> int:
+    if isinstance(level, str):
+        value = logging.getLevelName(level.upper())
+        if not isinstance(value, int):
+            raise ValueError(f"Invalid log level: {level}")
+        return value
+    return int(level)
+
+
+def _level_for(name: str) -> int:
+    matches = [prefix for prefix in _module_levels if name == prefix or name.startswith(prefix + ".")]
+    if matches:
+        return _module_levels[max(matches, key=len)]
+    return _hot_path_level if name.endswith(".hot") else _default_level
+
+
+def _create_handler() -> logging.Handler:
+    if _log_queue is not None:
+        return QueueHandler(_log_queue)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(_FORMAT))
+    return handler
+
+
+def _replace_own_handlers():
+    for name, handler in list(_own_handlers.items()):
+        logger = _managed_loggers[name]
+        logger.removeHandler(handler)
+        _own_handlers[name] = _create_handler()
+        logger.addHandler(_own_handlers[name])
+
+
+def _start_listener():
+    global _queue_listener, _log_queue
+    if _queue_listener is not None:
+        return
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(_FORMAT))
+    _log_queue = queue.SimpleQueue()
+    _queue_listener = QueueListener(_log_queue, stream_handler, respect_handler_level=True)
+    _queue_listener.start()
+
+
+def _stop_listener():
+    global _queue_listener, _log_queue
+    if _queue_listener is None:
+        return
+    _queue_listener.stop()
+    _queue_listener = None
+    _log_queue = None
+
+
+atexit.register(shutdown_logging)